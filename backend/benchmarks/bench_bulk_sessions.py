@@ -0,0 +1,67 @@
+"""
+Création de N sessions (PI planning, une session par équipe) : appels successifs
+à PokerService.create_session (flush + commit + refresh par session) contre
+PokerService.create_sessions_bulk (une transaction, insertions groupées),
+sur une base SQLite déjà remplie
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_bulk_sessions [--sessions 500] [--existing 20000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--existing", type=int, default=20000)
+    parser.add_argument("--teams", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bulk.db")
+
+    import logging
+    logging.disable(logging.WARNING)
+    from database import init_db, SessionLocal
+    from models.user import User
+    from services.poker_service import PokerService
+
+    init_db()
+    db = SessionLocal()
+    try:
+        organizer = User(username="pi-organizer")
+        db.add(organizer)
+        db.commit()
+        db.refresh(organizer)
+
+        # Base déjà remplie : les codes sont vérifiés contre un index non vide
+        items = [SimpleNamespace(title=f"Backlog {i}", description=None, deck="fibonacci", deck_cards=None,
+                                 facilitator=None) for i in range(args.existing)]
+        PokerService.create_sessions_bulk(db, items, organizer)
+        print(f"{args.existing} sessions existantes, création de {args.sessions} sessions "
+              f"({args.teams} facilitateurs)")
+
+        start = time.perf_counter()
+        for i in range(args.sessions):
+            PokerService.create_session(db, f"PI 12 - Team {i}", "Estimation des features", organizer)
+        elapsed = time.perf_counter() - start
+        print(f"  create_session x {args.sessions:<6} {elapsed * 1000:8.0f} ms  "
+              f"({elapsed / args.sessions * 1000:.2f} ms/session)")
+
+        items = [SimpleNamespace(title=f"PI 12 - Team {i}", description="Estimation des features",
+                                 deck="fibonacci", deck_cards=None, facilitator=f"scrum-master-{i % args.teams}")
+                 for i in range(args.sessions)]
+        start = time.perf_counter()
+        created = PokerService.create_sessions_bulk(db, items, organizer)
+        elapsed = time.perf_counter() - start
+        print(f"  create_sessions_bulk    {elapsed * 1000:8.0f} ms  "
+              f"({elapsed / len(created) * 1000:.2f} ms/session, facilitateurs créés inclus)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Écritures concurrentes sur l'état des sessions : N requêtes simultanées
+mêlant votes et actions du facilitateur (reveal, reset, nouveau round,
+clôture de round), avec ou sans If-Match
+
+Compte les réponses par statut (409 = conflit détecté par le verrouillage
+optimiste, 500 = erreur comme "database is locked") et vérifie ensuite les
+invariants : numéros de round uniques, compteurs de votes exacts
+
+Usage (depuis backend/) :
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_concurrent_writes [--writes 200] [--sessions 4]
+"""
+import argparse
+import collections
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--voters", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/writes.db")
+
+    import logging
+    logging.disable(logging.WARNING)
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func
+    import main as app_module
+    from database import SessionLocal
+    from models.poker import PokerSession, PokerRound, PokerVote
+
+    rng = random.Random(args.seed)
+    owner = {"X-Auth-User": "writes-owner"}
+
+    with TestClient(app_module.app, raise_server_exceptions=False) as client:
+        codes = [client.post("/api/poker/sessions", json={"title": f"Writes {i}"}, headers=owner).json()["session_code"]
+                 for i in range(args.sessions)]
+        voters = [f"writes-voter-{i}" for i in range(args.voters)]
+        for code in codes:
+            for voter in voters:
+                client.post(f"/api/poker/sessions/{code}/join", headers={"X-Auth-User": voter})
+        snapshots = {code: client.get(f"/api/poker/sessions/{code}", headers=owner).json() for code in codes}
+
+        def request(kind: str, code: str, if_match: bool):
+            snapshot = snapshots[code]
+            headers = dict(owner)
+            if kind == "vote":
+                return client.post(f"/api/poker/sessions/{code}/vote", json={"vote_value": rng.choice(["1", "3", "5", "8"])},
+                                   headers={"X-Auth-User": rng.choice(voters)})
+            if kind == "complete":
+                if if_match:
+                    headers["If-Match"] = str(snapshot["current_round"]["version"])
+                return client.post(f"/api/poker/sessions/{code}/rounds/{snapshot['current_round']['round_number']}/complete",
+                                   json={"final_estimate": "5"}, headers=headers)
+            if if_match:
+                headers["If-Match"] = str(snapshot["version"])
+            if kind == "round":
+                return client.post(f"/api/poker/sessions/{code}/rounds", json={}, headers=headers)
+            return client.post(f"/api/poker/sessions/{code}/{kind}", headers=headers)
+
+        plan = [(rng.choice(["vote"] * 4 + ["reveal", "reset", "round", "complete"]), rng.choice(codes), rng.random() < 0.5)
+                for _ in range(args.writes)]
+        statuses = collections.Counter()
+        by_kind = collections.defaultdict(collections.Counter)
+        barrier = threading.Barrier(args.writes)
+
+        def worker(kind, code, if_match):
+            barrier.wait()
+            status = request(kind, code, if_match).status_code
+            statuses[status] += 1
+            by_kind[kind][status] += 1
+
+        threads = [threading.Thread(target=worker, args=item) for item in plan]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    try:
+        duplicated_rounds = db.query(PokerRound.session_id, PokerRound.round_number).group_by(
+            PokerRound.session_id, PokerRound.round_number
+        ).having(func.count(PokerRound.id) > 1).count()
+        actual_votes = dict(db.query(PokerVote.round_id, func.count(PokerVote.id)).group_by(PokerVote.round_id).all())
+        wrong_counters = sum(1 for round_id, votes_count in db.query(PokerRound.id, PokerRound.votes_count).all()
+                             if votes_count != actual_votes.get(round_id, 0))
+        versions = [version for (version,) in db.query(PokerSession.version).all()]
+    finally:
+        db.close()
+
+    print(f"{args.writes} écritures simultanées sur {args.sessions} sessions en {elapsed:.2f}s")
+    print(f"  statuts : {dict(sorted(statuses.items()))}")
+    for kind, counter in sorted(by_kind.items()):
+        print(f"    {kind:<9} {dict(sorted(counter.items()))}")
+    print(f"  erreurs serveur (dont 'database is locked') : {sum(n for s, n in statuses.items() if s >= 500)}")
+    print(f"  rounds dupliqués : {duplicated_rounds}  compteurs de votes faux : {wrong_counters}  "
+          f"versions finales : {versions}")
+
+
+if __name__ == "__main__":
+    main()
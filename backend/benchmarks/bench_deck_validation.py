@@ -0,0 +1,60 @@
+"""
+Validation d'un vote : recherche linéaire dans l'ancienne liste globale
+(VALID_VOTES), contre le jeu compilé de utils/decks.py (table carte -> indice),
+avec le jeu de la session relu depuis ses colonnes à chaque vote ou gardé en cache
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_deck_validation [--votes 200000]
+"""
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from utils import decks
+
+# Ancienne liste globale (utils/constants.py)
+VALID_VOTES = ["0", "0.5", "1", "2", "3", "5", "8", "13", "20", "40", "100", "?", "☕"]
+
+
+def measure(label: str, validate, votes: list):
+    start = time.perf_counter()
+    for vote in votes:
+        validate(vote)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<42} {elapsed / len(votes) * 1e9:7.0f} ns/vote")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--votes", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Mélange de cartes valides (surtout en fin de liste : ?, ☕) et invalides
+    population = VALID_VOTES + ["21", "coffee", "XL"]
+    votes = [rng.choice(population) for _ in range(args.votes)]
+
+    custom_cards = [str(value) for value in range(1, 21)]
+    session = SimpleNamespace(session_code="AbCdEf12", deck="custom", deck_cards=json.dumps(custom_cards))
+    deck = decks.session_deck(session)
+
+    print(f"{args.votes} votes validés")
+    measure("liste globale (in)", lambda vote: vote in VALID_VOTES, votes)
+    measure("jeu compilé (index_of)", lambda vote: decks.DEFAULT_DECK.index_of(vote), votes)
+    measure("jeu personnalisé relu à chaque vote",
+            lambda vote: decks.compile_deck(session.deck, json.loads(session.deck_cards)).index_of(vote), votes)
+    measure("jeu personnalisé en cache (session_deck)",
+            lambda vote: decks.session_deck(session).index_of(vote), votes)
+
+    indices = [deck.index_of(vote) for vote in votes if deck.index_of(vote) is not None]
+    start = time.perf_counter()
+    for _ in range(100):
+        deck.statistics(indices[:50])
+    print(f"  statistiques d'un round de 50 votes         {(time.perf_counter() - start) / 100 * 1e6:7.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Latence de GET /api/poker/sessions/{code} avec 200 participants ayant voté,
+et coût de la sérialisation seule : dict ad hoc + jsonable_encoder (ancien
+chemin) contre PokerSessionDetailResponse sérialisé par pydantic-core
+
+Usage (depuis backend/) :
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_detail_serialization [--participants 200] [--requests 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+
+def _legacy_payload(response) -> dict:
+    data = response.model_dump()
+    data["created_at"] = response.created_at.isoformat()
+    for vote in data["votes"]:
+        vote["voted_at"] = vote["voted_at"].isoformat()
+    for round_data in data["rounds_history"]:
+        round_data["completed_at"] = round_data["completed_at"].isoformat()
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='agile-detail-')}/detail.db")
+    import logging
+    logging.disable(logging.INFO)
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.testclient import TestClient
+
+    import main as app_module
+    from schemas.poker import PokerSessionDetailResponse
+
+    with TestClient(app_module.app) as client:
+        owner = {"X-Auth-User": "owner"}
+        code = client.post("/api/poker/sessions", json={"title": "Big room"}, headers=owner).json()["session_code"]
+        for index in range(args.participants):
+            headers = {"X-Auth-User": f"user-{index}"}
+            client.post(f"/api/poker/sessions/{code}/join", headers=headers)
+            client.post(f"/api/poker/sessions/{code}/vote", json={"vote_value": "5"}, headers=headers)
+        client.post(f"/api/poker/sessions/{code}/reveal", headers=owner)
+
+        latencies = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.get(f"/api/poker/sessions/{code}", headers=owner)
+            latencies.append(time.perf_counter() - start)
+        body = response.json()
+
+    latencies.sort()
+    print(f"GET detail ({args.participants} participants, {len(response.content)} octets) : "
+          f"p50 {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.2f} ms")
+
+    model = PokerSessionDetailResponse.model_validate(body)
+    legacy = _legacy_payload(model)
+    iterations = 500
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json.dumps(jsonable_encoder(legacy), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    legacy_time = (time.perf_counter() - start) / iterations
+    start = time.perf_counter()
+    for _ in range(iterations):
+        model.model_dump_json()
+    model_time = (time.perf_counter() - start) / iterations
+    print(f"sérialisation dict + jsonable_encoder : {legacy_time * 1e6:8.1f} µs")
+    print(f"sérialisation response_model (pydantic-core) : {model_time * 1e6:8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Coût d'un appel de log dans le thread appelant (la boucle asyncio en
+production) : handler écrivant directement dans un fichier, contre la file
+de utils/logging_config.py (formatage et écriture dans le thread du listener),
+avec et sans échantillonnage
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_logging [--records 50000]
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from utils import logging_config
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def measure(logger, records: int) -> list:
+    durations = []
+    for index in range(records):
+        start = time.perf_counter()
+        logger.info("Vote cast", extra={"session_code": "AbCdEf12", "round_number": index, "user_id": 42})
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def report(label: str, durations: list):
+    values = [value * 1e6 for value in durations]
+    print(f"  {label:<30} p50 {statistics.median(values):6.1f} µs  p99 {_percentile(values, 0.99):7.1f} µs  "
+          f"max {max(values):8.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--sample-every", type=int, default=100)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    print(f"{args.records} enregistrements JSON écrits dans un fichier")
+
+    # Référence : formatage et écriture dans le thread appelant
+    direct = logging.FileHandler(os.path.join(directory, "direct.log"))
+    direct.setFormatter(logging_config.JsonFormatter())
+    root.addHandler(direct)
+    report("handler direct", measure(logging.getLogger("bench.direct"), args.records))
+    root.removeHandler(direct)
+    direct.close()
+
+    # File + listener : remplacer la sortie standard par un fichier
+    stderr = logging_config.sys.stderr
+    logging_config.sys.stderr = open(os.path.join(directory, "queued.log"), "w")
+    try:
+        logging_config.configure_logging("INFO", "json", {"bench.sampled": args.sample_every})
+        sampled = logging_config.sampled_logger("bench.sampled")
+        # Échantillonnage d'abord : la file encore vide ne concurrence pas la mesure
+        report(f"file + échantillon 1/{args.sample_every}", measure(sampled, args.records))
+        report("file + listener", measure(logging.getLogger("bench.queued"), args.records))
+        start = time.perf_counter()
+        logging_config.stop_logging()
+        print(f"  vidage de la file à l'arrêt : {(time.perf_counter() - start) * 1000:.0f} ms")
+    finally:
+        logging_config.sys.stderr.close()
+        logging_config.sys.stderr = stderr
+
+
+if __name__ == "__main__":
+    main()
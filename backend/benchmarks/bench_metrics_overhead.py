@@ -0,0 +1,66 @@
+"""
+Mesure le coût de l'instrumentation (utils/metrics.py)
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_metrics_overhead [--iterations 200000]
+"""
+import argparse
+import asyncio
+import time
+
+from utils.metrics import MetricsMiddleware, Counter, Histogram, record_query
+
+
+def _per_call_ns(fn, iterations: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+async def _plain_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _run_asgi(app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/bench", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    histogram = Histogram("bench_histogram", "bench", ("route",))
+    counter = Counter("bench_counter", "bench", ("type",))
+
+    results = {
+        "histogram.observe": _per_call_ns(lambda: histogram.observe(0.003, "/bench"), n),
+        "counter.inc": _per_call_ns(lambda: counter.inc("vote_cast"), n),
+        "record_query (hors requête)": _per_call_ns(lambda: record_query(0.0002), n),
+    }
+    plain = asyncio.run(_run_asgi(_plain_app, n // 4))
+    instrumented = asyncio.run(_run_asgi(MetricsMiddleware(_plain_app), n // 4))
+    results["requête ASGI nue"] = plain
+    results["requête ASGI + MetricsMiddleware"] = instrumented
+
+    for name, ns in results.items():
+        print(f"{name:<40} {ns / 1000:8.2f} µs")
+    print(f"{'surcoût middleware par requête':<40} {(instrumented - plain) / 1000:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
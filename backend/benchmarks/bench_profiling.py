@@ -0,0 +1,80 @@
+"""
+Coût du profileur par échantillonnage (utils/profiling.py) pendant une mesure :
+débit d'une charge CPU Python (sérialisation JSON d'un état de session) sans
+profileur, puis avec échantillonnage à différents intervalles, et coût de
+tracemalloc actif. Inactifs, ni l'un ni l'autre n'installe quoi que ce soit
+
+Chaque configuration est mesurée --repeat fois, meilleur débit retenu (bruit de la machine)
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_profiling [--seconds 2] [--repeat 3]
+"""
+import argparse
+import json
+import threading
+import time
+import tracemalloc
+
+from utils.profiling import SamplingProfiler
+
+
+STATE = {
+    "session_code": "AbCdEf12",
+    "participants": [{"username": f"user-{i}", "role": "participant", "has_voted": i % 2 == 0} for i in range(50)],
+    "votes": [{"user": f"user-{i}", "value": "5", "voted_at": "2026-01-01T10:00:00"} for i in range(50)],
+}
+
+
+def workload(seconds: float) -> float:
+    """Sérialisations par seconde pendant `seconds` secondes"""
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        json.dumps(STATE)
+        count += 1
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    def sampled(interval_ms: float) -> tuple:
+        profiler = SamplingProfiler()
+        result = {}
+        sampler = threading.Thread(
+            target=lambda: result.update(zip(("stacks", "samples"), profiler.run(args.seconds, interval_ms / 1000)))
+        )
+        sampler.start()
+        throughput = workload(args.seconds)
+        sampler.join()
+        return throughput, result["samples"]
+
+    def traced() -> tuple:
+        tracemalloc.start(10)
+        try:
+            return workload(args.seconds), 0
+        finally:
+            tracemalloc.stop()
+
+    configurations = [("sans profileur", lambda: (workload(args.seconds), 0))]
+    configurations += [(f"échantillonnage {ms} ms", lambda ms=ms: sampled(ms)) for ms in (10, 5, 1)]
+    configurations += [("tracemalloc (10 frames)", traced)]
+
+    # Configurations entrelacées à chaque tour : la dérive de la machine touche tout le monde
+    best = {}
+    for _ in range(args.repeat):
+        for label, run in configurations:
+            best[label] = max(best.get(label, (0.0, 0)), run())
+
+    baseline = best["sans profileur"][0]
+    for label, _ in configurations:
+        throughput, samples = best[label]
+        passes = f", {samples} passages" if samples else ""
+        print(f"  {label:<32} {throughput:10,.0f} ops/s  ({(1 - throughput / baseline) * 100:5.1f} %{passes})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Rafale de reconnexion après un redémarrage : N participants d'une même
+session rechargent GET /api/poker/sessions/{code} au même instant, avec et
+sans single-flight (routers.poker.session_snapshots)
+
+Affiche aussi l'étalement des reconnexions obtenu avec les délais
+aléatoires de server_draining (config.Settings.ws_drain_reconnect_*)
+
+Usage (depuis backend/) :
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_reconnect_storm [--room 50]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+class _NoFlight:
+    """Référence : chaque requête fait son propre chargement"""
+
+    def do(self, key, fn):
+        return fn()
+
+
+def storm(client, code: str, users: list) -> dict:
+    from utils.sql_profiler import capture_queries
+
+    barrier = threading.Barrier(len(users))
+    statuses = []
+
+    def reload(username):
+        barrier.wait()
+        statuses.append(client.get(f"/api/poker/sessions/{code}", headers={"X-Auth-User": username}).status_code)
+
+    threads = [threading.Thread(target=reload, args=(username,)) for username in users]
+    with capture_queries() as profile:
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    return {"statements": profile.statements, "elapsed": elapsed,
+            "errors": sum(1 for status in statuses if status != 200)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--room", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/reconnect.db")
+
+    import logging
+    logging.disable(logging.INFO)
+    from fastapi.testclient import TestClient
+    import main as app_module
+    from config import settings
+    from routers import poker as poker_router
+
+    with TestClient(app_module.app) as client:
+        code = client.post("/api/poker/sessions", json={"title": "Storm"},
+                           headers={"X-Auth-User": "storm-owner"}).json()["session_code"]
+        users = [f"storm-user-{i}" for i in range(args.room)]
+        for username in users:
+            client.get(f"/api/poker/sessions/{code}", headers={"X-Auth-User": username})
+
+        # Comme après un redémarrage : premier chargement de la session à venir
+        poker_router.session_snapshots.start()
+        shared = storm(client, code, users)
+        single_flight = poker_router.session_snapshots
+        poker_router.session_snapshots = _NoFlight()
+        try:
+            unshared = storm(client, code, users)
+        finally:
+            poker_router.session_snapshots = single_flight
+
+    print(f"{args.room} rechargements simultanés de la même session")
+    for label, result in (("sans single-flight", unshared), ("avec single-flight", shared)):
+        print(f"  {label:<20} {result['statements']:5d} requêtes SQL  "
+              f"{result['elapsed'] * 1000:7.1f} ms  erreurs={result['errors']}")
+
+    rng = random.Random(args.seed)
+    low, high = settings.ws_drain_reconnect_min_ms / 1000, settings.ws_drain_reconnect_max_ms / 1000
+    delays = [rng.uniform(low, high) for _ in range(args.room)]
+    per_second = {}
+    for delay in delays:
+        per_second[int(delay)] = per_second.get(int(delay), 0) + 1
+    print(f"Reconnexions après server_draining ({low:.0f}-{high:.0f} s) : "
+          f"au plus {max(per_second.values())}/s au lieu de {args.room} dans la même seconde")
+
+
+if __name__ == "__main__":
+    main()
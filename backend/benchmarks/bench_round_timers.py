@@ -0,0 +1,103 @@
+"""
+Planificateur central (utils/scheduler.py) contre une tâche asyncio par
+session, pour N rounds en temps limité : coût de planification et de
+replanification, mémoire, et retard des échéances
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_round_timers [--sessions 10000] [--spread 2.0]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+
+from utils.scheduler import TimerScheduler
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def run_scheduler(delays, reschedule_every: int) -> dict:
+    loop = asyncio.get_running_loop()
+    scheduler = TimerScheduler()
+    scheduler.start()
+    lateness, done = [], asyncio.Event()
+    remaining = [len(delays)]
+
+    def make_callback(expected):
+        async def fire():
+            lateness.append(loop.time() - expected)
+            remaining[0] -= 1
+            if not remaining[0]:
+                done.set()
+        return fire
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for key, delay in enumerate(delays):
+        scheduler.schedule(key, delay, make_callback(loop.time() + delay))
+    # Replanifier une partie des rounds (prolongation du temps imparti)
+    for key in range(0, len(delays), reschedule_every):
+        delay = delays[key] + 0.5
+        scheduler.schedule(key, delay, make_callback(loop.time() + delay))
+    setup = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    await done.wait()
+    await scheduler.stop()
+    return {"setup": setup, "memory": memory, "lateness": lateness, "tasks": 1}
+
+
+async def run_tasks(delays, reschedule_every: int) -> dict:
+    loop = asyncio.get_running_loop()
+    lateness = []
+
+    async def sleeper(delay, expected):
+        await asyncio.sleep(delay)
+        lateness.append(loop.time() - expected)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    tasks = {key: asyncio.ensure_future(sleeper(delay, loop.time() + delay)) for key, delay in enumerate(delays)}
+    for key in range(0, len(delays), reschedule_every):
+        tasks[key].cancel()
+        delay = delays[key] + 0.5
+        tasks[key] = asyncio.ensure_future(sleeper(delay, loop.time() + delay))
+    setup = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    await asyncio.gather(*tasks.values())
+    return {"setup": setup, "memory": memory, "lateness": lateness, "tasks": len(tasks)}
+
+
+def report(label: str, result: dict):
+    lateness = [value * 1000 for value in result["lateness"]]
+    print(f"  {label:<22} planification {result['setup'] * 1000:7.1f} ms  "
+          f"mémoire {result['memory'] / 1024:7.0f} KiB  tâches {result['tasks']:>6}  "
+          f"retard p50 {statistics.median(lateness):5.1f} ms  p99 {_percentile(lateness, 0.99):5.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--spread", type=float, default=2.0, help="Échéances réparties sur N secondes")
+    parser.add_argument("--reschedule-every", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    delays = [rng.uniform(0.1, args.spread) for _ in range(args.sessions)]
+
+    print(f"{args.sessions} rounds en temps limité, 1 sur {args.reschedule_every} replanifié")
+    report("tâche par session", asyncio.run(run_tasks(delays, args.reschedule_every)))
+    report("planificateur central", asyncio.run(run_scheduler(delays, args.reschedule_every)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Recherche plein texte (services/search_service.py) sur une base volumineuse :
+coût des triggers à l'insertion, reconstruction de l'index, puis latence
+d'une recherche FTS5 contre un parcours LIKE '%...%', pour un utilisateur
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_search [--rounds 1000000] [--queries 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+WORDS = [
+    "payment", "retry", "checkout", "invoice", "login", "password", "reset", "export", "import", "report",
+    "dashboard", "filter", "search", "notification", "email", "webhook", "refund", "subscription", "billing",
+    "profile", "avatar", "upload", "download", "mobile", "offline", "sync", "cache", "timeout", "audit",
+    "permission", "role", "admin", "onboarding", "tutorial", "pagination", "sorting", "calendar", "reminder",
+    "migration", "backup", "restore", "archive", "comment", "mention", "tag", "label", "theme", "accessibility",
+]
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.sample(WORDS, rng.randint(2, 5))).capitalize()
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=1_000_000)
+    parser.add_argument("--rounds-per-session", type=int, default=20)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/search.db")
+
+    import logging
+    logging.disable(logging.WARNING)
+    from sqlalchemy import text
+    from database import init_db, get_engine, SessionLocal
+    from models.user import User
+    from services.search_service import SearchService
+
+    rng = random.Random(args.seed)
+    init_db()
+    engine = get_engine()
+    backend = SearchService.backend(engine)
+    sessions = max(1, args.rounds // args.rounds_per_session)
+
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (username) VALUES (:username)"),
+                           [{"username": f"search-user-{i}"} for i in range(args.users)])
+        user_ids = [row.id for row in connection.execute(text("SELECT id FROM users ORDER BY id"))]
+
+    # Sessions et participants (créateur + 4 participants tirés au hasard)
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO poker_sessions (session_code, title, description, creator_id, status, is_revealed, "
+            "active_participants, version, created_at) "
+            "VALUES (:code, :title, :description, :creator, 'COMPLETED', 0, 5, 1, CURRENT_TIMESTAMP)"
+        ), [{"code": f"S{i:07d}", "title": f"Sprint {i} {_title(rng)}", "description": _title(rng),
+             "creator": rng.choice(user_ids)} for i in range(sessions)])
+        session_rows = connection.execute(text("SELECT id, creator_id FROM poker_sessions")).all()
+        connection.execute(text(
+            "INSERT INTO poker_participants (session_id, user_id, role, is_active, joined_at) "
+            "VALUES (:session, :user, :role, 1, CURRENT_TIMESTAMP)"
+        ), [{"session": row.id, "user": user, "role": "FACILITATOR" if user == row.creator_id else "PARTICIPANT"}
+            for row in session_rows
+            for user in {row.creator_id, *rng.sample(user_ids, 4)}])
+    session_seconds = time.perf_counter() - start
+
+    # Rounds : insertion par lots, index maintenu par les triggers
+    start = time.perf_counter()
+    batch = []
+    with engine.begin() as connection:
+        for index in range(args.rounds):
+            batch.append({"session": session_rows[index % sessions].id, "number": index // sessions + 1,
+                          "title": _title(rng), "estimate": rng.choice(["1", "2", "3", "5", "8", "13"])})
+            if len(batch) == 10000:
+                connection.execute(text(
+                    "INSERT INTO poker_rounds (session_id, round_number, story_title, final_estimate, "
+                    "votes_count, version, created_at) "
+                    "VALUES (:session, :number, :title, :estimate, 0, 1, CURRENT_TIMESTAMP)"
+                ), batch)
+                batch = []
+        if batch:
+            connection.execute(text(
+                "INSERT INTO poker_rounds (session_id, round_number, story_title, final_estimate, "
+                "votes_count, version, created_at) "
+                "VALUES (:session, :number, :title, :estimate, 0, 1, CURRENT_TIMESTAMP)"
+            ), batch)
+    rounds_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SearchService.rebuild(engine)
+    rebuild_seconds = time.perf_counter() - start
+
+    print(f"{sessions} sessions, {args.rounds} rounds, {args.users} utilisateurs (index : {backend})")
+    print(f"  insertion sessions   {session_seconds:6.1f} s")
+    print(f"  insertion rounds     {rounds_seconds:6.1f} s  ({args.rounds / rounds_seconds:,.0f} rounds/s avec triggers)")
+    print(f"  reconstruction index {rebuild_seconds:6.1f} s")
+
+    queries = [" ".join(rng.sample(WORDS, 2)) for _ in range(args.queries)]
+    db = SessionLocal()
+    try:
+        users = db.query(User).filter(User.id.in_(rng.sample(user_ids, min(len(user_ids), args.queries)))).all()
+
+        def measure(search) -> list:
+            durations = []
+            for index, query in enumerate(queries):
+                user = users[index % len(users)]
+                start = time.perf_counter()
+                search(db, user, query, 21, 0)
+                durations.append(time.perf_counter() - start)
+            return durations
+
+        for label, search in (("FTS (classé)", SearchService.search), ("LIKE '%...%'", SearchService._search_like)):
+            durations = [value * 1000 for value in measure(search)]
+            print(f"  {label:<14} p50 {statistics.median(durations):8.1f} ms  p95 {_percentile(durations, 0.95):8.1f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Coût d'un observateur en lecture seule : flux SSE (GET .../events) contre
+WebSocket, avec et sans permessage-deflate
+
+Lance un serveur uvicorn par mode, connecte N observateurs à une session,
+déclenche E événements (votes), puis mesure côté serveur :
+- mémoire résidente ajoutée par observateur
+- temps CPU par événement et par observateur
+
+Usage (depuis backend/) :
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_sse_observers [--observers 1000] [--events 50]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def _cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/observers.db")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         "--ws", "utils.ws_protocol:TunedDeflateWebSocketProtocol",
+         "--http", "utils.ws_protocol:DrainingHTTPProtocol"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def sse_observer(port: int, code: str, events: int, connected: asyncio.Event, counter: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /api/poker/sessions/{code}/events HTTP/1.1\r\nHost: bench\r\n"
+                 f"Accept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    await reader.readuntil(b"\r\n\r\n")
+    counter[0] += 1
+    connected.set()
+    received = 0
+    while received < events:
+        line = await reader.readline()
+        if not line:
+            break
+        # Chunked transfer : seules les lignes `data:` comptent
+        if b"data: " in line and b"vote_cast" in line:
+            received += line.count(b"vote_cast")
+    writer.close()
+    return received
+
+
+async def ws_observer(port: int, code: str, events: int, connected: asyncio.Event, counter: list, deflate: bool):
+    from websockets.asyncio.client import connect
+
+    compression = "deflate" if deflate else None
+    async with connect(f"ws://127.0.0.1:{port}/ws/poker/{code}?username=observer-{counter[1]}",
+                       compression=compression, max_queue=None) as websocket:
+        counter[1] += 1
+        counter[0] += 1
+        connected.set()
+        received = 0
+        while received < events:
+            message = await websocket.recv()
+            if '"type":"ping"' in message:
+                await websocket.send('{"type":"pong"}')
+            elif "vote_cast" in message:
+                received += message.count("vote_cast")
+        return received
+
+
+async def run(mode: str, observers: int, events: int) -> dict:
+    import httpx
+
+    port = _free_port()
+    server = start_server(port)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            owner = {"X-Auth-User": "observers-owner"}
+            code = (await client.post("/api/poker/sessions", json={"title": "Observers"}, headers=owner)).json()["session_code"]
+            await client.post(f"/api/poker/sessions/{code}/join", headers={"X-Auth-User": "observers-voter"})
+            await asyncio.sleep(0.5)
+            rss_before = _rss(server.pid)
+
+            counter, connected = [0, 0], asyncio.Event()
+            if mode == "sse":
+                tasks = [asyncio.ensure_future(sse_observer(port, code, events, connected, counter))
+                         for _ in range(observers)]
+            else:
+                tasks = [asyncio.ensure_future(ws_observer(port, code, events, connected, counter, mode == "ws-deflate"))
+                         for _ in range(observers)]
+            while counter[0] < observers:
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(1.0)
+            rss_after = _rss(server.pid)
+
+            cpu_before = _cpu_seconds(server.pid)
+            start = time.perf_counter()
+            votes = ["1", "2", "3", "5", "8"]
+            for index in range(events):
+                await client.post(f"/api/poker/sessions/{code}/vote", json={"vote_value": votes[index % len(votes)]},
+                                  headers={"X-Auth-User": "observers-voter"})
+            received = await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+            cpu = _cpu_seconds(server.pid) - cpu_before
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return {"memory": (rss_after - rss_before) / observers, "cpu": cpu / (events * observers),
+            "elapsed": elapsed, "complete": sum(1 for count in received if count >= events)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--observers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=50)
+    args = parser.parse_args()
+
+    # Un descripteur par observateur, côté client comme côté serveur
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, args.observers * 2 + 256)), hard))
+
+    print(f"{args.observers} observateurs, {args.events} événements")
+    for mode in ("sse", "ws", "ws-deflate"):
+        result = asyncio.run(run(mode, args.observers, args.events))
+        print(f"  {mode:<11} mémoire {result['memory'] / 1024:6.1f} KiB/observateur  "
+              f"CPU {result['cpu'] * 1e6:6.1f} µs/événement/observateur  "
+              f"diffusion {result['elapsed']:5.2f} s  complets {result['complete']}/{args.observers}")
+
+
+if __name__ == "__main__":
+    main()
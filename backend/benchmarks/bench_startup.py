@@ -0,0 +1,80 @@
+"""
+Temps de démarrage d'un worker : import de l'application, puis
+lancement uvicorn jusqu'à la première requête servie
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_startup [--repeat 5] [--database-url sqlite:////tmp/x.db]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = (
+    "import time; start = time.perf_counter(); import main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env)
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def measure_first_request(env: dict, timeout: float = 30.0) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError("Server did not answer in time")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='agile-startup-'), 'startup.db')}"
+    env = {**os.environ, "DATABASE_URL": database_url}
+
+    imports = [measure_import(env) for _ in range(args.repeat)]
+    first_requests = [measure_first_request(env) for _ in range(args.repeat)]
+
+    print(f"import main          median {statistics.median(imports) * 1000:8.1f} ms  "
+          f"(min {min(imports) * 1000:.1f}, max {max(imports) * 1000:.1f})")
+    print(f"spawn -> 1st request median {statistics.median(first_requests) * 1000:8.1f} ms  "
+          f"(min {min(first_requests) * 1000:.1f}, max {max(first_requests) * 1000:.1f})")
+
+
+if __name__ == "__main__":
+    main()
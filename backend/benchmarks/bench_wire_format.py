@@ -0,0 +1,100 @@
+"""
+Octets sur le fil et CPU par broadcast : JSON vs MessagePack,
+avec et sans permessage-deflate (mêmes réglages que utils/ws_protocol.py)
+
+La compression permessage-deflate se fait par connexion : son coût CPU est
+multiplié par le nombre de sockets, contrairement à l'encodage (une fois).
+
+Usage (depuis backend/) :
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_wire_format [--participants 200] [--sockets 100]
+"""
+import argparse
+import time
+import zlib
+
+from config import settings
+from utils.wire_format import encode_json, encode_msgpack, msgpack_available
+
+
+def _snapshot(participants: int) -> dict:
+    return {
+        "type": "session_snapshot",
+        "session_code": "Xk3f9QpL2aE",
+        "title": "Sprint 42 Planning",
+        "is_revealed": True,
+        "current_round": {"round_number": 7, "story_title": "Payment retry on timeout"},
+        "votes": [{"user": f"user-{i}", "value": "5", "voted_at": "2025-01-01T10:00:00"} for i in range(participants)],
+        "participants": [{"username": f"user-{i}", "role": "participant", "has_voted": True}
+                         for i in range(participants)],
+        "rounds_history": [{"round_number": r, "story_title": f"Story {r}", "final_estimate": "8",
+                            "completed_at": "2025-01-01T09:00:00"} for r in range(1, 7)],
+    }
+
+
+def _payloads(participants: int) -> dict:
+    return {
+        "vote_cast": {"type": "vote_cast", "username": "user-1", "round_number": 7},
+        "batch de votes": [{"type": "vote_cast", "username": f"user-{i}", "round_number": 7}
+                           for i in range(participants)],
+        "snapshot": _snapshot(participants),
+    }
+
+
+def _deflate_size(data: bytes, compressor) -> int:
+    # Même cadrage que permessage-deflate : flush synchro, 4 octets de fin retirés
+    return len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+
+
+def _compressor():
+    return zlib.compressobj(settings.ws_deflate_level, zlib.DEFLATED, -settings.ws_deflate_window_bits,
+                            settings.ws_deflate_mem_level)
+
+
+def measure(payload, encoder, sockets: int, iterations: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        data = encoder(payload)
+    encode_time = (time.perf_counter() - start) / iterations
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+
+    # Taille à froid : premier message sur une connexion (sans contexte partagé)
+    cold_size = _deflate_size(raw, _compressor())
+    compressors = [_compressor() for _ in range(sockets)]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for compressor in compressors:
+            _deflate_size(raw, compressor)
+    deflate_time = (time.perf_counter() - start) / iterations
+    return {
+        "raw_bytes": len(raw),
+        "deflate_bytes": cold_size,
+        "encode_us": encode_time * 1e6,
+        "broadcast_deflate_us": (encode_time + deflate_time) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, default=200)
+    parser.add_argument("--sockets", type=int, default=100, help="Destinataires par broadcast")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    encoders = {"json": encode_json}
+    if msgpack_available():
+        encoders["msgpack"] = encode_msgpack
+    else:
+        print("msgpack non installé : seul JSON est mesuré")
+
+    print(f"{'payload':<16}{'format':<9}{'octets':>9}{'deflate':>9}{'encode µs':>11}"
+          f"{'broadcast+deflate µs':>22}   ({args.sockets} sockets)")
+    for name, payload in _payloads(args.participants).items():
+        for format_name, encoder in encoders.items():
+            result = measure(payload, encoder, args.sockets, args.iterations)
+            print(f"{name:<16}{format_name:<9}{result['raw_bytes']:>9}{result['deflate_bytes']:>9}"
+                  f"{result['encode_us']:>11.1f}{result['broadcast_deflate_us']:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
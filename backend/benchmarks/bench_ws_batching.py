@@ -0,0 +1,64 @@
+"""
+Envois WebSocket pendant une rafale de votes dans une salle de N personnes,
+avec et sans fenêtre de regroupement (WebSocketManager.batch_window)
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_ws_batching [--room 100] [--revotes 3] [--window-ms 50]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from utils.websocket_manager import WebSocketManager
+
+
+class _CountingSocket:
+    """Socket factice : compte les appels d'envoi"""
+
+    def __init__(self):
+        self.sends = 0
+
+    async def send_text(self, text):
+        self.sends += 1
+
+
+async def vote_storm(room: int, revotes: int, window: float, duration: float, seed: int) -> dict:
+    manager = WebSocketManager(batch_window=window)
+    sockets = [_CountingSocket() for _ in range(room)]
+    for i, socket in enumerate(sockets):
+        manager.register(socket, "bench", f"user-{i}")
+
+    rng = random.Random(seed)
+    votes = [f"user-{i}" for i in range(room) for _ in range(revotes)]
+    rng.shuffle(votes)
+    delays = sorted(rng.uniform(0, duration) for _ in votes)
+
+    start = time.perf_counter()
+    for username, at in zip(votes, delays):
+        await asyncio.sleep(max(0.0, at - (time.perf_counter() - start)))
+        await manager.broadcast({"type": "vote_cast", "username": username, "round_number": 1}, "bench")
+    await manager.broadcast({"type": "votes_revealed"}, "bench")
+    elapsed = time.perf_counter() - start
+
+    sends = sum(s.sends for s in sockets)
+    return {"events": len(votes) + 1, "sends": sends, "elapsed": elapsed, "sends_per_s": sends / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--room", type=int, default=100)
+    parser.add_argument("--revotes", type=int, default=3, help="Votes par participant pendant la rafale")
+    parser.add_argument("--window-ms", type=float, default=50.0)
+    parser.add_argument("--duration", type=float, default=1.0, help="Durée de la rafale (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for label, window in (("sans regroupement", 0.0), (f"fenêtre {args.window_ms:g} ms", args.window_ms / 1000)):
+        result = asyncio.run(vote_storm(args.room, args.revotes, window, args.duration, args.seed))
+        print(f"{label:<22} {result['events']:>5} événements -> {result['sends']:>7} envois "
+              f"({result['sends_per_s']:>9.0f} envois/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Flood de la boucle d'écho WebSocket : un client envoie des messages en rafale
+dans une salle de N sockets, on compte les envois effectués par le serveur
+avec et sans limites de débit (config.Settings.ws_*)
+
+Avec limites, code retour 1 si plus de messages ont été rediffusés que les
+seaux ne le permettent (rafale + débit x durée) : régression des limites
+
+Usage (depuis backend/) :
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_ws_flood [--room 100] [--messages 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+class _CountingSocket:
+    """Socket factice : compte les frames reçus sans I/O"""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def send_text(self, text):
+        self.frames += 1
+
+
+def run(room: int, messages: int, message_type: str, limited: bool) -> dict:
+    from fastapi.testclient import TestClient
+
+    import main
+    from config import settings
+    from routers import websocket as websocket_router
+    from utils.rate_limit import SessionBuckets
+    from utils.websocket_manager import manager
+
+    if not limited:
+        settings.ws_client_rate = settings.ws_client_burst = 10 ** 9
+        websocket_router.session_buckets = SessionBuckets(10 ** 9, 10 ** 9)
+
+    with TestClient(main.app) as client:
+        code = client.post("/api/poker/sessions", json={"title": "Flood"},
+                           headers={"X-Auth-User": "flood-owner"}).json()["session_code"]
+        with client.websocket_connect(f"/ws/poker/{code}?username=flooder") as ws:
+            receivers = [_CountingSocket() for _ in range(room - 1)]
+            listeners = [manager.register(receiver, code, f"listener-{index}")
+                         for index, receiver in enumerate(receivers)]
+
+            start = time.perf_counter()
+            for index in range(messages):
+                ws.send_json({"type": message_type, "text": f"spam {index}"})
+            # Laisser le serveur traiter la file et le dernier tick de coalescence
+            ws.send_json({"type": "unknown-type-barrier"})
+            time.sleep(settings.ws_coalesce_interval_ms / 1000 * 2)
+            elapsed = time.perf_counter() - start
+            for listener in listeners:
+                manager.disconnect(listener)
+
+    sends = sum(receiver.frames for receiver in receivers)
+    # Messages rediffusés au plus : le seau du client et celui de la session
+    # (rafale puis débit continu) s'appliquent aussi aux types regroupés
+    allowed = min(settings.ws_client_burst + settings.ws_client_rate * elapsed,
+                  settings.ws_session_burst + settings.ws_session_rate * elapsed)
+    return {"sends": sends, "elapsed": elapsed, "max_sends": int(allowed) * (room - 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--room", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--type", default="chat", help="Type de message (chat, typing, cursor...)")
+    parser.add_argument("--unlimited", action="store_true", help="Désactiver les limites (référence)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='agile-flood-')}/flood.db")
+    result = run(args.room, args.messages, args.type, limited=not args.unlimited)
+    mode = "sans limites" if args.unlimited else "avec limites"
+    print(f"{mode}: {args.messages} messages '{args.type}' -> {result['sends']} envois "
+          f"vers {args.room - 1} sockets en {result['elapsed']:.2f}s "
+          f"(amplification x{result['sends'] / args.messages:.1f})")
+
+    if not args.unlimited and result["sends"] > result["max_sends"]:
+        print(f"REGRESSION: {result['sends']} envois > {result['max_sends']} permis par les limites")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
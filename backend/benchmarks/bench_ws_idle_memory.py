@@ -0,0 +1,96 @@
+"""
+Mémoire du registre WebSocket pour N sockets inactifs, et coût d'un passage
+du reaper (WebSocketManager.reap)
+
+Compare les enregistrements Connection (__slots__) à un registre de
+référence à base de dicts (un dict d'attributs par socket)
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_ws_idle_memory [--sockets 10000] [--sessions 1000]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from utils.websocket_manager import WebSocketManager
+
+
+class _IdleSocket:
+    """Socket factice sans état, partagé par tous les enregistrements"""
+
+    async def send_text(self, text):
+        pass
+
+    async def send_bytes(self, data):
+        pass
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+def _measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    registry = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del registry
+    return size
+
+
+def build_slots(sockets: int, sessions: int, socket) -> WebSocketManager:
+    manager = WebSocketManager()
+    for index in range(sockets):
+        manager.register(socket, f"S{index % sessions:05d}", f"user-{index}")
+    return manager
+
+
+def build_dicts(sockets: int, sessions: int, socket) -> dict:
+    registry = {}
+    now = time.monotonic()
+    for index in range(sockets):
+        registry.setdefault(f"S{index % sessions:05d}", {})[f"user-{index}"] = {
+            "websocket": socket, "username": f"user-{index}", "msgpack": False,
+            "last_seen": now, "ping_sent_at": 0.0,
+        }
+    return registry
+
+
+async def reap_pass(manager: WebSocketManager) -> dict:
+    # Tous les sockets sont silencieux depuis plus longtemps que l'intervalle
+    start = time.perf_counter()
+    await manager.reap(interval=0.0, timeout=60.0)
+    ping_pass = time.perf_counter() - start
+    start = time.perf_counter()
+    await manager.reap(interval=0.0, timeout=60.0)
+    idle_pass = time.perf_counter() - start
+    start = time.perf_counter()
+    reaped = await manager.reap(interval=0.0, timeout=-1.0)
+    close_pass = time.perf_counter() - start
+    return {"ping": ping_pass, "idle": idle_pass, "close": close_pass, "reaped": reaped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sockets", type=int, default=10000)
+    parser.add_argument("--sessions", type=int, default=1000)
+    args = parser.parse_args()
+
+    socket = _IdleSocket()
+    slots = _measure(lambda: build_slots(args.sockets, args.sessions, socket))
+    dicts = _measure(lambda: build_dicts(args.sockets, args.sessions, socket))
+    print(f"{args.sockets} sockets inactifs dans {args.sessions} sessions")
+    print(f"  registre Connection (__slots__) : {slots / 1024:8.0f} KiB  ({slots / args.sockets:.0f} o/socket)")
+    print(f"  registre de dicts (référence)   : {dicts / 1024:8.0f} KiB  ({dicts / args.sockets:.0f} o/socket)")
+
+    timings = asyncio.run(reap_pass(build_slots(args.sockets, args.sessions, socket)))
+    print("Passage du reaper")
+    print(f"  envoi des pings     : {timings['ping'] * 1000:7.1f} ms")
+    print(f"  rien à faire        : {timings['idle'] * 1000:7.1f} ms")
+    print(f"  fermeture ({timings['reaped']:>5})  : {timings['close'] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
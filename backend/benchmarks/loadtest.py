@@ -0,0 +1,329 @@
+"""
+Test de charge reproductible des sessions de planning poker
+
+Simule K sessions concurrentes de M participants chacune :
+connexion WebSocket, rafales de votes, révélation, reset, nouveau round
+et polling du détail de session. Rapporte p50/p95/p99, débit, requêtes SQL
+par opération (en-tête X-DB-Queries) et pic de RSS du serveur.
+
+Usage (depuis backend/) :
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.loadtest --sessions 10 --participants 20 --rounds 3
+    python -m benchmarks.loadtest --mode spawn --write-baseline benchmarks/baseline.json
+    python -m benchmarks.loadtest --baseline benchmarks/baseline.json      # échoue si régression
+    python -m benchmarks.loadtest --database-url postgresql://localhost/agile_bench
+
+Modes :
+    inprocess  uvicorn dans un thread du processus courant (défaut)
+    spawn      uvicorn dans un sous-processus local
+    url        serveur déjà démarré (--url), RSS non mesuré
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _server_env(database_url: str) -> Dict[str, str]:
+    return {"DATABASE_URL": database_url, "SQL_DEBUG_HEADERS": "1"}
+
+
+class _Server:
+    """Serveur uvicorn local (thread ou sous-processus)"""
+
+    def __init__(self, mode: str, database_url: str):
+        self.mode = mode
+        self.database_url = database_url
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._process: Optional[subprocess.Popen] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.mode == "spawn":
+            env = {**os.environ, **_server_env(self.database_url)}
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.port),
+                 "--log-level", "warning"],
+                cwd=BACKEND_DIR, env=env,
+            )
+        else:
+            os.environ.update(_server_env(self.database_url))
+            sys.path.insert(0, BACKEND_DIR)
+            import uvicorn
+            from main import app
+
+            config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+            self._server = uvicorn.Server(config)
+            self._thread = threading.Thread(target=self._server.run, daemon=True)
+            self._thread.start()
+        self._wait_ready()
+
+    def _wait_ready(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(self.base_url + "/", timeout=1.0)
+                return
+            except httpx.TransportError:
+                time.sleep(0.1)
+        raise RuntimeError("Server did not start")
+
+    def peak_rss_kb(self) -> Optional[int]:
+        if self._process is not None:
+            with open(f"/proc/{self._process.pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=10)
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
+
+
+class Recorder:
+    """Latences et requêtes SQL par type d'opération"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statements: Dict[str, List[int]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.ws_messages = 0
+
+    async def call(self, client: httpx.AsyncClient, operation: str, method: str, url: str,
+                   username: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers={"X-Auth-User": username}, **kwargs)
+        except httpx.HTTPError:
+            self.errors[operation] += 1
+            return None
+        self.latencies[operation].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[operation] += 1
+        queries = response.headers.get("x-db-queries")
+        if queries is not None:
+            self.statements[operation].append(int(queries))
+        return response
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def _listen(ws, recorder: Recorder) -> None:
+    try:
+        async for _ in ws:
+            recorder.ws_messages += 1
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def _run_session(client: httpx.AsyncClient, ws_base: str, index: int, args,
+                       recorder: Recorder, rng: random.Random) -> None:
+    facilitator = f"fac-{index}"
+    participants = [f"user-{index}-{i}" for i in range(args.participants)]
+
+    response = await recorder.call(client, "create_session", "POST", "/api/poker/sessions",
+                                   facilitator, json={"title": f"Load session {index}"})
+    if response is None or response.status_code != 200:
+        return
+    code = response.json()["session_code"]
+    base = f"/api/poker/sessions/{code}"
+
+    await asyncio.gather(*(recorder.call(client, "join", "POST", f"{base}/join", user)
+                           for user in participants))
+
+    sockets = []
+    for user in participants[:args.ws_per_session]:
+        start = time.perf_counter()
+        try:
+            ws = await websockets.connect(f"{ws_base}/ws/poker/{code}?username={user}", open_timeout=60)
+        except (OSError, TimeoutError, websockets.InvalidHandshake):
+            recorder.errors["ws_connect"] += 1
+            continue
+        recorder.latencies["ws_connect"].append(time.perf_counter() - start)
+        sockets.append((ws, asyncio.create_task(_listen(ws, recorder))))
+
+    try:
+        for round_index in range(args.rounds):
+            async def poll():
+                for _ in range(args.polls):
+                    user = rng.choice(participants)
+                    await recorder.call(client, "detail", "GET", base, user)
+
+            votes = [recorder.call(client, "vote", "POST", f"{base}/vote", user,
+                                   json={"vote_value": rng.choice(["1", "2", "3", "5", "8", "13"])})
+                     for user in participants]
+            await asyncio.gather(poll(), *votes)
+            await recorder.call(client, "reveal", "POST", f"{base}/reveal", facilitator)
+            await recorder.call(client, "reset", "POST", f"{base}/reset", facilitator)
+            await recorder.call(client, "new_round", "POST", f"{base}/rounds", facilitator,
+                                json={"story_title": f"Story {round_index + 2}"})
+    finally:
+        for ws, task in sockets:
+            await ws.close()
+            await task
+
+
+async def run_load(base_url: str, args) -> dict:
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    ws_base = base_url.replace("http", "ws", 1)
+    limits = httpx.Limits(max_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(_run_session(client, ws_base, i, args, recorder, rng)
+                               for i in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+
+    operations = {}
+    for operation, values in sorted(recorder.latencies.items()):
+        statements = recorder.statements.get(operation)
+        operations[operation] = {
+            "count": len(values),
+            "errors": recorder.errors.get(operation, 0),
+            "p50_ms": round(_percentile(values, 50) * 1000, 3),
+            "p95_ms": round(_percentile(values, 95) * 1000, 3),
+            "p99_ms": round(_percentile(values, 99) * 1000, 3),
+            "db_statements": round(statistics.mean(statements), 2) if statements else None,
+        }
+    total = sum(len(v) for v in recorder.latencies.values())
+    return {
+        "scenario": {
+            "sessions": args.sessions,
+            "participants": args.participants,
+            "rounds": args.rounds,
+            "polls": args.polls,
+            "ws_per_session": args.ws_per_session,
+            "seed": args.seed,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "ws_messages_received": recorder.ws_messages,
+        "operations": operations,
+    }
+
+
+def compare_with_baseline(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Lister les régressions par rapport à une baseline JSON"""
+    regressions = []
+    if result["scenario"] != baseline.get("scenario"):
+        regressions.append("scenario differs from baseline, comparison is not meaningful")
+        return regressions
+    for operation, reference in baseline.get("operations", {}).items():
+        current = result["operations"].get(operation)
+        if current is None:
+            regressions.append(f"{operation}: missing from current run")
+            continue
+        if current["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{operation}: p95 {current['p95_ms']}ms > baseline {reference['p95_ms']}ms")
+        if (reference.get("db_statements") is not None and current.get("db_statements") is not None
+                and current["db_statements"] > reference["db_statements"]):
+            regressions.append(
+                f"{operation}: {current['db_statements']} statements > baseline {reference['db_statements']}")
+        if current["errors"] > reference.get("errors", 0):
+            regressions.append(f"{operation}: {current['errors']} errors > baseline {reference['errors']}")
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput {result['throughput_rps']} rps < baseline {baseline['throughput_rps']} rps")
+    return regressions
+
+
+def _print_report(result: dict) -> None:
+    print(f"{'operation':<15}{'count':>8}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'SQL/op':>8}")
+    for operation, data in result["operations"].items():
+        statements = "-" if data["db_statements"] is None else f"{data['db_statements']:.1f}"
+        print(f"{operation:<15}{data['count']:>8}{data['errors']:>6}{data['p50_ms']:>10.2f}"
+              f"{data['p95_ms']:>10.2f}{data['p99_ms']:>10.2f}{statements:>8}")
+    print(f"elapsed {result['elapsed_s']}s, throughput {result['throughput_rps']} req/s, "
+          f"ws messages {result['ws_messages_received']}, peak RSS {result.get('peak_rss_kb')} kB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "spawn", "url"], default="inprocess")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Serveur cible en mode url")
+    parser.add_argument("--database-url", default=None,
+                        help="Base du serveur local (défaut : fichier SQLite temporaire)")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--polls", type=int, default=10, help="Requêtes de détail par round et par session")
+    parser.add_argument("--ws-per-session", type=int, default=20)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="Baseline JSON à comparer (code retour 1 si régression)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Marge de régression tolérée (0.25 = 25%%)")
+    parser.add_argument("--write-baseline", help="Écrire le résultat comme nouvelle baseline")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    server = None
+    tmpdir = None
+    base_url = args.url
+    if args.mode != "url":
+        database_url = args.database_url
+        if database_url is None:
+            tmpdir = tempfile.mkdtemp(prefix="agile-loadtest-")
+            database_url = f"sqlite:///{os.path.join(tmpdir, 'loadtest.db')}"
+        server = _Server(args.mode, database_url)
+        server.start()
+        base_url = server.base_url
+
+    try:
+        result = asyncio.run(run_load(base_url, args))
+        result["peak_rss_kb"] = server.peak_rss_kb() if server else None
+    finally:
+        if server is not None:
+            server.stop()
+
+    _print_report(result)
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as output:
+            json.dump(result, output, indent=2)
+            output.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as reference:
+            regressions = compare_with_baseline(result, json.load(reference), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
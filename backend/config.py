@@ -3,6 +3,72 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./agile_tools.db"
     cors_origins: list = ["*"]
+    auto_create_schema: bool = True
+    db_pool_warmup: int = 1
+    # Réplicas en lecture (get_read_db) : URLs, vérification périodique, retard maximal (PostgreSQL),
+    # durée pendant laquelle un utilisateur lit sur le primaire après une modification
+    database_replica_urls: list = []
+    db_replica_health_interval: float = 5.0
+    db_replica_max_lag: float = 30.0
+    db_read_your_writes_window: float = 5.0
+    metrics_enabled: bool = True
+    sql_profiler_enabled: bool = False
+    sql_debug_headers: bool = False
+    sql_slow_request_ms: float = 200.0
+    sql_slow_request_statements: int = 50
+    # Limites de la boucle d'écho WebSocket
+    ws_max_message_bytes: int = 4096
+    ws_client_rate: float = 5.0
+    ws_client_burst: int = 20
+    ws_session_rate: float = 50.0
+    ws_session_burst: int = 100
+    ws_allowed_message_types: list = ["message", "chat", "reaction", "typing", "cursor"]
+    ws_coalesced_message_types: list = ["typing", "cursor"]
+    ws_coalesce_interval_ms: int = 100
+    # Regroupement des événements sortants en un frame par tick (0 = désactivé)
+    ws_batch_window_ms: int = 0
+    # Compression permessage-deflate (voir utils/ws_protocol.py ; False la désactive, même protocole)
+    ws_deflate_enabled: bool = True
+    ws_deflate_window_bits: int = 12
+    ws_deflate_level: int = 6
+    ws_deflate_mem_level: int = 5
+    # Heartbeat applicatif : ping après `interval` s de silence, fermeture sans pong sous `timeout` s
+    ws_heartbeat_interval: float = 20.0
+    ws_heartbeat_timeout: float = 10.0
+    # Arrêt progressif : délai de reconnexion aléatoire proposé aux clients, et délai maximal du drain
+    ws_drain_reconnect_min_ms: int = 1000
+    ws_drain_reconnect_max_ms: int = 15000
+    ws_drain_timeout: float = 5.0
+    # Après un démarrage : fenêtre (s) pendant laquelle le premier chargement de chaque session est partagé
+    # (reconnexions étalées sur ws_drain_reconnect_max_ms)
+    ws_reconnect_coalesce_window: float = 30.0
+    # Observateurs SSE : événements gardés pour la reprise (Last-Event-ID), conservation d'un canal sans observateur
+    sse_replay_events: int = 64
+    sse_channel_idle_ttl: float = 300.0
+    # Observateur SSE lent : frames en attente au plus, durée max d'une écriture ; au-delà il est déconnecté
+    sse_observer_max_pending: int = 64
+    sse_send_timeout: float = 5.0
+    # Logging (utils/logging_config.py) : niveau, format "json" ou "text", 1 enregistrement sur N par logger
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_sample_every: dict = {"poker.votes": 100, "ws.messages": 100}
+    # Idempotency-Key (utils/idempotency.py) : réponses gardées en mémoire (LRU), durée, persistance en table
+    idempotency_enabled: bool = True
+    idempotency_max_entries: int = 10000
+    idempotency_ttl: float = 86400.0
+    idempotency_persistent: bool = False
+    # Mémoire des réponses enregistrées au plus, et taille max d'un corps enregistré (au-delà, non rejouable)
+    idempotency_max_bytes: int = 32 * 1024 * 1024
+    idempotency_max_body_bytes: int = 256 * 1024
+    # Endpoints de diagnostic (routers/admin.py) : désactivés par défaut, réservés aux
+    # utilisateurs listés munis du jeton (en-tête X-Admin-Token) ; arrêt automatique de tracemalloc
+    profiling_enabled: bool = False
+    admin_users: list = []
+    admin_token: str = ""
+    profiling_max_seconds: float = 60.0
+    profiling_tracemalloc_timeout: float = 600.0
+    # Création groupée de sessions (POST /api/poker/sessions/bulk) : nombre maximal par requête
+    poker_bulk_max_sessions: int = 500
 
     class Config:
         env_file = ".env"
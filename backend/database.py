@@ -1,18 +1,436 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import UniqueConstraint, create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, configure_mappers
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
 from config import settings
+from utils.metrics import DB_READS, record_query, registry
+from utils.sql_profiler import record_statement
+
+logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
+# Le moteur est créé au premier usage : importer l'application (tests, workers)
+# ne touche ni au fichier SQLite ni au serveur de base de données
+_engine = None
+_engine_lock = threading.Lock()
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    record_query(duration)
+    record_statement(statement, parameters, duration)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute n'est pas appelé en cas d'erreur : dépiler quand même
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def _create_engine(url: str) -> Engine:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+def get_engine() -> Engine:
+    """Retourner le moteur SQLAlchemy, créé au premier appel"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = _create_engine(settings.database_url)
+                _session_factory.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def SessionLocal() -> Session:
+    """Ouvrir une session ORM sur le moteur (créé si nécessaire)"""
+    if _engine is None:
+        get_engine()
+    return _session_factory()
+
+
+class Replica:
+    """Réplica en lecture : moteur créé au premier usage, état de la dernière vérification"""
+    __slots__ = ("url", "engine", "factory", "healthy", "lag", "error", "_lock")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine: Optional[Engine] = None
+        self.factory: Optional[sessionmaker] = None
+        # Premières lectures concurrentes (threadpool) : un seul moteur et un seul pool
+        self._lock = threading.Lock()
+        # Sain seulement après une première vérification réussie
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def session(self) -> Session:
+        factory = self.factory
+        if factory is None:
+            with self._lock:
+                if self.factory is None:
+                    self.engine = _create_engine(self.url)
+                    self.factory = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+                factory = self.factory
+        return factory()
+
+    def status(self) -> dict:
+        return {"url": make_url(self.url).render_as_string(hide_password=True), "healthy": self.healthy,
+                "lag_seconds": self.lag, "error": self.error}
+
+
+# Retard de réplication sur PostgreSQL (0 si tout le WAL reçu est rejoué : un
+# primaire sans écriture ne fait pas paraître le réplica en retard)
+_POSTGRES_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaSet:
+    """
+    Réplicas en lecture (settings.database_replica_urls), utilisés par get_read_db
+    - check() : vérification de chaque réplica (connexion, et retard sur PostgreSQL),
+      appelée périodiquement par le lifespan (start_health_checks)
+    - Un réplica dont une lecture échoue sur une erreur de connexion est écarté
+      jusqu'à la vérification suivante
+    - pick() : tourniquet parmi les réplicas sains, None s'il n'y en a aucun (primaire)
+    """
+
+    def __init__(self, urls: List[str], max_lag: float = 30.0):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def healthy_count(self) -> int:
+        return sum(replica.healthy for replica in self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def mark_down(self, replica: Replica, error: str) -> None:
+        if replica.healthy:
+            logger.warning("Read replica marked down", extra={"replica": replica.status()["url"], "error": error})
+        replica.healthy = False
+        replica.error = error
+
+    def check(self) -> None:
+        """Vérifier chaque réplica (threadpool : appels bloquants)"""
+        for replica in self.replicas:
+            was_healthy = replica.healthy
+            try:
+                db = replica.session()
+                try:
+                    if replica.engine.dialect.name == "postgresql":
+                        lag = db.execute(_POSTGRES_LAG).scalar()
+                        replica.lag = float(lag) if lag is not None else None
+                    else:
+                        # Table lue plutôt que SELECT 1 : SQLite crée un fichier vide s'il manque
+                        db.execute(text("SELECT 1 FROM users LIMIT 1"))
+                        replica.lag = None
+                finally:
+                    db.close()
+            except Exception as error:
+                replica.healthy, replica.error = False, str(error).splitlines()[0]
+            else:
+                too_late = replica.lag is not None and replica.lag > self.max_lag
+                replica.healthy = not too_late
+                replica.error = f"replication lag {replica.lag:.1f}s" if too_late else None
+            if replica.healthy != was_healthy:
+                logger.info("Read replica %s", "healthy" if replica.healthy else "unhealthy",
+                            extra=replica.status())
+
+    def status(self) -> list:
+        return [replica.status() for replica in self.replicas]
+
+    def start_health_checks(self, interval: float):
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._check_forever(interval))
+
+    async def stop_health_checks(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _check_forever(self, interval: float):
+        while True:
+            try:
+                await run_in_threadpool(self.check)
+            except Exception:
+                logger.exception("Read replica health check failed")
+            await asyncio.sleep(interval)
+
+    def dispose(self) -> None:
+        for replica in self.replicas:
+            with replica._lock:
+                if replica.engine is not None:
+                    replica.engine.dispose()
+                    replica.engine = replica.factory = None
+            replica.healthy = False
+
+
+replicas = ReplicaSet(settings.database_replica_urls, settings.db_replica_max_lag)
+registry.gauge("db_replicas_healthy", "Réplicas en lecture considérés sains", replicas.healthy_count)
+
+# Lecture de ses propres écritures : utilisateur -> fin de la fenêtre pendant
+# laquelle ses lectures restent sur le primaire (par worker)
+_WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+_sticky_until: Dict[str, float] = {}
+# Mis à jour depuis le threadpool (dépendances synchrones)
+_sticky_lock = threading.Lock()
+
+
+def _request_user(connection: HTTPConnection) -> Optional[str]:
+    username = connection.headers.get("x-auth-user", "").strip()
+    return username or None
+
+
+def _note_write(username: Optional[str]) -> None:
+    if username is None or not replicas:
+        return
+    now = time.monotonic()
+    with _sticky_lock:
+        if len(_sticky_until) > 10000:
+            for user in [user for user, until in _sticky_until.items() if until <= now]:
+                del _sticky_until[user]
+        _sticky_until[username] = now + settings.db_read_your_writes_window
+
+
+def _reads_from_primary(username: Optional[str]) -> bool:
+    return username is not None and _sticky_until.get(username, 0.0) > time.monotonic()
+
+
+def add_missing_columns(engine: Engine) -> list:
+    """
+    Ajouter aux tables existantes les colonnes déclarées dans les modèles
+    (create_all ne modifie pas une table existante)
+    Seules les colonnes nullables ou avec server_default peuvent être ajoutées ainsi
+    Retourne la liste des (table, colonne) ajoutées
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    added = []
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = (f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                       f"{column.type.compile(dialect=engine.dialect)}")
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    ddl += f" DEFAULT {getattr(default, 'text', default)!s}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                connection.execute(text(ddl))
+                added.append((table.name, column.name))
+    return added
+
+
+def add_missing_unique_constraints(engine: Engine, cleanups: Optional[dict] = None) -> list:
+    """
+    Créer sur les tables existantes les contraintes d'unicité déclarées dans les
+    modèles, sous forme d'index unique (SQLite ne sait pas ajouter une contrainte
+    à une table existante)
+    `cleanups` : nom de table -> fonction(connection) qui supprime les doublons
+    avant la création de l'index
+    Retourne la liste des (table, contrainte) ajoutées
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    added = []
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {frozenset(constraint["column_names"])
+                        for constraint in inspector.get_unique_constraints(table.name)}
+            existing |= {frozenset(index["column_names"])
+                         for index in inspector.get_indexes(table.name) if index["unique"]}
+            for constraint in table.constraints:
+                if not isinstance(constraint, UniqueConstraint) or constraint.name is None:
+                    continue
+                columns = [column.name for column in constraint.columns]
+                if frozenset(columns) in existing:
+                    continue
+                if cleanups and table.name in cleanups:
+                    cleanups[table.name](connection)
+                connection.execute(text(
+                    f"CREATE UNIQUE INDEX {quote(constraint.name)} ON {quote(table.name)} "
+                    f"({', '.join(quote(column) for column in columns)})"
+                ))
+                added.append((table.name, constraint.name))
+    return added
+
+
+def _deduplicate_votes(connection) -> None:
+    # Garder le dernier vote de chaque utilisateur par round
+    connection.execute(text(
+        "DELETE FROM poker_votes WHERE round_id IS NOT NULL AND id NOT IN "
+        "(SELECT MAX(id) FROM poker_votes WHERE round_id IS NOT NULL GROUP BY round_id, user_id)"
+    ))
+
+
+def init_db() -> list:
+    """
+    Créer les tables, colonnes et contraintes d'unicité manquantes, et l'index de recherche
+    Étape explicite : appelée par le lifespan (si auto_create_schema)
+    ou par `python manage.py init-db`
+    Retourne la liste des (table, colonne) ajoutées à des tables existantes
+    """
+    import models  # noqa: F401 - enregistre les modèles sur Base.metadata
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    added = add_missing_columns(engine)
+    constraints = add_missing_unique_constraints(engine, {"poker_votes": _deduplicate_votes})
+
+    if (any(column in ("active_participants", "votes_count") for _, column in added)
+            or ("poker_votes", "uq_poker_votes_round_user") in constraints):
+        # Nouveaux compteurs (ou doublons de votes supprimés) : les recalculer
+        # à partir des données existantes
+        from services.poker_service import PokerService
+        db = SessionLocal()
+        try:
+            PokerService.rebuild_counters(db)
+        finally:
+            db.close()
+
+    if ("poker_votes", "card_index") in added:
+        backfill_card_indices(engine)
+
+    from services.search_service import SearchService
+    SearchService.install(engine)
+    return added
+
+
+def backfill_card_indices(engine: Engine) -> None:
+    """
+    Convertir les votes existants (ancienne colonne vote_value, jeu Fibonacci)
+    en indices de carte (PokerVote.card_index)
+    """
+    from utils.decks import COFFEE_CARD, DEFAULT_DECK
+    inspector = inspect(engine)
+    if "vote_value" not in {column["name"] for column in inspector.get_columns("poker_votes")}:
+        return
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE poker_votes SET card_index = :index WHERE vote_value = :card AND card_index IS NULL"),
+            [{"index": index, "card": card} for index, card in enumerate(DEFAULT_DECK.cards)]
+            # Ancienne valeur envoyée par le frontend pour la carte café
+            + [{"index": DEFAULT_DECK.index_of(COFFEE_CARD), "card": "coffee"}]
+        )
+
+
+def warm_up() -> None:
+    """
+    Préparer le worker avant la première requête
+    - Configure les mappers ORM (coûteux au premier accès)
+    - Ouvre les premières connexions du pool
+    """
+    import models  # noqa: F401
+    configure_mappers()
+    engine = get_engine()
+    connections = [engine.connect() for _ in range(max(1, settings.db_pool_warmup))]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def dispose_engine() -> None:
+    """Fermer les connexions du pool et des réplicas (arrêt du worker)"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+    replicas.dispose()
+
+
+def get_db(connection: HTTPConnection):
+    """
+    Session sur le primaire
+    Une requête de modification ouvre la fenêtre de lecture de ses propres
+    écritures de l'utilisateur (début et fin de requête : une requête longue
+    ne la raccourcit pas)
+    """
+    username = _request_user(connection) if connection.scope.get("method") in _WRITE_METHODS else None
+    _note_write(username)
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        _note_write(username)
+
+
+def get_read_db(connection: HTTPConnection):
+    """
+    Session en lecture seule pour les endpoints de consultation
+    - Réplica sain (tourniquet) s'il y en a un
+    - Primaire si aucun réplica n'est configuré ou sain, ou si l'utilisateur
+      a modifié des données depuis moins de db_read_your_writes_window secondes
+      (session marquée info["read_your_writes"])
+    Les écritures doivent passer par get_db ; en local, un fichier SQLite en
+    lecture seule sert de réplica (sqlite:///file:replica.db?mode=ro&uri=true)
+    """
+    replica, sticky = None, False
+    if replicas:
+        if _reads_from_primary(_request_user(connection)):
+            sticky = True
+            DB_READS.inc("primary_sticky")
+        else:
+            replica = replicas.pick()
+            DB_READS.inc("replica" if replica is not None else "primary_fallback")
+
+    db = replica.session() if replica is not None else SessionLocal()
+    if sticky:
+        # Lecture à ne pas partager avec un chargement commencé avant l'écriture
+        db.info["read_your_writes"] = True
+    try:
+        yield db
+    except OperationalError as error:
+        if replica is not None:
+            replicas.mark_down(replica, str(error).splitlines()[0])
+        raise
+    finally:
+        db.close()
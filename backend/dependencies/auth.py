@@ -1,5 +1,9 @@
+import secrets
+from typing import Optional
+
 from fastapi import Header, Depends, HTTPException
 from sqlalchemy.orm import Session
+from config import settings
 from database import get_db
 from models.user import User
 
@@ -20,4 +24,24 @@ def get_current_user(
         db.commit()
         db.refresh(user)
 
-    return user
\ No newline at end of file
+    # Rendre la connexion au pool avant la suite de la requête : garder la
+    # transaction de lecture ouverte pendant l'attente d'un thread du
+    # threadpool peut épuiser le pool (attributs chargés, objet détaché)
+    db.expunge(user)
+    db.rollback()
+
+    return user
+
+
+def get_admin_user(
+        current_user: User = Depends(get_current_user),
+        x_admin_token: Optional[str] = Header(None)
+) -> User:
+    """
+    Administrateur : utilisateur listé dans settings.admin_users, avec le jeton
+    settings.admin_token (X-Auth-User seul ne prouve pas l'identité)
+    """
+    if (not settings.admin_token or current_user.username not in settings.admin_users
+            or not secrets.compare_digest((x_admin_token or "").encode(), settings.admin_token.encode())):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
@@ -0,0 +1,19 @@
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+
+def get_expected_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """
+    Version attendue envoyée par le client (en-tête If-Match : 3, "3" ou W/"3")
+    Sans en-tête, le serveur utilise la version lue pendant la requête
+    """
+    if if_match is None:
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a version number")
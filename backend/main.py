@@ -1,15 +1,66 @@
 import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import Base, engine
-from routers import poker, wheel, websocket
+from config import settings
+from database import init_db, warm_up, dispose_engine, replicas
+from routers import poker, wheel, websocket, events, metrics, admin
+from services.round_timer import restore_round_timers
+from utils.idempotency import IdempotencyMiddleware, IdempotencyStore
+from utils.logging_config import configure_logging, stop_logging
+from utils.metrics import MetricsMiddleware
+from utils.responses import fast_json_options
+from utils.scheduler import scheduler
+from utils.sql_profiler import SQLProfilerMiddleware
+from utils.websocket_manager import manager, drain_worker
+
+logger = logging.getLogger(__name__)
 
 
-logging.basicConfig(level=logging.INFO)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage / arrêt du worker
+    - Configuration unique du logging (file + thread d'écriture, voir utils/logging_config.py)
+    - Schéma (si auto_create_schema, sinon `python manage.py init-db`)
+    - Préchauffage du pool et des mappers avant la première requête
+    - Vérification périodique des réplicas en lecture (si configurés)
+    - Tâche unique de heartbeat des WebSockets
+    - Premier chargement de chaque session partagé pendant les reconnexions
+    - Planificateur unique des rounds en temps limité (minuteries rechargées depuis la base)
+    - À l'arrêt : drain des WebSockets et flux SSE (reconnexions étalées, voir utils/ws_protocol.py)
+    """
+    configure_logging(settings.log_level, settings.log_format, settings.log_sample_every)
+    if settings.auto_create_schema:
+        init_db()
+    warm_up()
+    replicas.start_health_checks(settings.db_replica_health_interval)
+    manager.start_reaper(settings.ws_heartbeat_interval, settings.ws_heartbeat_timeout)
+    poker.session_snapshots.start()
+    scheduler.start()
+    restore_round_timers()
+    yield
+    await drain_worker()
+    await scheduler.stop()
+    await manager.stop_reaper()
+    await replicas.stop_health_checks()
+    dispose_engine()
+    stop_logging()
 
-app = FastAPI(title="Agile Tools API", version="2.0")
-logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Agile Tools API", version="2.0", lifespan=lifespan, **fast_json_options())
+
+# Idempotency-Key : une requête renvoyée par un client reçoit la réponse enregistrée
+# (ajouté avant CORS, donc à l'intérieur : ses réponses 400/422 ont les en-têtes CORS)
+if settings.idempotency_enabled:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=IdempotencyStore(settings.idempotency_max_entries, settings.idempotency_ttl,
+                               settings.idempotency_persistent, settings.idempotency_max_bytes,
+                               settings.idempotency_max_body_bytes),
+    )
 
 # CORS
 app.add_middleware(
@@ -18,29 +69,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "X-DB-Time", "Idempotent-Replayed"],
 )
 
-# Créer les tables
-Base.metadata.create_all(bind=engine)
+# Instrumentation (latence par route, requêtes SQL par requête)
+if settings.sql_profiler_enabled or settings.sql_debug_headers:
+    app.add_middleware(
+        SQLProfilerMiddleware,
+        slow_ms=settings.sql_slow_request_ms,
+        slow_statements=settings.sql_slow_request_statements,
+        debug_headers=settings.sql_debug_headers,
+    )
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 # Inclure les routers
 app.include_router(poker.router)
 app.include_router(wheel.router)
 app.include_router(websocket.router)
+app.include_router(events.router)
+if settings.metrics_enabled:
+    app.include_router(metrics.router)
+# Diagnostic (profilage, mémoire) : rien n'est monté ni actif sans profiling_enabled
+if settings.profiling_enabled:
+    app.include_router(admin.router)
 
 @app.get("/")
 def root():
     return {"message": "Agile Tools API", "version": "2.0"}
 
+@app.get("/health")
+def health():
+    """État du worker et des réplicas en lecture (dernière vérification)"""
+    return {"status": "ok", "replicas": replicas.status()}
+
 if __name__ == "__main__":
     import uvicorn
 
     host = "0.0.0.0"
     port = 8000
 
-    logger.info(f"🚀 Starting FastAPI server on {host}:{port}")
-    logger.info(f"✅ Backend available at: http://{host}:{port}")
-    logger.info(f"🔌 WebSocket server available at: ws://{host}:{port}")
+    configure_logging(settings.log_level, settings.log_format, settings.log_sample_every)
+    logger.info("🚀 Starting FastAPI server on %s:%s", host, port)
+    logger.info("✅ Backend available at: http://%s:%s", host, port)
+    logger.info("🔌 WebSocket server available at: ws://%s:%s", host, port)
+
+    from utils.ws_protocol import TunedDeflateWebSocketProtocol, DrainingHTTPProtocol
 
-    uvicorn.run(app, host=host, port=port)
+    uvicorn.run(
+        app, host=host, port=port,
+        ws=TunedDeflateWebSocketProtocol,
+        http=DrainingHTTPProtocol,
+        ws_max_size=settings.ws_max_message_bytes,
+        ws_per_message_deflate=settings.ws_deflate_enabled,
+    )
 
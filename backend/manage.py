@@ -0,0 +1,52 @@
+"""
+Commandes d'administration
+
+Usage (depuis backend/) :
+    python manage.py init-db
+    python manage.py rebuild-counters
+    python manage.py rebuild-search
+    python manage.py check-replicas
+"""
+import argparse
+
+from database import init_db, get_engine, SessionLocal, replicas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agile Tools administration")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("init-db", help="Créer les tables et colonnes manquantes")
+    subparsers.add_parser("rebuild-counters", help="Recalculer les compteurs de participants et de votes")
+    subparsers.add_parser("rebuild-search", help="Reconstruire l'index de recherche plein texte")
+    subparsers.add_parser("check-replicas", help="Vérifier les réplicas en lecture configurés")
+    args = parser.parse_args()
+
+    if args.command == "init-db":
+        for table, column in init_db():
+            print(f"Added column {table}.{column}")
+        print("Database schema is up to date")
+    elif args.command == "rebuild-counters":
+        from services.poker_service import PokerService
+        db = SessionLocal()
+        try:
+            PokerService.rebuild_counters(db)
+        finally:
+            db.close()
+        print("Counters rebuilt")
+    elif args.command == "rebuild-search":
+        from services.search_service import SearchService
+        backend = SearchService.rebuild(get_engine())
+        print(f"Search index rebuilt ({backend})")
+    elif args.command == "check-replicas":
+        if not replicas:
+            print("No read replica configured (DATABASE_REPLICA_URLS)")
+        replicas.check()
+        for status in replicas.status():
+            state = "healthy" if status["healthy"] else f"unhealthy ({status['error']})"
+            lag = f", lag {status['lag_seconds']:.1f}s" if status["lag_seconds"] is not None else ""
+            print(f"{status['url']}: {state}{lag}")
+        replicas.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from .user import User
 from .poker import PokerSession, PokerParticipant, PokerRound, PokerVote
 from .wheel import WheelConfig, WheelResult
+from .idempotency import IdempotencyRecord
 
 __all__ = [
     "User",
@@ -9,5 +10,6 @@ __all__ = [
     "PokerRound",
     "PokerVote",
     "WheelConfig",
-    "WheelResult"
+    "WheelResult",
+    "IdempotencyRecord"
 ]
\ No newline at end of file
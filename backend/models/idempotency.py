@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, LargeBinary
+from database import Base
+
+
+class IdempotencyRecord(Base):
+    """Réponse enregistrée pour une clé d'idempotence (persistance optionnelle)"""
+    __tablename__ = "idempotency_keys"
+    # sha256 de (utilisateur, Idempotency-Key)
+    key = Column(String(64), primary_key=True)
+    # sha256 de la requête (méthode, chemin, corps) : une clé ne sert qu'à une requête
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    headers = Column(Text, nullable=False)  # JSON [[nom, valeur], ...]
+    body = Column(LargeBinary, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import (
+    Column, Integer, SmallInteger, String, Boolean, DateTime, ForeignKey, Text, UniqueConstraint, Enum as SQLEnum
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -14,6 +16,13 @@ class PokerSession(Base):
     creator_id = Column(Integer, ForeignKey("users.id"))
     status = Column(SQLEnum(SessionStatus), default=SessionStatus.ACTIVE)
     is_revealed = Column(Boolean, default=False)
+    # Jeu de cartes (utils.decks) : type, et cartes (JSON) pour un jeu personnalisé
+    deck = Column(String, default="fibonacci", server_default="fibonacci", nullable=False)
+    deck_cards = Column(Text, nullable=True)
+    # Compteur maintenu par PokerService (join_session) : évite un COUNT à chaque vote
+    active_participants = Column(Integer, default=0, server_default="0", nullable=False)
+    # Verrouillage optimiste : incrémentée à chaque action du facilitateur
+    version = Column(Integer, default=1, server_default="1", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
@@ -42,6 +51,14 @@ class PokerRound(Base):
     round_number = Column(Integer)
     story_title = Column(String, nullable=True)
     final_estimate = Column(String, nullable=True)
+    # Compteur maintenu par PokerService (cast_vote, reset_votes)
+    votes_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Fin du temps imparti (UTC), révélation automatique à l'échéance
+    deadline = Column(DateTime, nullable=True)
+    # Durée du temps imparti : relancée à la réinitialisation des votes
+    timebox_seconds = Column(Integer, nullable=True)
+    # Verrouillage optimiste : incrémentée à chaque modification du round
+    version = Column(Integer, default=1, server_default="1", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
 
@@ -50,11 +67,15 @@ class PokerRound(Base):
 
 class PokerVote(Base):
     __tablename__ = "poker_votes"
+    # Un vote par utilisateur et par round : votes_count reste exact face aux
+    # premiers votes concurrents d'un même utilisateur (PokerService.cast_vote)
+    __table_args__ = (UniqueConstraint("round_id", "user_id", name="uq_poker_votes_round_user"),)
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("poker_sessions.id"))
     round_id = Column(Integer, ForeignKey("poker_rounds.id"), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    vote_value = Column(String)
+    # Indice de la carte dans le jeu de la session (utils.decks.session_deck)
+    card_index = Column(SmallInteger, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
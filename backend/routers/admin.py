@@ -0,0 +1,140 @@
+import os
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from dependencies.auth import get_admin_user
+from models.user import User
+from routers.websocket import session_buckets, coalescer
+from schemas.admin import MemoryTraceResponse, MemoryDiffResponse, SessionMemoryResponse
+from schemas.common import MessageResponse
+from utils.decks import cached_session_decks
+from utils.profiling import ProfilerBusy, deep_sizeof, memory_tracer, profiler
+from utils.scheduler import scheduler
+from utils.websocket_manager import manager
+
+# Monté seulement si settings.profiling_enabled (voir main.py)
+router = APIRouter(prefix="/api/admin/profiling", tags=["Profiling"])
+
+TRACEMALLOC_TIMER = ("profiling", "tracemalloc")
+
+
+@router.post("/cpu", response_class=PlainTextResponse)
+async def profile_cpu(
+        seconds: float = Query(10.0, gt=0, description="Durée de la mesure"),
+        interval_ms: float = Query(5.0, ge=1, le=1000, description="Intervalle entre deux échantillons"),
+        current_user: User = Depends(get_admin_user)
+):
+    """
+    Profiler le worker par échantillonnage pendant `seconds` secondes
+    - Piles de tous les threads (boucle asyncio, threadpool, listener de logs...)
+    - Résultat au format collapsed stacks (flamegraph.pl, speedscope, inferno)
+    - Une seule mesure à la fois (409 sinon)
+    """
+    if seconds > settings.profiling_max_seconds:
+        raise HTTPException(status_code=422, detail=f"At most {settings.profiling_max_seconds:g} seconds")
+    try:
+        stacks, samples = await run_in_threadpool(profiler.run, seconds, interval_ms / 1000)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A CPU profile is already running")
+
+    filename = f"profile-{os.getpid()}-{int(time.time())}.collapsed"
+    return PlainTextResponse(profiler.collapse(stacks), headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Samples": str(samples),
+    })
+
+
+async def _stop_memory_trace():
+    memory_tracer.stop()
+
+
+@router.post("/memory/start", response_model=MemoryTraceResponse)
+async def start_memory_trace(
+        frames: int = Query(10, ge=1, le=50, description="Profondeur des piles d'allocation"),
+        current_user: User = Depends(get_admin_user)
+):
+    """
+    Démarrer tracemalloc et prendre l'instantané de référence
+    - Ralentit les allocations tant qu'il est actif : arrêt automatique
+      après profiling_tracemalloc_timeout secondes
+    """
+    await run_in_threadpool(memory_tracer.start, frames)
+    scheduler.schedule(TRACEMALLOC_TIMER, settings.profiling_tracemalloc_timeout, _stop_memory_trace)
+    return {
+        "message": "Memory tracing started",
+        "frames": frames,
+        "expires_in": settings.profiling_tracemalloc_timeout
+    }
+
+
+@router.post("/memory/snapshot", response_model=MemoryDiffResponse)
+async def snapshot_memory_trace(
+        limit: int = Query(30, ge=1, le=500),
+        group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+        current_user: User = Depends(get_admin_user)
+):
+    """
+    Nouvel instantané, comparé au précédent (ou à celui du démarrage)
+    - Plus grosses variations d'abord
+    - L'instantané devient la référence de l'appel suivant
+    """
+    if not memory_tracer.active:
+        raise HTTPException(status_code=400, detail="Memory tracing is not started")
+    return await run_in_threadpool(memory_tracer.snapshot, limit, group_by)
+
+
+@router.delete("/memory", response_model=MessageResponse)
+async def stop_memory_trace(current_user: User = Depends(get_admin_user)):
+    """
+    Arrêter tracemalloc et oublier les instantanés
+    """
+    scheduler.cancel(TRACEMALLOC_TIMER)
+    if not memory_tracer.stop():
+        return {"message": "Memory tracing was not started"}
+    return {"message": "Memory tracing stopped"}
+
+
+@router.get("/sessions", response_model=SessionMemoryResponse)
+async def session_memory(
+        limit: int = Query(50, ge=1, le=1000),
+        current_user: User = Depends(get_admin_user)
+):
+    """
+    Mémoire occupée par session dans ce worker (estimation, plus grosses d'abord)
+    - WebSockets, événements en attente de regroupement, canal SSE (tampon de reprise)
+    - Seau de limitation de débit, messages en attente de fusion, jeu de cartes en cache
+      (un jeu prédéfini est partagé par toutes ses sessions)
+    Calculé dans la boucle asyncio : état cohérent, non modifié pendant le parcours
+    """
+    parts_by_session = {}
+    for code, state in manager.session_state().items():
+        parts_by_session.setdefault(code, {}).update(state)
+    for code, bucket in session_buckets.buckets().items():
+        parts_by_session.setdefault(code, {})["rate_limit"] = bucket
+    for code, pending in coalescer.pending_by_session().items():
+        parts_by_session.setdefault(code, {})["coalesced_messages"] = pending
+    for code, deck in cached_session_decks().items():
+        parts_by_session.setdefault(code, {})["deck"] = deck
+
+    sessions = []
+    for code, parts in parts_by_session.items():
+        sizes = {name: deep_sizeof(value) for name, value in parts.items() if value is not None}
+        channel = parts.get("sse_channel")
+        sessions.append({
+            "session_code": code,
+            "websockets": len(parts.get("websockets") or ()),
+            "sse_observers": len(channel.observers) if channel is not None else 0,
+            "total_bytes": sum(sizes.values()),
+            "parts": sizes,
+        })
+    sessions.sort(key=lambda entry: entry["total_bytes"], reverse=True)
+
+    return {
+        "sessions_count": len(sessions),
+        "total_bytes": sum(entry["total_bytes"] for entry in sessions),
+        "sessions": sessions[:limit]
+    }
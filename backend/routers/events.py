@@ -0,0 +1,28 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from routers.websocket import session_exists
+from utils.event_stream import EventStreamResponse
+from utils.websocket_manager import manager
+
+router = APIRouter(prefix="/api/poker", tags=["Planning Poker - events"])
+
+
+@router.get("/sessions/{session_code}/events")
+async def session_events(session_code: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Flux Server-Sent Events d'une session, pour les observateurs en lecture seule
+    (tableaux de bord, écrans d'équipe) : mêmes événements que le WebSocket
+    - Reprise avec l'en-tête Last-Event-ID (envoyé automatiquement par EventSource)
+    - Événement `resync` si la reprise est impossible : recharger la session
+    - Événement `server_draining` à l'arrêt du worker, avant la fin du flux
+    """
+    if not await run_in_threadpool(session_exists, session_code):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return EventStreamResponse(
+        manager.streams, session_code, last_event_id,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,25 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
 
-from database import get_db
+from config import settings
+from database import get_db, get_read_db
 from dependencies.auth import get_current_user
+from dependencies.concurrency import get_expected_version
 from models.user import User
-from models.poker import PokerSession, PokerParticipant, PokerRound, PokerVote
+from schemas.common import MessageResponse
 from schemas.poker import (
     PokerSessionCreate,
+    PokerSessionBulkCreate,
+    PokerSessionBulkResponse,
+    PokerSessionResponse,
+    PokerSessionListItemResponse,
+    PokerSessionDetailResponse,
     PokerVoteCreate,
+    PokerVoteResponse,
+    PokerParticipantResponse,
     PokerRoundCreate,
-    PokerRoundComplete
+    PokerRoundComplete,
+    PokerNewRoundResponse,
+    PokerActionResponse,
+    PokerTimerUpdate,
+    PokerTimerResponse,
+    PokerSearchResult,
+    PokerSearchResponse
 )
 from services.poker_service import PokerService
+from services.search_service import SearchService
+from services.round_timer import schedule_round, cancel_round
+from utils.decks import session_deck, forget_session_deck
+from utils.single_flight import WarmupSingleFlight
 from utils.websocket_manager import manager 
 
 router = APIRouter(prefix="/api/poker", tags=["Planning Poker"])
 
+# Reconnexion de toute une salle après un redémarrage : le premier chargement
+# de chaque session est partagé par les requêtes concurrentes (fenêtre ouverte
+# par le lifespan) ; ensuite chaque requête lit elle-même l'état à jour
+session_snapshots = WarmupSingleFlight(settings.ws_reconnect_coalesce_window)
+
 
-@router.post("/sessions")
+@router.post("/sessions", response_model=PokerSessionResponse)
 def create_poker_session(
         session_data: PokerSessionCreate,
         current_user: User = Depends(get_current_user),
@@ -30,107 +57,167 @@ def create_poker_session(
     - Crée automatiquement le premier round
     - Ajoute le créateur comme facilitateur
     """
-    session = PokerService.create_session(
+    return PokerService.create_session(
         db,
         session_data.title,
         session_data.description,
-        current_user
+        current_user,
+        session_data.deck,
+        session_data.deck_cards
     )
 
-    return {
-        "id": session.id,
-        "session_code": session.session_code,
-        "title": session.title,
-        "description": session.description,
-        "status": session.status
-    }
+
+@router.post("/sessions/bulk", response_model=PokerSessionBulkResponse)
+def create_poker_sessions_bulk(
+        bulk_data: PokerSessionBulkCreate,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Créer plusieurs sessions en une transaction (ex. une session par équipe au PI planning)
+    - Chaque session a son facilitateur (par défaut l'auteur de la requête) et son premier round
+    - Tout ou rien : aucune session n'est créée en cas d'erreur
+    - Retourne les codes créés et le temps passé par session
+    """
+    if len(bulk_data.sessions) > settings.poker_bulk_max_sessions:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.poker_bulk_max_sessions} sessions can be created at once"
+        )
+
+    start = time.perf_counter()
+    sessions = PokerService.create_sessions_bulk(db, bulk_data.sessions, current_user)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    return PokerSessionBulkResponse(
+        created=len(sessions),
+        elapsed_ms=round(elapsed_ms, 2),
+        ms_per_session=round(elapsed_ms / len(sessions), 3),
+        sessions=sessions
+    )
 
 
-@router.get("/sessions")
+@router.get("/sessions", response_model=List[PokerSessionListItemResponse])
 def get_my_sessions(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """
     Récupérer toutes les sessions créées par l'utilisateur
     """
-    sessions = db.query(PokerSession).filter(
-        PokerSession.creator_id == current_user.id
-    ).order_by(PokerSession.created_at.desc()).all()
-
-    return [{
-        "id": s.id,
-        "session_code": s.session_code,
-        "title": s.title,
-        "description": s.description,
-        "status": s.status,
-        "created_at": s.created_at.isoformat(),
-        "completed_at": s.completed_at.isoformat() if s.completed_at else None,
-        "rounds_count": len(s.rounds)
-    } for s in sessions]
-
-
-@router.get("/sessions/{session_code}")
-def get_poker_session(
-        session_code: str,
+    return PokerService.list_user_sessions(db, current_user)
+
+
+@router.get("/search", response_model=PokerSearchResponse)
+def search_sessions(
+        q: str = Query(..., min_length=1, max_length=200, description="Mots recherchés"),
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=50),
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """
-    Récupérer les détails complets d'une session
-    - Auto-join si l'utilisateur n'est pas déjà participant
-    - Retourne les votes, participants, et historique
+    Rechercher dans les sessions de l'utilisateur (titre, description, stories)
+    - Tous les mots doivent apparaître, le dernier peut être incomplet
+    - Résultats classés par pertinence, avec les rounds correspondants
     """
-    data = PokerService.get_session_details(db, session_code, current_user)
+    hits = SearchService.search(db, current_user, q, limit=page_size + 1, offset=(page - 1) * page_size)
+    results = [
+        PokerSearchResult(
+            session_code=hit["session"].session_code,
+            title=hit["session"].title,
+            description=hit["session"].description,
+            status=hit["session"].status,
+            created_at=hit["session"].created_at,
+            score=hit["score"],
+            rounds=hit["rounds"]
+        )
+        for hit in hits[:page_size]
+    ]
+    return PokerSearchResponse(
+        query=q,
+        page=page,
+        page_size=page_size,
+        has_more=len(hits) > page_size,
+        results=results
+    )
 
-    session = data["session"]
-    current_round = data["current_round"]
-    votes = data["votes"]
-    participants = data["participants"]
-    completed_rounds = data["completed_rounds"]
-
-    # Formater les votes
-    vote_data = [{
-        "user": v.user.username,
-        "value": v.vote_value if session.is_revealed else "hidden",
-        "voted_at": v.created_at.isoformat()
-    } for v in votes]
-
-    # Formater les participants
-    participant_data = [{
-        "username": p.user.username,
-        "role": p.role,
-        "has_voted": any(v.user_id == p.user_id for v in votes)
-    } for p in participants]
-
-    # Formater l'historique
-    rounds_history = [{
-        "round_number": r.round_number,
-        "story_title": r.story_title,
-        "final_estimate": r.final_estimate,
-        "completed_at": r.completed_at.isoformat()
-    } for r in completed_rounds]
 
-    return {
-        "id": session.id,
-        "session_code": session.session_code,
-        "title": session.title,
-        "description": session.description,
-        "status": session.status,
-        "is_revealed": session.is_revealed,
-        "creator_id": session.creator_id,
-        "current_round": {
-            "round_number": current_round.round_number if current_round else 0,
-            "story_title": current_round.story_title if current_round else None
-        } if current_round else None,
-        "votes": vote_data,
-        "participants": participant_data,
-        "rounds_history": rounds_history,
-        "created_at": session.created_at.isoformat()
-    }
+def _build_session_detail(db: Session, session_code: str) -> PokerSessionDetailResponse:
+    """Réponse détaillée d'une session (ne dépend pas de l'utilisateur)"""
+    session = PokerService.get_session(db, session_code)
+    data = PokerService.load_session_snapshot(db, session)
+
+    votes = data["votes"]
+    voter_ids = {v.user_id for v in votes}
+    deck = session_deck(session)
+
+    return PokerSessionDetailResponse(
+        id=session.id,
+        session_code=session.session_code,
+        title=session.title,
+        description=session.description,
+        status=session.status,
+        is_revealed=session.is_revealed,
+        creator_id=session.creator_id,
+        version=session.version,
+        deck=deck.to_dict(),
+        current_round=data["current_round"],
+        votes=[PokerVoteResponse(
+            user=v.user.username,
+            value=(deck.card(v.card_index) or "?") if session.is_revealed else "hidden",
+            voted_at=v.created_at
+        ) for v in votes],
+        statistics=deck.statistics(v.card_index for v in votes) if session.is_revealed and votes else None,
+        participants=[PokerParticipantResponse(
+            username=p.user.username,
+            role=p.role,
+            has_voted=p.user_id in voter_ids
+        ) for p in data["participants"]],
+        rounds_history=data["completed_rounds"],
+        created_at=session.created_at
+    )
 
 
-@router.post("/sessions/{session_code}/join")
+@router.get("/sessions/{session_code}", response_model=PokerSessionDetailResponse)
+def get_poker_session(
+        session_code: str,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db),
+        read_db: Session = Depends(get_read_db)
+):
+    """
+    Récupérer les détails complets d'une session
+    - Lecture sur un réplica si disponible (get_read_db)
+    - Auto-join si l'utilisateur n'est pas déjà participant (sur le primaire)
+    - Retourne les votes, participants, et historique
+    - Après un redémarrage, les requêtes concurrentes partagent le premier chargement
+      de la session (même base) ; pas de partage pendant la fenêtre de lecture de
+      ses propres écritures (un chargement déjà en cours a pu commencer avant)
+    """
+    try:
+        if read_db.info.get("read_your_writes"):
+            detail = _build_session_detail(read_db, session_code)
+        else:
+            detail = session_snapshots.do(
+                (session_code, id(read_db.get_bind())), lambda: _build_session_detail(read_db, session_code)
+            )
+    except HTTPException as error:
+        if error.status_code != 404 or read_db.get_bind() is db.get_bind():
+            raise
+        # Session créée sur le primaire, pas encore répliquée
+        detail = _build_session_detail(db, session_code)
+
+    if not any(p.username == current_user.username for p in detail.participants):
+        # Auto-join : rechargement dédié uniquement si la participation a changé
+        session = PokerService.get_session(db, session_code)
+        if PokerService.join_session(db, session, current_user):
+            detail = _build_session_detail(db, session_code)
+
+    return detail
+
+
+@router.post("/sessions/{session_code}/join", response_model=MessageResponse)
 def join_poker_session(
         session_code: str,
         current_user: User = Depends(get_current_user),
@@ -150,7 +237,12 @@ def join_poker_session(
     return {"message": "Joined session successfully"}
 
 
-@router.post("/sessions/{session_code}/vote")
+# Les endpoints asynchrones (broadcast WebSocket) font leurs accès base dans le
+# threadpool : exécutés dans la boucle, ils la bloqueraient en attendant une
+# connexion du pool que seule la boucle peut libérer (QueuePool timeout)
+
+
+@router.post("/sessions/{session_code}/vote", response_model=MessageResponse)
 async def cast_vote(
         session_code: str,
         vote_data: PokerVoteCreate,
@@ -160,150 +252,243 @@ async def cast_vote(
     """
     Enregistrer un vote pour le round actuel
     - Broadcast via WebSocket pour mise à jour temps réel
+    - Round en temps limité : révélation automatique dès que tous les participants
+      actifs ont voté (sinon, le facilitateur révèle)
     """
-    session = PokerService.get_session(db, session_code)
-    PokerService.cast_vote(db, session, vote_data.vote_value, current_user)
+    def vote():
+        username = current_user.username
+        session = PokerService.get_session(db, session_code)
+        current_round = PokerService.cast_vote(db, session, vote_data.vote_value, current_user)
+        revealed = (current_round.deadline is not None
+                    and PokerService.all_voted(session, current_round)
+                    and PokerService.reveal_if_hidden(db, session.id))
+        return username, current_round.round_number, revealed
 
-    # Récupérer le round actuel pour le broadcast
-    current_round = db.query(PokerRound).filter(
-        PokerRound.session_id == session.id,
-        PokerRound.completed_at == None
-    ).order_by(PokerRound.round_number.desc()).first()
+    username, round_number, revealed = await run_in_threadpool(vote)
 
     # Broadcast via WebSocket
     await manager.broadcast({
         "type": "vote_cast",
-        "username": current_user.username,
-        "round_number": current_round.round_number if current_round else 0
+        "username": username,
+        "round_number": round_number
     }, session_code)
 
+    if revealed:
+        cancel_round(session_code)
+        await manager.broadcast({
+            "type": "votes_revealed",
+            "reason": "all_voted"
+        }, session_code)
+
     return {"message": "Vote recorded"}
 
 
-@router.post("/sessions/{session_code}/reveal")
+@router.post("/sessions/{session_code}/reveal", response_model=PokerActionResponse)
 async def reveal_votes(
         session_code: str,
         current_user: User = Depends(get_current_user),
+        expected_version: int = Depends(get_expected_version),
         db: Session = Depends(get_db)
 ):
     """
     Révéler tous les votes du round actuel
     - Réservé au facilitateur uniquement
+    - If-Match optionnel : version de la session attendue (409 si elle a changé)
     """
-    session = PokerService.get_session(db, session_code)
-    PokerService.verify_facilitator(session, current_user)
-    PokerService.reveal_votes(db, session)
+    def reveal():
+        session = PokerService.get_session(db, session_code)
+        PokerService.verify_facilitator(session, current_user)
+        return PokerService.reveal_votes(db, session, expected_version)
+
+    version = await run_in_threadpool(reveal)
+    cancel_round(session_code)
 
     # Broadcast via WebSocket
     await manager.broadcast({
         "type": "votes_revealed"
     }, session_code)
 
-    return {"message": "Votes revealed"}
+    return {"message": "Votes revealed", "version": version}
 
 
-@router.post("/sessions/{session_code}/reset")
+@router.post("/sessions/{session_code}/reset", response_model=PokerActionResponse)
 async def reset_votes(
         session_code: str,
         current_user: User = Depends(get_current_user),
+        expected_version: int = Depends(get_expected_version),
         db: Session = Depends(get_db)
 ):
     """
     Réinitialiser les votes du round actuel
     - Réservé au facilitateur uniquement
     - Supprime tous les votes et masque les résultats
+    - Round en temps limité : le temps imparti repart de zéro
+    - If-Match optionnel : version de la session attendue (409 si elle a changé)
     """
-    session = PokerService.get_session(db, session_code)
-    PokerService.verify_facilitator(session, current_user)
-    PokerService.reset_votes(db, session)
+    def reset():
+        session = PokerService.get_session(db, session_code)
+        PokerService.verify_facilitator(session, current_user)
+        version, current_round = PokerService.reset_votes(db, session, expected_version)
+        if current_round is None:
+            return version, None, None
+        return version, current_round.id, current_round.deadline
+
+    version, round_id, deadline = await run_in_threadpool(reset)
+
+    if deadline:
+        schedule_round(session_code, round_id, deadline)
+    else:
+        cancel_round(session_code)
 
     # Broadcast via WebSocket
     await manager.broadcast({
-        "type": "votes_reset"
+        "type": "votes_reset",
+        "deadline": deadline.isoformat() if deadline else None
     }, session_code)
 
-    return {"message": "Votes reset"}
+    return {"message": "Votes reset", "version": version}
 
 
-@router.post("/sessions/{session_code}/rounds")
+@router.post("/sessions/{session_code}/rounds", response_model=PokerNewRoundResponse)
 async def start_new_round(
         session_code: str,
         round_data: PokerRoundCreate,
         current_user: User = Depends(get_current_user),
+        expected_version: int = Depends(get_expected_version),
         db: Session = Depends(get_db)
 ):
     """
     Démarrer un nouveau round d'estimation
     - Réservé au facilitateur uniquement
     - Incrémente automatiquement le numéro de round
+    - Temps imparti optionnel : révélation automatique à l'échéance
+    - If-Match optionnel : version de la session attendue (409 si elle a changé)
     """
+    def start():
+        session = PokerService.get_session(db, session_code)
+        PokerService.verify_facilitator(session, current_user)
+        new_round = PokerService.start_round(
+            db, session, round_data.story_title, round_data.timebox_seconds, expected_version
+        )
+        return {
+            "id": new_round.id,
+            "round_number": new_round.round_number,
+            "story_title": new_round.story_title,
+            "deadline": new_round.deadline,
+            "version": session.version
+        }
+
+    new_round = await run_in_threadpool(start)
+
+    if new_round["deadline"]:
+        schedule_round(session_code, new_round["id"], new_round["deadline"])
+    else:
+        cancel_round(session_code)
+
+    # Broadcast via WebSocket
+    await manager.broadcast({
+        "type": "new_round",
+        "round_number": new_round["round_number"],
+        "story_title": new_round["story_title"],
+        "deadline": new_round["deadline"].isoformat() if new_round["deadline"] else None
+    }, session_code)
+
+    return {**new_round, "message": "New round started"}
+
+
+def _set_timer(db: Session, session_code: str, current_user: User, seconds) -> tuple:
+    """Fixer ou supprimer l'échéance du round actuel -> (id, numéro, échéance)"""
     session = PokerService.get_session(db, session_code)
     PokerService.verify_facilitator(session, current_user)
 
-    # Obtenir le numéro du prochain round
-    last_round = db.query(PokerRound).filter(
-        PokerRound.session_id == session.id
-    ).order_by(PokerRound.round_number.desc()).first()
+    current_round = PokerService.get_current_round(db, session)
+    if not current_round:
+        raise HTTPException(status_code=400, detail="No active round")
+
+    PokerService.set_round_deadline(db, current_round, seconds)
+    return current_round.id, current_round.round_number, current_round.deadline
 
-    next_round_number = (last_round.round_number + 1) if last_round else 1
 
-    # Créer le nouveau round
-    new_round = PokerRound(
-        session_id=session.id,
-        round_number=next_round_number,
-        story_title=round_data.story_title or f"Round {next_round_number}"
+@router.post("/sessions/{session_code}/timer", response_model=PokerTimerResponse)
+async def start_round_timer(
+        session_code: str,
+        timer_data: PokerTimerUpdate,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Démarrer ou replanifier le temps imparti du round actuel
+    - Réservé au facilitateur uniquement
+    - Les votes sont révélés automatiquement à l'échéance
+    """
+    round_id, round_number, deadline = await run_in_threadpool(
+        _set_timer, db, session_code, current_user, timer_data.seconds
     )
-    db.add(new_round)
+    schedule_round(session_code, round_id, deadline)
 
-    # Masquer les votes et réinitialiser l'état
-    session.is_revealed = False
+    await manager.broadcast({
+        "type": "round_timer",
+        "round_number": round_number,
+        "deadline": deadline.isoformat()
+    }, session_code)
 
-    db.commit()
-    db.refresh(new_round)
+    return {
+        "round_number": round_number,
+        "deadline": deadline,
+        "message": "Timer started"
+    }
+
+
+@router.delete("/sessions/{session_code}/timer", response_model=PokerTimerResponse)
+async def cancel_round_timer(
+        session_code: str,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Annuler le temps imparti du round actuel
+    - Réservé au facilitateur uniquement
+    """
+    _, round_number, _ = await run_in_threadpool(_set_timer, db, session_code, current_user, None)
+    cancel_round(session_code)
 
-    # Broadcast via WebSocket
     await manager.broadcast({
-        "type": "new_round",
-        "round_number": new_round.round_number,
-        "story_title": new_round.story_title
+        "type": "round_timer",
+        "round_number": round_number,
+        "deadline": None
     }, session_code)
 
     return {
-        "round_number": new_round.round_number,
-        "story_title": new_round.story_title,
-        "message": "New round started"
+        "round_number": round_number,
+        "deadline": None,
+        "message": "Timer cancelled"
     }
 
 
-@router.post("/sessions/{session_code}/rounds/{round_number}/complete")
+@router.post("/sessions/{session_code}/rounds/{round_number}/complete", response_model=PokerActionResponse)
 async def complete_round(
         session_code: str,
         round_number: int,
         round_complete: PokerRoundComplete,
         current_user: User = Depends(get_current_user),
+        expected_version: int = Depends(get_expected_version),
         db: Session = Depends(get_db)
 ):
     """
     Clôturer un round avec l'estimation finale
     - Réservé au facilitateur uniquement
     - Sauvegarde l'estimation convenue par l'équipe
+    - If-Match optionnel : version du round attendue (409 si elle a changé)
     """
-    session = PokerService.get_session(db, session_code)
-    PokerService.verify_facilitator(session, current_user)
-
-    # Récupérer le round
-    round_obj = db.query(PokerRound).filter(
-        PokerRound.session_id == session.id,
-        PokerRound.round_number == round_number
-    ).first()
+    def complete():
+        session = PokerService.get_session(db, session_code)
+        PokerService.verify_facilitator(session, current_user)
+        round_obj = PokerService.complete_round(
+            db, session, round_number, round_complete.final_estimate, expected_version
+        )
+        return round_obj.version
 
-    if not round_obj:
-        raise HTTPException(status_code=404, detail="Round not found")
-
-    # Clôturer le round
-    round_obj.final_estimate = round_complete.final_estimate
-    round_obj.completed_at = datetime.utcnow()
-    db.commit()
+    version = await run_in_threadpool(complete)
 
     # Broadcast via WebSocket
     await manager.broadcast({
@@ -312,10 +497,10 @@ async def complete_round(
         "final_estimate": round_complete.final_estimate
     }, session_code)
 
-    return {"message": "Round completed"}
+    return {"message": "Round completed", "version": version}
 
 
-@router.post("/sessions/{session_code}/complete")
+@router.post("/sessions/{session_code}/complete", response_model=MessageResponse)
 def complete_session(
         session_code: str,
         current_user: User = Depends(get_current_user),
@@ -332,11 +517,12 @@ def complete_session(
     session.status = "completed"
     session.completed_at = datetime.utcnow()
     db.commit()
+    cancel_round(session_code)
 
     return {"message": "Session completed"}
 
 
-@router.delete("/sessions/{session_code}")
+@router.delete("/sessions/{session_code}", response_model=MessageResponse)
 def delete_session(
         session_code: str,
         current_user: User = Depends(get_current_user),
@@ -352,5 +538,7 @@ def delete_session(
 
     db.delete(session)
     db.commit()
+    forget_session_deck(session_code)
+    cancel_round(session_code)
 
     return {"message": "Session deleted"}
\ No newline at end of file
@@ -1,46 +1,135 @@
 from fastapi import WebSocket, WebSocketDisconnect, APIRouter
-from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 
-from database import engine
+from config import settings
+from database import SessionLocal
 from models.poker import PokerSession, PokerParticipant, PokerRound, PokerVote
 
+from utils.logging_config import sampled_logger
+from utils.metrics import WS_MESSAGES, WS_BYTES, WS_DROPPED
+from utils.rate_limit import TokenBucket, SessionBuckets, MessageCoalescer
 from utils.websocket_manager import manager 
+from utils.wire_format import negotiate_subprotocol, decode_message, message_size
 
 router = APIRouter(prefix="/ws", tags=["Web socket - database"])
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Fort volume : échantillonné (config.Settings.log_sample_every)
+message_logger = sampled_logger("ws.messages")
+
+# Limites de la boucle d'écho : un client à 100 msg/s dans une salle de 100
+# personnes représenterait sinon 10 000 envois/s
+ALLOWED_MESSAGE_TYPES = frozenset(settings.ws_allowed_message_types)
+COALESCED_MESSAGE_TYPES = frozenset(settings.ws_coalesced_message_types)
+session_buckets = SessionBuckets(settings.ws_session_rate, settings.ws_session_burst)
+coalescer = MessageCoalescer(settings.ws_coalesce_interval_ms / 1000, manager.broadcast)
+
+
+def _drop(reason: str) -> None:
+    WS_DROPPED.inc(reason)
+
+
+def session_exists(session_code: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(PokerSession.id).filter(
+            PokerSession.session_code == session_code
+        ).first() is not None
+    finally:
+        db.close()
+
+
 # WebSocket for real-time updates
 @router.websocket("/poker/{session_code}")
 async def websocket_endpoint(websocket: WebSocket, session_code: str, username: str = "Anonymous"):
-    db = SessionLocal()
-    try:
-        # Vérifier que la session existe
-        session = db.query(PokerSession).filter(PokerSession.session_code == session_code).first()
-        if not session:
-            await websocket.close(code=4004, reason="Session not found")
-            return
+    if manager.draining:
+        # Worker en cours d'arrêt : le client réessaiera sur un autre worker
+        await websocket.close(code=1012, reason="Server restart")
+        return
+
+    # Vérifier que la session existe, sans garder de connexion du pool
+    # pendant toute la durée de vie du socket (ni bloquer la boucle)
+    exists = await run_in_threadpool(session_exists, session_code)
 
-        await manager.connect(websocket, session_code, username)
+    if not exists:
+        await websocket.close(code=4004, reason="Session not found")
+        return
 
-        # Notifier les autres participants
-        await manager.broadcast({
-            "type": "user_joined",
-            "username": username
-        }, session_code)
+    client_bucket = TokenBucket(settings.ws_client_rate, settings.ws_client_burst)
+    connection = None
+
+    try:
+        # JSON par défaut, MessagePack si le client le propose (Sec-WebSocket-Protocol)
+        subprotocol = negotiate_subprotocol(websocket.scope.get("subprotocols", []))
+        already_connected = manager.is_connected(session_code, username)
+        connection = await manager.connect(websocket, session_code, username, subprotocol)
+
+        # Notifier les autres participants (pas pour un onglet supplémentaire)
+        if not already_connected:
+            await manager.broadcast({
+                "type": "user_joined",
+                "username": username
+            }, session_code)
 
         while True:
-            data = await websocket.receive_json()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(code=message.get("code", 1000))
+            manager.touch(connection)
+            size = message_size(message)
+            if size > settings.ws_max_message_bytes:
+                _drop("too_large")
+                await websocket.close(code=1009, reason="Message too large")
+                raise WebSocketDisconnect(code=1009)
+
+            try:
+                data = decode_message(message)
+            except ValueError:
+                _drop("invalid")
+                continue
+            message_type = data.get("type", "message") if isinstance(data, dict) else None
+            if message_type == "pong":
+                # Réponse au heartbeat du serveur, jamais rediffusée
+                continue
+            if message_type not in ALLOWED_MESSAGE_TYPES:
+                _drop("type")
+                continue
+
+            WS_MESSAGES.inc("in", message_type)
+            WS_BYTES.inc("in", message_type, amount=size)
+            message_logger.info("WebSocket message", extra={
+                "session_code": session_code, "message_type": message_type, "size": size
+            })
+
+            if message_type in COALESCED_MESSAGE_TYPES:
+                # Au plus un frame par type et par tick, dernier état par utilisateur
+                if client_bucket.allow():
+                    coalescer.add(session_code, message_type, username, data)
+                else:
+                    _drop("client_rate")
+                continue
+
+            if not client_bucket.allow():
+                _drop("client_rate")
+                continue
+            if not session_buckets.allow(session_code):
+                _drop("session_rate")
+                continue
+
             # Echo des messages pour le chat ou autres interactions
             await manager.broadcast({
-                "type": data.get("type", "message"),
+                "type": message_type,
                 "username": username,
                 "data": data
             }, session_code)
 
     except WebSocketDisconnect:
-        manager.disconnect(session_code, username)
-        await manager.broadcast({
-            "type": "user_left",
-            "username": username
-        }, session_code)
-    finally:
-        db.close()
\ No newline at end of file
+        if connection is None:
+            return
+        manager.disconnect(connection)
+        if session_code not in manager.active_connections:
+            session_buckets.discard(session_code)
+        if not manager.draining and not manager.is_connected(session_code, username):
+            await manager.broadcast({
+                "type": "user_left",
+                "username": username
+            }, session_code)
@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
 import json  # ✅ Import correct
 from sqlalchemy.orm import Session
+from typing import List
 from datetime import datetime
 
 from models.wheel import WheelConfig, WheelResult
-from schemas.wheel import WheelConfigCreate, WheelResultCreate
-from database import get_db
+from schemas.common import MessageResponse
+from schemas.wheel import WheelConfigCreate, WheelResultCreate, WheelConfigResponse, WheelResultResponse
+from database import get_db, get_read_db
 from dependencies.auth import get_current_user
 from models.user import User
 
 router = APIRouter(prefix="/api/wheel", tags=["Wheel of decision"])
 
 # Team Wheel endpoints
-@router.post("/configs")
+@router.post("/configs", response_model=WheelConfigResponse)
 def create_wheel_config(
         config_data: WheelConfigCreate,
         current_user: User = Depends(get_current_user),
@@ -26,21 +28,20 @@ def create_wheel_config(
     db.add(config)
     db.commit()
     db.refresh(config)
-    return {"id": config.id, "name": config.name, "items": json.loads(config.items)}
+    return config
 
-@router.get("/configs")
-def get_wheel_configs(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    configs = db.query(WheelConfig).filter(WheelConfig.creator_id == current_user.id).all()
-    return [{"id": c.id, "name": c.name, "items": json.loads(c.items), "created_at": c.created_at.isoformat()} for c in configs]
+@router.get("/configs", response_model=List[WheelConfigResponse])
+def get_wheel_configs(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
+    return db.query(WheelConfig).filter(WheelConfig.creator_id == current_user.id).all()
 
-@router.get("/configs/{config_id}")
-def get_wheel_config(config_id: int, db: Session = Depends(get_db)):
+@router.get("/configs/{config_id}", response_model=WheelConfigResponse)
+def get_wheel_config(config_id: int, db: Session = Depends(get_read_db)):
     config = db.query(WheelConfig).filter(WheelConfig.id == config_id).first()
     if not config:
         raise HTTPException(status_code=404, detail="Config not found")
-    return {"id": config.id, "name": config.name, "items": json.loads(config.items)}
+    return config
 
-@router.put("/configs/{config_id}")
+@router.put("/configs/{config_id}", response_model=WheelConfigResponse)
 def update_wheel_config(
         config_id: int,
         config_data: WheelConfigCreate,
@@ -60,9 +61,9 @@ def update_wheel_config(
     config.updated_at = datetime.utcnow()
     db.commit()
 
-    return {"id": config.id, "name": config.name, "items": json.loads(config.items)}
+    return config
 
-@router.delete("/configs/{config_id}")
+@router.delete("/configs/{config_id}", response_model=MessageResponse)
 def delete_wheel_config(
         config_id: int,
         current_user: User = Depends(get_current_user),
@@ -81,7 +82,7 @@ def delete_wheel_config(
 
     return {"message": "Config deleted"}
 
-@router.post("/results")
+@router.post("/results", response_model=MessageResponse)
 def save_wheel_result(
         result_data: WheelResultCreate,
         current_user: User = Depends(get_current_user),
@@ -95,9 +96,8 @@ def save_wheel_result(
     db.commit()
     return {"message": "Result saved"}
 
-@router.get("/configs/{config_id}/results")
-def get_wheel_results(config_id: int, db: Session = Depends(get_db)):
-    results = db.query(WheelResult).filter(
+@router.get("/configs/{config_id}/results", response_model=List[WheelResultResponse])
+def get_wheel_results(config_id: int, db: Session = Depends(get_read_db)):
+    return db.query(WheelResult).filter(
         WheelResult.config_id == config_id
     ).order_by(WheelResult.created_at.desc()).limit(20).all()
-    return [{"id": r.id, "selected_item": r.selected_item, "created_at": r.created_at.isoformat()} for r in results]
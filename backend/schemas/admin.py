@@ -0,0 +1,42 @@
+from pydantic import BaseModel
+from typing import Dict, List
+
+
+class MemoryTraceResponse(BaseModel):
+    """Schema de réponse au démarrage du traçage mémoire"""
+    message: str
+    frames: int
+    expires_in: float
+
+
+class MemoryDiffEntry(BaseModel):
+    """Schema d'une variation d'allocations entre deux instantanés"""
+    location: List[str]
+    size_bytes: int
+    size_diff_bytes: int
+    count: int
+    count_diff: int
+
+
+class MemoryDiffResponse(BaseModel):
+    """Schema de réponse pour la différence avec l'instantané précédent"""
+    traced_bytes: int
+    peak_bytes: int
+    size_diff_bytes: int
+    entries: List[MemoryDiffEntry]
+
+
+class SessionMemoryEntry(BaseModel):
+    """Schema de la mémoire occupée par une session dans le worker (estimation)"""
+    session_code: str
+    websockets: int
+    sse_observers: int
+    total_bytes: int
+    parts: Dict[str, int]
+
+
+class SessionMemoryResponse(BaseModel):
+    """Schema de réponse pour la mémoire par session, plus grosses sessions d'abord"""
+    sessions_count: int
+    total_bytes: int
+    sessions: List[SessionMemoryEntry]
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class MessageResponse(BaseModel):
+    """Schema de réponse pour les actions sans contenu"""
+    message: str
\ No newline at end of file
@@ -1,31 +1,84 @@
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 from datetime import datetime
-from utils.constants import VALID_VOTES, SessionStatus, UserRole
+from utils.constants import DeckKind, SessionStatus, UserRole
+from utils.decks import compile_deck
 
 
 class PokerSessionCreate(BaseModel):
     """Schema pour créer une session"""
     title: str = Field(..., min_length=1, max_length=200, description="Titre de la session")
     description: Optional[str] = Field(None, max_length=1000, description="Description optionnelle")
+    deck: DeckKind = Field(DeckKind.FIBONACCI, description="Jeu de cartes de la session")
+    deck_cards: Optional[List[str]] = Field(None, description="Cartes du jeu personnalisé (deck = custom)")
+
+    @validator('deck_cards', always=True)
+    def validate_deck(cls, v, values):
+        if values.get('deck') != DeckKind.CUSTOM:
+            if v is not None:
+                raise ValueError('Cards can only be given for a custom deck')
+            return v
+        if v is None:
+            raise ValueError('A custom deck needs its cards')
+        # Compilation (mise en cache) : vérifie le nombre, la longueur et l'unicité des cartes
+        return list(compile_deck(DeckKind.CUSTOM, v).cards)
 
     class Config:
         json_schema_extra = {
             "example": {
                 "title": "Sprint 15 Planning",
-                "description": "Estimation des user stories du sprint 15"
+                "description": "Estimation des user stories du sprint 15",
+                "deck": "fibonacci"
             }
         }
 
 
+class PokerSessionBulkItem(PokerSessionCreate):
+    """Schema d'une session à créer par lot"""
+    facilitator: Optional[str] = Field(None, min_length=1, max_length=100,
+                                       description="Facilitateur (nom d'utilisateur), par défaut l'auteur de la requête")
+
+
+class PokerSessionBulkCreate(BaseModel):
+    """Schema pour créer plusieurs sessions en une fois (limite : config.poker_bulk_max_sessions)"""
+    sessions: List[PokerSessionBulkItem] = Field(..., min_length=1)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "sessions": [
+                    {"title": "PI 12 - Team Alpha", "facilitator": "alice"},
+                    {"title": "PI 12 - Team Beta", "facilitator": "bob", "deck": "tshirt"}
+                ]
+            }
+        }
+
+
+class PokerSessionBulkItemResponse(BaseModel):
+    """Schema de réponse pour une session créée par lot"""
+    session_code: str
+    title: str
+    deck: DeckKind
+    facilitator: str
+
+
+class PokerSessionBulkResponse(BaseModel):
+    """Schema de réponse pour la création groupée, avec le temps passé"""
+    created: int
+    elapsed_ms: float
+    ms_per_session: float
+    sessions: List[PokerSessionBulkItemResponse]
+
+
 class PokerSessionResponse(BaseModel):
     """Schema de réponse pour une session"""
     id: int
     session_code: str
     title: str
     description: Optional[str]
-    status: str
+    status: SessionStatus
     is_revealed: bool
+    deck: DeckKind
     creator_id: int
     created_at: datetime
     completed_at: Optional[datetime]
@@ -34,15 +87,25 @@ class PokerSessionResponse(BaseModel):
         from_attributes = True
 
 
+class PokerSessionListItemResponse(BaseModel):
+    """Schema de réponse pour la liste des sessions d'un utilisateur"""
+    id: int
+    session_code: str
+    title: str
+    description: Optional[str]
+    status: SessionStatus
+    created_at: datetime
+    completed_at: Optional[datetime]
+    rounds_count: int
+
+    class Config:
+        from_attributes = True
+
+
 class PokerVoteCreate(BaseModel):
     """Schema pour enregistrer un vote"""
-    vote_value: str = Field(..., description="Valeur du vote")
-
-    @validator('vote_value')
-    def validate_vote(cls, v):
-        if v not in VALID_VOTES:
-            raise ValueError(f'Vote must be one of {VALID_VOTES}')
-        return v
+    # Carte du jeu de la session : vérifiée par PokerService.cast_vote
+    vote_value: str = Field(..., min_length=1, max_length=20, description="Carte choisie")
 
     class Config:
         json_schema_extra = {
@@ -56,31 +119,27 @@ class PokerVoteResponse(BaseModel):
     """Schema de réponse pour un vote"""
     user: str
     value: str
-    voted_at: str
+    voted_at: datetime
 
 
 class PokerRoundCreate(BaseModel):
     """Schema pour créer un nouveau round"""
     story_title: Optional[str] = Field(None, max_length=200, description="Titre de la story à estimer")
+    timebox_seconds: Optional[int] = Field(None, ge=10, le=3600, description="Temps imparti, révélation automatique à l'échéance")
 
     class Config:
         json_schema_extra = {
             "example": {
-                "story_title": "User Login Feature"
+                "story_title": "User Login Feature",
+                "timebox_seconds": 120
             }
         }
 
 
 class PokerRoundComplete(BaseModel):
     """Schema pour clôturer un round avec l'estimation finale"""
-    final_estimate: str = Field(..., description="Estimation finale convenue")
-
-    @validator('final_estimate')
-    def validate_estimate(cls, v):
-        # Accepter toutes les valeurs de vote plus "custom"
-        if v not in VALID_VOTES and not v.replace('.', '').isdigit():
-            raise ValueError('Final estimate should be a valid vote value or number')
-        return v
+    # Carte du jeu de la session ou nombre : vérifié par PokerService.complete_round
+    final_estimate: str = Field(..., min_length=1, max_length=20, description="Estimation finale convenue")
 
     class Config:
         json_schema_extra = {
@@ -101,24 +160,123 @@ class PokerRoundResponse(BaseModel):
         from_attributes = True
 
 
+class PokerCurrentRoundResponse(BaseModel):
+    """Schema de réponse pour le round en cours"""
+    round_number: int
+    story_title: Optional[str]
+    deadline: Optional[datetime] = None
+    version: int
+
+    class Config:
+        from_attributes = True
+
+
+class PokerNewRoundResponse(BaseModel):
+    """Schema de réponse au démarrage d'un round"""
+    round_number: int
+    story_title: Optional[str]
+    deadline: Optional[datetime] = None
+    version: int
+    message: str
+
+
+class PokerActionResponse(BaseModel):
+    """
+    Schema de réponse pour une action du facilitateur
+    `version` est à renvoyer dans l'en-tête If-Match de l'action suivante
+    """
+    message: str
+    version: int
+
+
+class PokerTimerUpdate(BaseModel):
+    """Schema pour démarrer ou replanifier le temps imparti du round actuel"""
+    seconds: int = Field(..., ge=10, le=3600, description="Temps imparti à partir de maintenant")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "seconds": 90
+            }
+        }
+
+
+class PokerTimerResponse(BaseModel):
+    """Schema de réponse pour le temps imparti du round actuel"""
+    round_number: int
+    deadline: Optional[datetime]
+    message: str
+
+
 class PokerParticipantResponse(BaseModel):
     """Schema de réponse pour un participant"""
     username: str
-    role: str
+    role: UserRole
     has_voted: bool
 
 
+class PokerDeckResponse(BaseModel):
+    """Schema de réponse pour le jeu de cartes d'une session"""
+    kind: DeckKind
+    cards: List[str]
+    values: List[Optional[float]]
+
+
+class PokerVoteStatisticsResponse(BaseModel):
+    """Schema des statistiques des votes révélés (cartes numériques uniquement)"""
+    count: int
+    numeric_count: int
+    average: Optional[float]
+    median: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+    suggestion: Optional[str]
+    consensus: bool
+
+
 class PokerSessionDetailResponse(BaseModel):
     """Schema de réponse détaillée pour une session avec tous ses éléments"""
     id: int
     session_code: str
     title: str
     description: Optional[str]
-    status: str
+    status: SessionStatus
     is_revealed: bool
     creator_id: int
-    current_round: Optional[dict]
-    votes: List[dict]
-    participants: List[dict]
-    rounds_history: List[dict]
-    created_at: str
\ No newline at end of file
+    version: int
+    deck: PokerDeckResponse
+    current_round: Optional[PokerCurrentRoundResponse]
+    votes: List[PokerVoteResponse]
+    statistics: Optional[PokerVoteStatisticsResponse] = None
+    participants: List[PokerParticipantResponse]
+    rounds_history: List[PokerRoundResponse]
+    created_at: datetime
+
+class PokerSearchRoundMatch(BaseModel):
+    """Schema d'un round correspondant à la recherche"""
+    round_number: int
+    story_title: Optional[str]
+    final_estimate: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+
+class PokerSearchResult(BaseModel):
+    """Schema d'une session correspondant à la recherche"""
+    session_code: str
+    title: str
+    description: Optional[str]
+    status: SessionStatus
+    created_at: datetime
+    score: float
+    rounds: List[PokerSearchRoundMatch]
+
+
+class PokerSearchResponse(BaseModel):
+    """Schema de réponse paginée pour la recherche dans les sessions"""
+    query: str
+    page: int
+    page_size: int
+    has_more: bool
+    results: List[PokerSearchResult]
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field, validator
-from typing import List
+from typing import List, Optional
+from datetime import datetime
+import json
 
 class WheelConfigCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -13,4 +15,26 @@ class WheelConfigCreate(BaseModel):
 
 class WheelResultCreate(BaseModel):
     config_id: int
-    selected_item: str
\ No newline at end of file
+    selected_item: str
+
+class WheelConfigResponse(BaseModel):
+    id: int
+    name: str
+    items: List[str]
+    created_at: Optional[datetime] = None
+
+    @validator('items', pre=True)
+    def parse_items(cls, v):
+        # Stocké en base sous forme de tableau JSON
+        return json.loads(v) if isinstance(v, str) else v
+
+    class Config:
+        from_attributes = True
+
+class WheelResultResponse(BaseModel):
+    id: int
+    selected_item: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
\ No newline at end of file
@@ -1,44 +1,62 @@
+import json
 import logging
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException
 import secrets
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 from models.poker import PokerSession, PokerParticipant, PokerRound, PokerVote
 from models.user import User
-from utils.constants import SessionStatus, UserRole
+from utils.constants import DeckKind, SessionStatus, UserRole
+from utils.decks import session_deck
+from utils.logging_config import sampled_logger
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Fort volume : échantillonné (config.Settings.log_sample_every)
+vote_logger = sampled_logger("poker.votes")
+
+# Tentatives de création en cas de collision d'un code de session (contrainte unique)
+SESSION_CODE_ATTEMPTS = 5
+# Taille des lots de vérification des codes (limite de paramètres SQLite)
+CODE_CHECK_BATCH = 500
 
 class PokerService:
 
 
     @staticmethod
-    def create_session(db: Session, title: str, description: str, user: User) -> PokerSession:
+    def create_session(db: Session, title: str, description: str, user: User,
+                       deck: DeckKind = DeckKind.FIBONACCI, deck_cards: list = None) -> PokerSession:
         """
         Créer une nouvelle session de planning poker
         - Génère un code unique
+        - Jeu de cartes (cartes déjà validées par le schéma pour un jeu personnalisé)
         - Ajoute le créateur comme facilitateur
         - Crée automatiquement le premier round
         """
-
-
-
-        logger.info(f"user : {user}, title : {title}, description : {description} ")
-        session_code = secrets.token_urlsafe(8)
-
-        # Créer la session
-        session = PokerSession(
-            session_code=session_code,
-            title=title,
-            description=description,
-            creator_id=user.id,
-            status=SessionStatus.ACTIVE
-        )
-        db.add(session)
-        db.flush()  # Pour obtenir l'ID sans commit
+        # Créer la session (nouveau code si une autre session l'a pris entre-temps)
+        for _ in range(SESSION_CODE_ATTEMPTS):
+            session = PokerSession(
+                session_code=PokerService.new_session_code(),
+                title=title,
+                description=description,
+                deck=DeckKind(deck).value,
+                deck_cards=json.dumps(deck_cards, ensure_ascii=False) if deck_cards else None,
+                creator_id=user.id,
+                status=SessionStatus.ACTIVE,
+                active_participants=1
+            )
+            db.add(session)
+            try:
+                db.flush()  # Pour obtenir l'ID sans commit
+                break
+            except IntegrityError:
+                db.rollback()
+        else:
+            raise HTTPException(status_code=503, detail="Could not generate a unique session code, try again")
 
         # Ajouter le créateur comme facilitateur
         participant = PokerParticipant(
@@ -59,10 +77,117 @@ class PokerService:
         db.commit()
         db.refresh(session)
 
-        logger.info(f" session : {session},  user : {user}, title : {title}, description : {description} ")
+        logger.info("Poker session created", extra={
+            "session_code": session.session_code, "user_id": user.id, "title_length": len(title)
+        })
 
         return session
 
+    @staticmethod
+    def new_session_code() -> str:
+        return secrets.token_urlsafe(8)
+
+    @staticmethod
+    def generate_session_codes(db: Session, count: int) -> list:
+        """
+        Tirer `count` codes de session distincts, absents de la base
+        (une requête par lot de codes, retirage des seuls codes en collision)
+        """
+        codes = set()
+        while len(codes) < count:
+            candidates = set()
+            while len(candidates) < count - len(codes):
+                code = PokerService.new_session_code()
+                if code not in codes:
+                    candidates.add(code)
+            pending = list(candidates)
+            for start in range(0, len(pending), CODE_CHECK_BATCH):
+                batch = pending[start:start + CODE_CHECK_BATCH]
+                taken = db.query(PokerSession.session_code).filter(PokerSession.session_code.in_(batch)).all()
+                candidates.difference_update(code for code, in taken)
+            codes |= candidates
+        return list(codes)
+
+    @staticmethod
+    def resolve_users(db: Session, usernames: set) -> dict:
+        """Identifiants des utilisateurs par nom, créés si besoin (insertion groupée)"""
+        if not usernames:
+            return {}
+        users = dict(db.query(User.username, User.id).filter(User.username.in_(usernames)).all())
+        missing = [{"username": username, "created_at": datetime.utcnow()}
+                   for username in usernames if username not in users]
+        if missing:
+            users.update(db.execute(insert(User).returning(User.username, User.id), missing).all())
+        return users
+
+    @staticmethod
+    def create_sessions_bulk(db: Session, items: list, user: User) -> list:
+        """
+        Créer plusieurs sessions en une seule transaction (ex. PI planning, une session par équipe)
+        - `items` : title, description, deck, deck_cards, facilitator (nom d'utilisateur, sinon `user`)
+        - Le facilitateur est le créateur de la session, créé s'il n'existe pas
+        - Insertions groupées : sessions (RETURNING id), facilitateurs, premiers rounds
+        - Codes vérifiés d'avance ; si une création concurrente prend un code
+          entre-temps, la transaction est rejouée avec de nouveaux codes
+        Retourne une liste de dicts (session_code, title, deck, facilitator)
+        """
+        usernames = {item.facilitator.strip() for item in items if item.facilitator} - {user.username}
+        for attempt in range(SESSION_CODE_ATTEMPTS):
+            try:
+                facilitators = PokerService.resolve_users(db, usernames)
+                facilitators[user.username] = user.id
+                codes = PokerService.generate_session_codes(db, len(items))
+                now = datetime.utcnow()
+                names = [item.facilitator.strip() if item.facilitator else user.username for item in items]
+
+                session_ids = db.execute(
+                    insert(PokerSession).returning(PokerSession.id, sort_by_parameter_order=True),
+                    [{
+                        "session_code": code,
+                        "title": item.title,
+                        "description": item.description,
+                        "deck": DeckKind(item.deck).value,
+                        "deck_cards": json.dumps(item.deck_cards, ensure_ascii=False) if item.deck_cards else None,
+                        "creator_id": facilitators[name],
+                        "status": SessionStatus.ACTIVE,
+                        "is_revealed": False,
+                        "active_participants": 1,
+                        "version": 1,
+                        "created_at": now,
+                        "updated_at": now,
+                    } for code, item, name in zip(codes, items, names)]
+                ).scalars().all()
+
+                db.execute(insert(PokerParticipant), [{
+                    "session_id": session_id,
+                    "user_id": facilitators[name],
+                    "role": UserRole.FACILITATOR,
+                    "joined_at": now,
+                    "is_active": True,
+                } for session_id, name in zip(session_ids, names)])
+
+                db.execute(insert(PokerRound), [{
+                    "session_id": session_id,
+                    "round_number": 1,
+                    "story_title": "Round 1",
+                    "votes_count": 0,
+                    "version": 1,
+                    "created_at": now,
+                } for session_id in session_ids])
+
+                db.commit()
+            except IntegrityError:
+                # Code (ou nouvel utilisateur) pris par une transaction concurrente
+                db.rollback()
+                continue
+
+            logger.info("Poker sessions provisioned", extra={"user_id": user.id, "sessions": len(items),
+                                                              "attempts": attempt + 1})
+            return [{"session_code": code, "title": item.title, "deck": DeckKind(item.deck), "facilitator": name}
+                    for code, item, name in zip(codes, items, names)]
+
+        raise HTTPException(status_code=503, detail="Could not generate unique session codes, try again")
+
     @staticmethod
     def get_session(db: Session, session_code: str) -> PokerSession:
         """
@@ -79,22 +204,15 @@ class PokerService:
         return session
 
     @staticmethod
-    def get_session_details(db: Session, session_code: str, user: User) -> dict:
+    def load_session_snapshot(db: Session, session: PokerSession) -> dict:
         """
-        Récupérer tous les détails d'une session
+        Charger l'état d'une session, identique pour tous les utilisateurs
         - Session
         - Round actuel
         - Votes du round actuel
         - Participants actifs
         - Historique des rounds complétés
-
-        Auto-join l'utilisateur s'il n'est pas déjà participant
         """
-        session = PokerService.get_session(db, session_code)
-
-        # Auto-join
-        PokerService.join_session(db, session, user)
-
         # Récupérer le round actif (dernier sans completed_at)
         current_round = db.query(PokerRound).filter(
             PokerRound.session_id == session.id,
@@ -104,12 +222,16 @@ class PokerService:
         # Votes du round actuel
         votes = []
         if current_round:
-            votes = db.query(PokerVote).filter(
+            votes = db.query(PokerVote).options(
+                joinedload(PokerVote.user)
+            ).filter(
                 PokerVote.round_id == current_round.id
             ).all()
 
-        # Participants actifs
-        participants = db.query(PokerParticipant).filter(
+        # Participants actifs (utilisateurs chargés en une seule requête)
+        participants = db.query(PokerParticipant).options(
+            joinedload(PokerParticipant.user)
+        ).filter(
             PokerParticipant.session_id == session.id,
             PokerParticipant.is_active == True
         ).all()
@@ -129,10 +251,11 @@ class PokerService:
         }
 
     @staticmethod
-    def join_session(db: Session, session: PokerSession, user: User) -> None:
+    def join_session(db: Session, session: PokerSession, user: User) -> bool:
         """
         Ajouter un utilisateur comme participant à une session
         Si déjà participant, réactive sa participation
+        Retourne True si la participation a été créée ou réactivée
         """
         # Vérifier si déjà participant
         existing = db.query(PokerParticipant).filter(
@@ -141,6 +264,8 @@ class PokerService:
         ).first()
 
         if existing:
+            if existing.is_active:
+                return False
             # Réactiver si inactif
             existing.is_active = True
         else:
@@ -152,16 +277,25 @@ class PokerService:
             )
             db.add(participant)
 
+        # Incrément côté base : sûr face aux arrivées concurrentes
+        session.active_participants = PokerSession.active_participants + 1
         db.commit()
+        return True
 
     @staticmethod
-    def cast_vote(db: Session, session: PokerSession, vote_value: str, user: User) -> None:
+    def cast_vote(db: Session, session: PokerSession, vote_value: str, user: User) -> PokerRound:
         """
         Enregistrer ou mettre à jour un vote
+        - Vérifie que la carte fait partie du jeu de la session (jeu compilé en cache)
         - Vérifie que l'utilisateur est participant
         - Vérifie qu'il existe un round actif
-        - Crée ou met à jour le vote
+        - Crée ou met à jour le vote (et le compteur de votes du round)
+        Retourne le round actif
         """
+        card_index = session_deck(session).index_of(vote_value)
+        if card_index is None:
+            raise HTTPException(status_code=422, detail="This card is not part of the session deck")
+
         # Vérifier que l'utilisateur est participant actif
         participant = db.query(PokerParticipant).filter(
             PokerParticipant.session_id == session.id,
@@ -176,10 +310,7 @@ class PokerService:
             )
 
         # Récupérer le round actif
-        current_round = db.query(PokerRound).filter(
-            PokerRound.session_id == session.id,
-            PokerRound.completed_at == None
-        ).order_by(PokerRound.round_number.desc()).first()
+        current_round = PokerService.get_current_round(db, session)
 
         if not current_round:
             raise HTTPException(status_code=400, detail="No active round")
@@ -190,20 +321,109 @@ class PokerService:
             PokerVote.user_id == user.id
         ).first()
 
+        updated = 0
         if existing_vote:
-            # Mettre à jour le vote existant
-            existing_vote.vote_value = vote_value
-            existing_vote.updated_at = datetime.utcnow()
-        else:
+            # Mettre à jour le vote existant (UPDATE conditionnel : un reset
+            # concurrent a pu le supprimer depuis la lecture)
+            updated = db.query(PokerVote).filter(PokerVote.id == existing_vote.id).update(
+                {PokerVote.card_index: card_index, PokerVote.updated_at: datetime.utcnow()},
+                synchronize_session=False
+            )
+        if not updated:
             # Créer un nouveau vote
             vote = PokerVote(
                 session_id=session.id,
                 round_id=current_round.id,
                 user_id=user.id,
-                vote_value=vote_value
+                card_index=card_index
             )
             db.add(vote)
+            current_round.votes_count = PokerRound.votes_count + 1
+
+        log_fields = {"session_code": session.session_code, "round_number": current_round.round_number,
+                      "user_id": user.id, "updated": bool(updated)}
+        try:
+            db.commit()
+        except IntegrityError:
+            # Premier vote concurrent du même utilisateur (double clic, deux onglets) :
+            # l'autre insertion l'a emporté (contrainte unique), mettre à jour son vote
+            db.rollback()
+            db.query(PokerVote).filter(
+                PokerVote.round_id == current_round.id,
+                PokerVote.user_id == user.id
+            ).update(
+                {PokerVote.card_index: card_index, PokerVote.updated_at: datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.commit()
+            log_fields["updated"] = True
+        vote_logger.info("Vote cast", extra=log_fields)
+        return current_round
+
+    @staticmethod
+    def get_current_round(db: Session, session: PokerSession):
+        """Round actif de la session (dernier sans completed_at), ou None"""
+        return db.query(PokerRound).filter(
+            PokerRound.session_id == session.id,
+            PokerRound.completed_at == None
+        ).order_by(PokerRound.round_number.desc()).first()
 
+    @staticmethod
+    def all_voted(session: PokerSession, current_round: PokerRound) -> bool:
+        """
+        Tous les participants actifs ont-ils voté pour le round ?
+        Compare les compteurs maintenus par join_session / cast_vote (pas de COUNT)
+        Un vote par utilisateur et par round (contrainte unique) : le compteur est exact
+        """
+        return 0 < session.active_participants <= current_round.votes_count
+
+    @staticmethod
+    def reveal_if_hidden(db: Session, session_id: int) -> bool:
+        """
+        Révéler les votes d'une session active s'ils sont encore masqués
+        UPDATE conditionnel : une seule révélation même si le minuteur et le
+        dernier vote arrivent en même temps (ou sur deux workers)
+        Retourne True si cet appel a révélé les votes
+        """
+        updated = db.query(PokerSession).filter(
+            PokerSession.id == session_id,
+            PokerSession.is_revealed == False,
+            PokerSession.status == SessionStatus.ACTIVE
+        ).update({
+            PokerSession.is_revealed: True,
+            PokerSession.version: PokerSession.version + 1
+        }, synchronize_session=False)
+        db.commit()
+        return updated == 1
+
+    @staticmethod
+    def set_round_deadline(db: Session, current_round: PokerRound, seconds) -> None:
+        """
+        Fixer (ou supprimer si `seconds` est None) la fin du temps imparti du round
+        """
+        current_round.deadline = datetime.utcnow() + timedelta(seconds=seconds) if seconds else None
+        current_round.timebox_seconds = seconds or None
+        current_round.version = PokerRound.version + 1
+        db.commit()
+
+    @staticmethod
+    def rebuild_counters(db: Session) -> None:
+        """
+        Recalculer les compteurs de participants actifs et de votes
+        (migration, ou réparation après une modification manuelle de la base)
+        """
+        participants = db.query(func.count(PokerParticipant.id)).filter(
+            PokerParticipant.session_id == PokerSession.id,
+            PokerParticipant.is_active == True
+        ).correlate(PokerSession).scalar_subquery()
+        db.query(PokerSession).update(
+            {PokerSession.active_participants: participants}, synchronize_session=False
+        )
+
+        votes = db.query(func.count(PokerVote.id)).filter(
+            PokerVote.round_id == PokerRound.id
+        ).correlate(PokerRound).scalar_subquery()
+        db.query(PokerRound).update({PokerRound.votes_count: votes}, synchronize_session=False)
         db.commit()
 
     @staticmethod
@@ -219,43 +439,166 @@ class PokerService:
             )
 
     @staticmethod
-    def reveal_votes(db: Session, session: PokerSession) -> None:
+    def update_versioned(db: Session, model, row_id: int, version: int, values: dict) -> int:
+        """
+        UPDATE conditionnel (verrouillage optimiste) :
+            UPDATE ... SET ..., version = version + 1 WHERE id = ? AND version = ?
+        Aucun verrou n'est pris pendant la lecture : si la ligne a changé depuis,
+        la transaction est annulée et une HTTPException 409 est levée
+        Sur SQLite, c'est aussi la première écriture de la transaction : le verrou
+        d'écriture est pris directement, sans montée de verrou en cours de transaction
+        Retourne la nouvelle version (la transaction reste à valider)
+        """
+        updated = db.query(model).filter(
+            model.id == row_id,
+            model.version == version
+        ).update({**values, model.version: version + 1}, synchronize_session=False)
+
+        if updated != 1:
+            db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="The session was modified by someone else, reload and try again"
+            )
+        return version + 1
+
+    @staticmethod
+    def reveal_votes(db: Session, session: PokerSession, expected_version: int = None) -> int:
         """
         Révéler tous les votes du round actuel
+        Retourne la nouvelle version de la session
         """
-        session.is_revealed = True
+        version = PokerService.update_versioned(
+            db, PokerSession, session.id,
+            session.version if expected_version is None else expected_version,
+            {PokerSession.is_revealed: True}
+        )
         db.commit()
+        return version
 
     @staticmethod
-    def reset_votes(db: Session, session: PokerSession) -> None:
+    def reset_votes(db: Session, session: PokerSession, expected_version: int = None) -> Tuple[int, Optional[PokerRound]]:
         """
         Réinitialiser les votes du round actuel
         - Supprime tous les votes
         - Masque les résultats
+        - Relance le temps imparti du round s'il en a un (nouvelle échéance, à replanifier)
+        Retourne (nouvelle version de la session, round actuel ou None)
         """
         # Récupérer le round actif
-        current_round = db.query(PokerRound).filter(
-            PokerRound.session_id == session.id,
-            PokerRound.completed_at == None
-        ).order_by(PokerRound.round_number.desc()).first()
+        current_round = PokerService.get_current_round(db, session)
+
+        # Masquer les votes (première écriture : conflit détecté avant toute suppression)
+        version = PokerService.update_versioned(
+            db, PokerSession, session.id,
+            session.version if expected_version is None else expected_version,
+            {PokerSession.is_revealed: False}
+        )
 
         if current_round:
             # Supprimer tous les votes de ce round
             db.query(PokerVote).filter(
                 PokerVote.round_id == current_round.id
             ).delete()
+            current_round.votes_count = 0
+            current_round.version = PokerRound.version + 1
+            if current_round.timebox_seconds:
+                current_round.deadline = datetime.utcnow() + timedelta(seconds=current_round.timebox_seconds)
 
-        # Masquer les votes
-        session.is_revealed = False
         db.commit()
+        return version, current_round
 
     @staticmethod
-    def get_user_sessions(db: Session, user: User) -> list:
+    def start_round(db: Session, session: PokerSession, story_title: str = None,
+                    timebox_seconds: int = None, expected_version: int = None) -> PokerRound:
         """
-        Récupérer toutes les sessions créées par l'utilisateur
+        Démarrer un nouveau round d'estimation
+        - Incrémente automatiquement le numéro de round
+        - Masque les votes
+        - Temps imparti optionnel (deadline)
+        Deux démarrages concurrents ne peuvent pas créer deux fois le même numéro :
+        le second échoue sur la version de la session (409)
         """
-        sessions = db.query(PokerSession).filter(
-            PokerSession.creator_id == user.id
-        ).order_by(PokerSession.created_at.desc()).all()
+        # Obtenir le numéro du prochain round
+        last_round = db.query(PokerRound).filter(
+            PokerRound.session_id == session.id
+        ).order_by(PokerRound.round_number.desc()).first()
 
-        return sessions
\ No newline at end of file
+        next_round_number = (last_round.round_number + 1) if last_round else 1
+
+        # Masquer les votes et réinitialiser l'état
+        PokerService.update_versioned(
+            db, PokerSession, session.id,
+            session.version if expected_version is None else expected_version,
+            {PokerSession.is_revealed: False}
+        )
+
+        # Créer le nouveau round
+        new_round = PokerRound(
+            session_id=session.id,
+            round_number=next_round_number,
+            story_title=story_title or f"Round {next_round_number}",
+            deadline=datetime.utcnow() + timedelta(seconds=timebox_seconds) if timebox_seconds else None,
+            timebox_seconds=timebox_seconds or None
+        )
+        db.add(new_round)
+        db.commit()
+        db.refresh(new_round)
+        return new_round
+
+    @staticmethod
+    def _is_number(value: str) -> bool:
+        try:
+            return 0 <= float(value) < float("inf")
+        except ValueError:
+            return False
+
+    @staticmethod
+    def complete_round(db: Session, session: PokerSession, round_number: int, final_estimate: str,
+                       expected_version: int = None) -> PokerRound:
+        """
+        Clôturer un round avec l'estimation finale
+        L'estimation est une carte du jeu de la session ou un nombre positif
+        `expected_version` est la version du round
+        """
+        if session_deck(session).index_of(final_estimate) is None and not PokerService._is_number(final_estimate):
+            raise HTTPException(status_code=422, detail="Final estimate should be a card of the session deck or a number")
+
+        round_obj = db.query(PokerRound).filter(
+            PokerRound.session_id == session.id,
+            PokerRound.round_number == round_number
+        ).first()
+
+        if not round_obj:
+            raise HTTPException(status_code=404, detail="Round not found")
+
+        PokerService.update_versioned(
+            db, PokerRound, round_obj.id,
+            round_obj.version if expected_version is None else expected_version,
+            {PokerRound.final_estimate: final_estimate, PokerRound.completed_at: datetime.utcnow()}
+        )
+        db.commit()
+        return round_obj
+
+    @staticmethod
+    def list_user_sessions(db: Session, user: User) -> list:
+        """
+        Lister les sessions créées par l'utilisateur avec leur nombre de rounds
+        Une seule requête (pas de chargement de session.rounds par session)
+        """
+        rounds_count = db.query(func.count(PokerRound.id)).filter(
+            PokerRound.session_id == PokerSession.id
+        ).correlate(PokerSession).scalar_subquery()
+
+        return db.query(
+            PokerSession.id,
+            PokerSession.session_code,
+            PokerSession.title,
+            PokerSession.description,
+            PokerSession.status,
+            PokerSession.created_at,
+            PokerSession.completed_at,
+            rounds_count.label("rounds_count")
+        ).filter(
+            PokerSession.creator_id == user.id
+        ).order_by(PokerSession.created_at.desc()).all()
\ No newline at end of file
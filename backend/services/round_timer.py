@@ -0,0 +1,86 @@
+"""
+Rounds en temps limité : révélation automatique des votes à l'échéance
+
+Les échéances sont portées par le planificateur central (utils/scheduler.py),
+une minuterie par session (celle de son round actif)
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models.poker import PokerSession, PokerRound
+from services.poker_service import PokerService
+from utils.constants import SessionStatus
+from utils.scheduler import scheduler
+from utils.websocket_manager import manager
+
+
+def schedule_round(session_code: str, round_id: int, deadline: datetime) -> None:
+    """Planifier (ou replanifier) la révélation automatique du round"""
+    delay = (deadline - datetime.utcnow()).total_seconds()
+    scheduler.schedule(session_code, delay, lambda: expire_round(session_code, round_id))
+
+
+def cancel_round(session_code: str) -> None:
+    scheduler.cancel(session_code)
+
+
+def _reveal_expired(round_id: int) -> Tuple[bool, Optional[datetime]]:
+    """
+    Révéler les votes si le round (et sa session) est toujours actif et son échéance atteinte
+    Retourne (révélé, nouvelle échéance si le round a été prolongé entre-temps)
+    """
+    db = SessionLocal()
+    try:
+        round_obj = db.get(PokerRound, round_id)
+        if round_obj is None or round_obj.completed_at is not None or round_obj.deadline is None:
+            return False, None
+        if round_obj.session.status != SessionStatus.ACTIVE:
+            # Session terminée (éventuellement sur un autre worker) : plus de révélation
+            return False, None
+        if round_obj.deadline > datetime.utcnow():
+            return False, round_obj.deadline
+        current_round = PokerService.get_current_round(db, round_obj.session)
+        if current_round is None or current_round.id != round_id:
+            return False, None
+        return PokerService.reveal_if_hidden(db, round_obj.session_id), None
+    finally:
+        db.close()
+
+
+async def expire_round(session_code: str, round_id: int) -> None:
+    revealed, deadline = await run_in_threadpool(_reveal_expired, round_id)
+    if deadline is not None:
+        # Échéance repoussée (par exemple depuis un autre worker)
+        schedule_round(session_code, round_id, deadline)
+    elif revealed:
+        await manager.broadcast({
+            "type": "votes_revealed",
+            "reason": "timer"
+        }, session_code)
+
+
+def restore_round_timers() -> int:
+    """
+    Replanifier les rounds en temps limité encore ouverts (démarrage du worker)
+    Les échéances déjà passées sont traitées immédiatement
+    """
+    db = SessionLocal()
+    try:
+        rounds = db.query(PokerSession.session_code, PokerRound.id, PokerRound.deadline).join(
+            PokerRound, PokerRound.session_id == PokerSession.id
+        ).filter(
+            PokerRound.deadline != None,
+            PokerRound.completed_at == None,
+            PokerSession.is_revealed == False,
+            PokerSession.status == SessionStatus.ACTIVE
+        ).order_by(PokerRound.round_number).all()
+    finally:
+        db.close()
+
+    # Par numéro croissant : la minuterie de la session reste celle de son dernier round
+    for session_code, round_id, deadline in rounds:
+        schedule_round(session_code, round_id, deadline)
+    return len(rounds)
@@ -0,0 +1,279 @@
+"""
+Recherche plein texte dans les sessions (titre, description) et les rounds (story)
+
+- SQLite : tables FTS5 à contenu externe, synchronisées par triggers
+- PostgreSQL : colonnes tsvector générées + index GIN
+- Autre base ou SQLite sans FTS5 : repli sur LIKE (parcours complet)
+
+L'index est créé par init_db() ; `python manage.py rebuild-search` le reconstruit
+"""
+import logging
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models.poker import PokerSession, PokerParticipant, PokerRound
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_TOKENIZER = "unicode61 remove_diacritics 2"
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS poker_sessions_fts USING fts5(
+        title, description, content='poker_sessions', content_rowid='id', tokenize='{_SQLITE_TOKENIZER}')""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS poker_rounds_fts USING fts5(
+        story_title, content='poker_rounds', content_rowid='id', tokenize='{_SQLITE_TOKENIZER}')""",
+    """CREATE TRIGGER IF NOT EXISTS poker_sessions_fts_insert AFTER INSERT ON poker_sessions BEGIN
+        INSERT INTO poker_sessions_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS poker_sessions_fts_delete AFTER DELETE ON poker_sessions BEGIN
+        INSERT INTO poker_sessions_fts(poker_sessions_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS poker_sessions_fts_update AFTER UPDATE OF title, description ON poker_sessions BEGIN
+        INSERT INTO poker_sessions_fts(poker_sessions_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO poker_sessions_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS poker_rounds_fts_insert AFTER INSERT ON poker_rounds BEGIN
+        INSERT INTO poker_rounds_fts(rowid, story_title) VALUES (new.id, new.story_title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS poker_rounds_fts_delete AFTER DELETE ON poker_rounds BEGIN
+        INSERT INTO poker_rounds_fts(poker_rounds_fts, rowid, story_title) VALUES ('delete', old.id, old.story_title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS poker_rounds_fts_update AFTER UPDATE OF story_title ON poker_rounds BEGIN
+        INSERT INTO poker_rounds_fts(poker_rounds_fts, rowid, story_title) VALUES ('delete', old.id, old.story_title);
+        INSERT INTO poker_rounds_fts(rowid, story_title) VALUES (new.id, new.story_title);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    """ALTER TABLE poker_sessions ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_poker_sessions_search ON poker_sessions USING GIN (search_vector)",
+    """ALTER TABLE poker_rounds ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(story_title, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_poker_rounds_search ON poker_rounds USING GIN (search_vector)",
+]
+
+# Sessions de l'utilisateur correspondant à la recherche, meilleur score d'abord
+# (score : bm25, plus petit = plus pertinent)
+_SQLITE_SEARCH = """
+WITH hits AS (
+    SELECT rowid AS session_id, bm25(poker_sessions_fts, 10.0, 2.0) AS score
+    FROM poker_sessions_fts WHERE poker_sessions_fts MATCH :query
+    UNION ALL
+    SELECT r.session_id, bm25(poker_rounds_fts) AS score
+    FROM poker_rounds_fts JOIN poker_rounds r ON r.id = poker_rounds_fts.rowid
+    WHERE poker_rounds_fts MATCH :query
+)
+SELECT h.session_id, MIN(h.score) AS score
+FROM hits h
+JOIN poker_participants p ON p.session_id = h.session_id AND p.user_id = :user_id
+GROUP BY h.session_id
+ORDER BY score, h.session_id DESC
+LIMIT :limit OFFSET :offset
+"""
+
+_SQLITE_ROUNDS = """
+SELECT r.session_id, r.round_number, r.story_title, r.final_estimate
+FROM poker_rounds_fts JOIN poker_rounds r ON r.id = poker_rounds_fts.rowid
+WHERE poker_rounds_fts MATCH :query AND r.session_id IN ({ids})
+ORDER BY bm25(poker_rounds_fts)
+"""
+
+# (score : ts_rank_cd négatif, pour trier comme bm25)
+_POSTGRES_SEARCH = """
+WITH q AS (SELECT plainto_tsquery('simple', :query) AS query),
+hits AS (
+    SELECT s.id AS session_id, -ts_rank_cd(s.search_vector, q.query) * 5 AS score
+    FROM poker_sessions s, q WHERE s.search_vector @@ q.query
+    UNION ALL
+    SELECT r.session_id, -ts_rank_cd(r.search_vector, q.query) AS score
+    FROM poker_rounds r, q WHERE r.search_vector @@ q.query
+)
+SELECT h.session_id, MIN(h.score) AS score
+FROM hits h
+JOIN poker_participants p ON p.session_id = h.session_id AND p.user_id = :user_id
+GROUP BY h.session_id
+ORDER BY score, h.session_id DESC
+LIMIT :limit OFFSET :offset
+"""
+
+_POSTGRES_ROUNDS = """
+SELECT r.session_id, r.round_number, r.story_title, r.final_estimate
+FROM poker_rounds r
+WHERE r.search_vector @@ plainto_tsquery('simple', :query) AND r.session_id IN ({ids})
+ORDER BY ts_rank_cd(r.search_vector, plainto_tsquery('simple', :query)) DESC
+"""
+
+# Nombre de rounds correspondants renvoyés par session
+MAX_ROUNDS_PER_SESSION = 3
+
+# URL de la base -> moteur de recherche (détecté une fois par processus)
+_backends: Dict[str, str] = {}
+
+
+class SearchService:
+
+    @staticmethod
+    def backend(engine: Engine) -> str:
+        """Moteur de recherche disponible : "fts5", "postgres" ou "like" """
+        key = str(engine.url)
+        if key not in _backends:
+            if engine.dialect.name == "postgresql":
+                _backends[key] = "postgres"
+            elif engine.dialect.name == "sqlite":
+                with engine.connect() as connection:
+                    exists = connection.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'poker_rounds_fts'"
+                    )).first()
+                _backends[key] = "fts5" if exists else "like"
+            else:
+                _backends[key] = "like"
+        return _backends[key]
+
+    @staticmethod
+    def install(engine: Engine) -> str:
+        """
+        Créer l'index de recherche et ses mécanismes de synchronisation (idempotent)
+        Un index créé sur une base existante est rempli immédiatement
+        Retourne le moteur utilisé
+        """
+        if engine.dialect.name == "postgresql":
+            with engine.begin() as connection:
+                for ddl in _POSTGRES_DDL:
+                    connection.execute(text(ddl))
+            _backends[str(engine.url)] = "postgres"
+            return "postgres"
+
+        if engine.dialect.name != "sqlite":
+            _backends[str(engine.url)] = "like"
+            return "like"
+
+        with engine.begin() as connection:
+            created = connection.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'poker_rounds_fts'"
+            )).first() is None
+            try:
+                for ddl in _SQLITE_DDL:
+                    connection.execute(text(ddl))
+            except OperationalError as exc:
+                # SQLite compilé sans FTS5 : la recherche se replie sur LIKE
+                logger.warning("Full-text search unavailable, falling back to LIKE: %s", exc)
+                _backends[str(engine.url)] = "like"
+                return "like"
+            if created:
+                SearchService._rebuild_sqlite(connection)
+        _backends[str(engine.url)] = "fts5"
+        return "fts5"
+
+    @staticmethod
+    def rebuild(engine: Engine) -> str:
+        """Reconstruire l'index à partir des tables (après un import ou une corruption)"""
+        backend = SearchService.install(engine)
+        if backend == "fts5":
+            with engine.begin() as connection:
+                SearchService._rebuild_sqlite(connection)
+        elif backend == "postgres":
+            with engine.begin() as connection:
+                connection.execute(text("REINDEX INDEX ix_poker_sessions_search"))
+                connection.execute(text("REINDEX INDEX ix_poker_rounds_search"))
+        return backend
+
+    @staticmethod
+    def _rebuild_sqlite(connection) -> None:
+        connection.execute(text("INSERT INTO poker_sessions_fts(poker_sessions_fts) VALUES ('rebuild')"))
+        connection.execute(text("INSERT INTO poker_rounds_fts(poker_rounds_fts) VALUES ('rebuild')"))
+
+    @staticmethod
+    def to_fts_query(query: str) -> Optional[str]:
+        """
+        Convertir la saisie utilisateur en requête FTS5 sûre :
+        tous les mots (ET implicite), le dernier en préfixe ("paym" trouve "payment")
+        Les opérateurs et guillemets saisis ne sont pas interprétés
+        """
+        words = _WORD.findall(query)
+        if not words:
+            return None
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += "*"
+        return " ".join(terms)
+
+    @staticmethod
+    def search(db: Session, user: User, query: str, limit: int, offset: int) -> List[dict]:
+        """
+        Sessions de l'utilisateur (participant ou facilitateur) correspondant à la
+        recherche, classées par pertinence, avec leurs rounds correspondants
+        """
+        backend = SearchService.backend(db.get_bind())
+        if backend == "fts5":
+            match = SearchService.to_fts_query(query)
+            if match is None:
+                return []
+            hits = db.execute(text(_SQLITE_SEARCH), {
+                "query": match, "user_id": user.id, "limit": limit, "offset": offset
+            }).all()
+            rounds_sql = _SQLITE_ROUNDS
+        elif backend == "postgres":
+            match = query
+            hits = db.execute(text(_POSTGRES_SEARCH), {
+                "query": match, "user_id": user.id, "limit": limit, "offset": offset
+            }).all()
+            rounds_sql = _POSTGRES_ROUNDS
+        else:
+            return SearchService._search_like(db, user, query, limit, offset)
+
+        if not hits:
+            return []
+
+        ids = [hit.session_id for hit in hits]
+        sessions = {session.id: session for session in db.query(PokerSession).filter(PokerSession.id.in_(ids))}
+        placeholders = ", ".join(str(int(session_id)) for session_id in ids)
+        rounds = {}
+        for row in db.execute(text(rounds_sql.format(ids=placeholders)), {"query": match}):
+            matches = rounds.setdefault(row.session_id, [])
+            if len(matches) < MAX_ROUNDS_PER_SESSION:
+                matches.append(row)
+
+        return [
+            {"session": sessions[hit.session_id], "score": -hit.score, "rounds": rounds.get(hit.session_id, [])}
+            for hit in hits if hit.session_id in sessions
+        ]
+
+    @staticmethod
+    def _search_like(db: Session, user: User, query: str, limit: int, offset: int) -> List[dict]:
+        """Repli sans index : LIKE sur tous les mots (parcours complet des tables)"""
+        words = _WORD.findall(query)
+        if not words:
+            return []
+
+        session_match = and_(*[
+            or_(PokerSession.title.ilike(f"%{word}%"), PokerSession.description.ilike(f"%{word}%"))
+            for word in words
+        ])
+        round_filters = [PokerRound.story_title.ilike(f"%{word}%") for word in words]
+
+        matching_rounds = db.query(PokerRound.session_id).filter(*round_filters)
+        sessions = db.query(PokerSession).join(
+            PokerParticipant, PokerParticipant.session_id == PokerSession.id
+        ).filter(
+            PokerParticipant.user_id == user.id,
+            or_(session_match, PokerSession.id.in_(matching_rounds))
+        ).distinct().order_by(PokerSession.created_at.desc()).limit(limit).offset(offset).all()
+
+        results = []
+        for session in sessions:
+            rounds = db.query(PokerRound).filter(
+                PokerRound.session_id == session.id, *round_filters
+            ).order_by(PokerRound.round_number).limit(MAX_ROUNDS_PER_SESSION).all()
+            results.append({"session": session, "score": 0.0, "rounds": rounds})
+        return results
+
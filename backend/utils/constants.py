@@ -9,4 +9,8 @@ class UserRole(str, Enum):
     FACILITATOR = "facilitator"
     PARTICIPANT = "participant"
 
-VALID_VOTES = ["0", "0.5", "1", "2", "3", "5", "8", "13", "20", "40", "100", "?", "☕"]
\ No newline at end of file
+class DeckKind(str, Enum):
+    FIBONACCI = "fibonacci"
+    TSHIRT = "tshirt"
+    POWERS_OF_TWO = "powers_of_two"
+    CUSTOM = "custom"
@@ -0,0 +1,187 @@
+"""
+Jeux de cartes du planning poker (un par session)
+
+- Jeux prédéfinis (Fibonacci, tailles de T-shirt, puissances de deux) ou
+  personnalisé (PokerSession.deck_cards)
+- Chaque jeu est compilé une seule fois en objet immuable : table carte -> indice
+  et valeur numérique de chaque carte (statistiques des votes)
+- Les votes sont stockés sous forme d'indice dans le jeu (PokerVote.card_index)
+- session_deck() garde le jeu compilé de chaque session : valider un vote
+  ne relit ni ne réanalyse les colonnes du jeu
+"""
+import collections
+import json
+import statistics
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from utils.constants import DeckKind
+
+# Cartes sans valeur numérique (ignorées par les statistiques)
+QUESTION_CARD = "?"
+COFFEE_CARD = "☕"
+
+BUILTIN_DECKS: Dict[DeckKind, Tuple[Tuple[str, Optional[float]], ...]] = {
+    DeckKind.FIBONACCI: (
+        ("0", 0.0), ("0.5", 0.5), ("1", 1.0), ("2", 2.0), ("3", 3.0), ("5", 5.0), ("8", 8.0),
+        ("13", 13.0), ("20", 20.0), ("40", 40.0), ("100", 100.0), (QUESTION_CARD, None), (COFFEE_CARD, None),
+    ),
+    DeckKind.TSHIRT: (
+        ("XS", 1.0), ("S", 2.0), ("M", 3.0), ("L", 5.0), ("XL", 8.0), ("XXL", 13.0),
+        (QUESTION_CARD, None), (COFFEE_CARD, None),
+    ),
+    DeckKind.POWERS_OF_TWO: (
+        ("0", 0.0), ("1", 1.0), ("2", 2.0), ("4", 4.0), ("8", 8.0), ("16", 16.0), ("32", 32.0), ("64", 64.0),
+        (QUESTION_CARD, None), (COFFEE_CARD, None),
+    ),
+}
+
+# Jeu personnalisé
+MIN_CUSTOM_CARDS = 2
+MAX_CUSTOM_CARDS = 20
+MAX_CARD_LENGTH = 8
+
+# Jeux compilés gardés par session (LRU)
+SESSION_DECK_CACHE_SIZE = 4096
+
+
+def _numeric(card: str) -> Optional[float]:
+    try:
+        value = float(card)
+    except ValueError:
+        return None
+    return value if value == value and value not in (float("inf"), float("-inf")) else None
+
+
+class Deck:
+    """Jeu compilé, immuable : partagé entre toutes les sessions qui l'utilisent"""
+    __slots__ = ("kind", "cards", "index", "values")
+
+    def __init__(self, kind: DeckKind, cards: Sequence[str], values: Sequence[Optional[float]]):
+        object.__setattr__(self, "kind", kind)
+        object.__setattr__(self, "cards", tuple(cards))
+        object.__setattr__(self, "index", MappingProxyType({card: i for i, card in enumerate(cards)}))
+        object.__setattr__(self, "values", tuple(values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Deck is immutable")
+
+    def __repr__(self) -> str:
+        return f"Deck({self.kind.value}, {list(self.cards)})"
+
+    def index_of(self, card: str) -> Optional[int]:
+        """Indice de la carte dans le jeu, ou None si elle n'en fait pas partie"""
+        return self.index.get(card)
+
+    def card(self, index: Optional[int]) -> Optional[str]:
+        """Carte à l'indice donné (None pour un indice inconnu)"""
+        if index is None or not 0 <= index < len(self.cards):
+            return None
+        return self.cards[index]
+
+    def closest_card(self, value: float) -> Optional[str]:
+        """Carte numérique la plus proche d'une valeur (la plus haute en cas d'égalité)"""
+        best = None
+        for card, card_value in zip(self.cards, self.values):
+            if card_value is None:
+                continue
+            if best is None or abs(card_value - value) <= abs(best[1] - value):
+                best = (card, card_value)
+        return best[0] if best else None
+
+    def statistics(self, indices: Iterable[int]) -> dict:
+        """
+        Statistiques des votes (indices) : cartes numériques uniquement
+        La suggestion est la carte la plus proche de la moyenne
+        """
+        indices = [index for index in indices if index is not None and 0 <= index < len(self.cards)]
+        numbers = [self.values[index] for index in indices if self.values[index] is not None]
+        if not numbers:
+            return {"count": len(indices), "numeric_count": 0, "average": None, "median": None,
+                    "min": None, "max": None, "suggestion": None, "consensus": False}
+        average = sum(numbers) / len(numbers)
+        return {
+            "count": len(indices),
+            "numeric_count": len(numbers),
+            "average": round(average, 2),
+            "median": statistics.median(numbers),
+            "min": min(numbers),
+            "max": max(numbers),
+            "suggestion": self.closest_card(average),
+            "consensus": len(set(indices)) == 1,
+        }
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "cards": list(self.cards), "values": list(self.values)}
+
+
+def validate_custom_cards(cards: Sequence[str]) -> Tuple[str, ...]:
+    """Cartes d'un jeu personnalisé, nettoyées (ValueError si invalides)"""
+    cleaned = tuple(str(card).strip() for card in cards)
+    if not MIN_CUSTOM_CARDS <= len(cleaned) <= MAX_CUSTOM_CARDS:
+        raise ValueError(f"A custom deck needs between {MIN_CUSTOM_CARDS} and {MAX_CUSTOM_CARDS} cards")
+    if any(not card or len(card) > MAX_CARD_LENGTH for card in cleaned):
+        raise ValueError(f"Cards must be 1 to {MAX_CARD_LENGTH} characters long")
+    if len(set(cleaned)) != len(cleaned):
+        raise ValueError("Cards must be unique")
+    return cleaned
+
+
+@lru_cache(maxsize=256)
+def _compile(kind: DeckKind, cards: Optional[Tuple[str, ...]]) -> Deck:
+    if kind != DeckKind.CUSTOM:
+        builtin = BUILTIN_DECKS[kind]
+        return Deck(kind, [card for card, _ in builtin], [value for _, value in builtin])
+    cards = validate_custom_cards(cards or ())
+    return Deck(kind, cards, [_numeric(card) for card in cards])
+
+
+def compile_deck(kind, cards: Optional[Sequence[str]] = None) -> Deck:
+    """
+    Compiler un jeu (résultat mis en cache : un même jeu n'est compilé qu'une fois)
+    `cards` n'est utilisé que pour un jeu personnalisé
+    Lève ValueError pour un type inconnu ou des cartes invalides
+    """
+    kind = DeckKind(kind)
+    return _compile(kind, tuple(cards) if kind == DeckKind.CUSTOM and cards is not None else None)
+
+
+DEFAULT_DECK = compile_deck(DeckKind.FIBONACCI)
+
+_session_decks: "collections.OrderedDict[str, Deck]" = collections.OrderedDict()
+_session_decks_lock = threading.Lock()
+
+
+def session_deck(session) -> Deck:
+    """
+    Jeu compilé d'une session (PokerSession), gardé par code de session
+    Le jeu d'une session ne change pas après sa création
+    """
+    code = session.session_code
+    with _session_decks_lock:
+        deck = _session_decks.get(code)
+        if deck is not None:
+            _session_decks.move_to_end(code)
+            return deck
+
+    cards = json.loads(session.deck_cards) if session.deck_cards else None
+    deck = compile_deck(session.deck or DeckKind.FIBONACCI, cards)
+    with _session_decks_lock:
+        _session_decks[code] = deck
+        while len(_session_decks) > SESSION_DECK_CACHE_SIZE:
+            _session_decks.popitem(last=False)
+    return deck
+
+
+def cached_session_decks() -> Dict[str, Deck]:
+    """Jeux gardés en cache, par code de session"""
+    with _session_decks_lock:
+        return dict(_session_decks)
+
+
+def forget_session_deck(session_code: str) -> None:
+    """Oublier le jeu d'une session supprimée"""
+    with _session_decks_lock:
+        _session_decks.pop(session_code, None)
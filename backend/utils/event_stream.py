@@ -0,0 +1,249 @@
+"""
+Flux Server-Sent Events pour les observateurs en lecture seule (tableaux de bord, écrans)
+
+- Un canal par session : tampon circulaire des derniers frames SSE, construits
+  une seule fois à partir du texte JSON déjà encodé pour les WebSockets
+- publish() ne fait qu'ajouter le frame à la file de chaque observateur : la
+  tâche de la requête l'écrit (frames en attente regroupés en une écriture)
+  Un observateur qui ne lit plus (file pleine pendant une écriture bloquée, ou
+  écriture bloquée au-delà de send_timeout) est déconnecté, puis reprend avec
+  Last-Event-ID : ni la diffusion, ni le reaper, ni le drain n'attendent un client lent
+- Reprise avec Last-Event-ID tant que l'événement est encore dans le tampon,
+  sinon événement `resync` (le client recharge la session par l'API REST)
+- Keepalive et nettoyage des canaux inactifs : passage du reaper du manager
+"""
+import asyncio
+import collections
+import itertools
+import os
+import random
+import time
+from typing import Dict, Mapping, Optional
+
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from utils.metrics import SSE_DROPPED
+from utils.wire_format import encode_json
+
+KEEPALIVE = b": keepalive\n\n"
+RESYNC_JSON = encode_json({"type": "resync"})
+
+
+class Observer:
+    """Flux d'un observateur : frames en attente, écrits par la tâche de sa requête"""
+    __slots__ = ("send", "task", "pending", "wakeup", "closing", "disconnected", "dropped", "sending_since")
+
+    def __init__(self, send: Send, task: asyncio.Task):
+        self.send = send
+        self.task = task
+        self.pending = collections.deque()
+        self.wakeup = asyncio.Event()
+        # Dernier frame en file (drain) : la réponse se termine après lui
+        self.closing = False
+        self.disconnected = False
+        self.dropped = False
+        # Début de l'écriture en cours (None si aucune)
+        self.sending_since: Optional[float] = None
+
+    def push(self, body: bytes) -> None:
+        self.pending.append(body)
+        self.wakeup.set()
+
+
+class Channel:
+    """Événements récents d'une session et observateurs connectés"""
+    __slots__ = ("frames", "last_id", "observers", "idle_since")
+
+    def __init__(self, replay_events: int):
+        # (identifiant, frame SSE encodé), identifiants consécutifs
+        self.frames = collections.deque(maxlen=replay_events)
+        self.last_id = 0
+        # Observateurs connectés (ensemble ordonné)
+        self.observers: Dict[Observer, None] = {}
+        self.idle_since = time.monotonic()
+
+
+class EventStreams:
+    def __init__(self, replay_events: int = 64, idle_ttl: float = 300.0,
+                 max_pending: int = 64, send_timeout: float = 5.0):
+        self.replay_events = replay_events
+        # Durée de conservation d'un canal sans observateur (reprise après coupure)
+        self.idle_ttl = idle_ttl
+        # Observateur lent : frames en attente au plus, durée maximale d'une écriture
+        self.max_pending = max_pending
+        self.send_timeout = send_timeout
+        self.channels: Dict[str, Channel] = {}
+        # Identifiant du processus : un Last-Event-ID émis par un autre worker
+        # (ou avant un redémarrage) ne peut pas être repris ici
+        self.epoch = os.urandom(4).hex()
+        # Fenêtre de reconnexion (min, max) en secondes pendant le drain
+        self._drain_window = None
+
+    def has_channel(self, session_code: str) -> bool:
+        return session_code in self.channels
+
+    def observer_count(self) -> int:
+        return sum(len(channel.observers) for channel in self.channels.values())
+
+    def channel_count(self) -> int:
+        return len(self.channels)
+
+    def _frame(self, event_id: int, data: str) -> bytes:
+        return f"id: {self.epoch}-{event_id}\ndata: {data}\n\n".encode("utf-8")
+
+    async def publish(self, session_code: str, data: str):
+        """Diffuser un événement (texte JSON déjà encodé) aux observateurs de la session"""
+        channel = self.channels.get(session_code)
+        if channel is None:
+            return
+        channel.last_id += 1
+        frame = self._frame(channel.last_id, data)
+        channel.frames.append((channel.last_id, frame))
+        for observer in list(channel.observers):
+            # File pleine pendant une écriture en cours : le client ne lit plus
+            # (une rafale avant le tour de la tâche d'écriture n'est pas un client lent)
+            if observer.sending_since is not None and len(observer.pending) >= self.max_pending:
+                self._drop(channel, observer, "queue full")
+            else:
+                observer.push(frame)
+
+    def _drop(self, channel: Channel, observer: Observer, reason: str) -> None:
+        """Déconnecter un observateur qui ne lit plus (sa requête est annulée)"""
+        channel.observers.pop(observer, None)
+        if not observer.dropped:
+            observer.dropped = True
+            SSE_DROPPED.inc(reason)
+            observer.task.cancel()
+
+    def _backlog(self, channel: Channel, last_event_id: Optional[str]) -> bytes:
+        """Frames manqués depuis Last-Event-ID, ou `resync` si la reprise est impossible"""
+        if not last_event_id:
+            return b""
+        epoch, _, number = last_event_id.strip().partition("-")
+        if epoch == self.epoch and number.isdigit():
+            missed = channel.last_id - int(number)
+            if 0 <= missed <= len(channel.frames):
+                frames = itertools.islice(channel.frames, len(channel.frames) - missed, None)
+                return b"".join(frame for _, frame in frames)
+        return self._frame(channel.last_id, RESYNC_JSON)
+
+    def _draining_message(self) -> dict:
+        delay = int(random.uniform(*self._drain_window) * 1000)
+        message = encode_json({"type": "server_draining", "reconnect_in_ms": delay})
+        # `retry` : délai de reconnexion automatique d'EventSource
+        body = f"retry: {delay}\ndata: {message}\n\n".encode("utf-8")
+        return {"type": "http.response.body", "body": body, "more_body": False}
+
+    async def serve(self, session_code: str, last_event_id: Optional[str], receive: Receive, send: Send):
+        """Servir un observateur jusqu'à sa déconnexion ou au drain (en-têtes déjà envoyés)"""
+        if self._drain_window is not None:
+            await send(self._draining_message())
+            return
+
+        channel = self.channels.get(session_code)
+        if channel is None:
+            channel = self.channels[session_code] = Channel(self.replay_events)
+        observer = Observer(send, asyncio.current_task())
+        backlog = self._backlog(channel, last_event_id)
+        if backlog:
+            observer.push(backlog)
+        channel.observers[observer] = None
+        watcher = asyncio.ensure_future(self._watch_disconnect(observer, receive))
+        try:
+            await self._write(observer)
+        except asyncio.CancelledError:
+            if not observer.dropped:
+                raise
+            # Observateur lent déconnecté : réponse abandonnée, connexion fermée par le serveur
+            observer.task.uncancel()
+        finally:
+            watcher.cancel()
+            channel.observers.pop(observer, None)
+            if not channel.observers:
+                channel.idle_since = time.monotonic()
+
+    @staticmethod
+    async def _watch_disconnect(observer: Observer, receive: Receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        observer.disconnected = True
+        observer.wakeup.set()
+
+    @staticmethod
+    async def _write(observer: Observer):
+        """Écrire les frames en attente, regroupés, jusqu'à la déconnexion ou au dernier frame"""
+        while True:
+            await observer.wakeup.wait()
+            observer.wakeup.clear()
+            while observer.pending and not observer.disconnected:
+                final = observer.closing
+                body = b"".join(observer.pending)
+                observer.pending.clear()
+                observer.sending_since = time.monotonic()
+                await observer.send({"type": "http.response.body", "body": body, "more_body": not final})
+                observer.sending_since = None
+                if final:
+                    return
+            if observer.disconnected:
+                return
+
+    def keepalive(self):
+        """
+        Commentaire SSE sur chaque flux inactif (proxys, détection des clients partis)
+        Déconnecte les observateurs dont l'écriture est bloquée depuis send_timeout
+        """
+        now = time.monotonic()
+        for channel in list(self.channels.values()):
+            for observer in list(channel.observers):
+                if observer.sending_since is not None and now - observer.sending_since > self.send_timeout:
+                    self._drop(channel, observer, "send timeout")
+                elif not observer.pending:
+                    observer.push(KEEPALIVE)
+
+    def prune(self) -> int:
+        """Supprimer les canaux sans observateur depuis idle_ttl"""
+        now = time.monotonic()
+        idle = [code for code, channel in self.channels.items()
+                if not channel.observers and now - channel.idle_since > self.idle_ttl]
+        for code in idle:
+            del self.channels[code]
+        return len(idle)
+
+    async def drain(self, min_delay: float, max_delay: float, timeout: float = 5.0) -> int:
+        """
+        Terminer tous les flux, chacun avec un délai de reconnexion aléatoire
+        Les flux encore en cours d'écriture après `timeout` secondes sont coupés
+        Retourne le nombre de flux terminés
+        """
+        self._drain_window = (min_delay, max_delay)
+        observers = []
+        for channel in self.channels.values():
+            for observer in channel.observers:
+                observer.push(self._draining_message()["body"])
+                observer.closing = True
+                observers.append((channel, observer))
+        if observers:
+            _, pending = await asyncio.wait([observer.task for _, observer in observers], timeout=timeout)
+            for channel, observer in observers:
+                if observer.task in pending:
+                    self._drop(channel, observer, "drain timeout")
+        return len(observers)
+
+
+class EventStreamResponse(Response):
+    """Réponse text/event-stream servie par EventStreams.serve()"""
+    media_type = "text/event-stream"
+
+    def __init__(self, streams: EventStreams, session_code: str, last_event_id: Optional[str] = None,
+                 headers: Optional[Mapping[str, str]] = None):
+        self.streams = streams
+        self.session_code = session_code
+        self.last_event_id = last_event_id
+        self.status_code = 200
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self.streams.serve(self.session_code, self.last_event_id, receive, send)
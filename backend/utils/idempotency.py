@@ -0,0 +1,286 @@
+"""
+Clés d'idempotence (en-tête Idempotency-Key) pour les requêtes de modification
+
+Un client mobile qui renvoie une requête après une coupure réseau réutilise la
+même clé : la réponse enregistrée est renvoyée telle quelle (en-tête
+Idempotent-Replayed), sans repasser par les services ni rediffuser d'événement.
+
+- Portée : utilisateur (X-Auth-User) + clé ; une clé réutilisée pour une autre
+  requête (méthode, chemin ou corps différents) est refusée (422)
+- Doublons concurrents : ils attendent la fin de la première requête
+- Réponses 5xx non enregistrées : la requête suivante avec la clé est rejouée
+- Cache LRU borné en nombre d'entrées et en octets, avec TTL ; les réponses
+  plus grosses que max_body_bytes ne sont pas enregistrées (une reprise
+  réexécute la requête)
+- Persistance optionnelle en table (idempotency_keys), pour les reprises sur
+  un autre worker ou après un redémarrage
+"""
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from utils.metrics import IDEMPOTENCY_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+
+# Suppression des lignes expirées : une écriture sur N
+_PURGE_EVERY = 100
+
+
+class StoredResponse:
+    __slots__ = ("fingerprint", "status", "headers", "body", "expires", "size")
+
+    def __init__(self, fingerprint: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes,
+                 expires: float):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+        self.size = len(body) + sum(len(name) + len(value) for name, value in headers)
+
+
+class IdempotencyStore:
+    """
+    Réponses enregistrées (LRU + TTL) et requêtes en cours par clé
+    Méthodes synchrones appelées depuis la boucle ; load()/save() en base
+    s'exécutent dans le threadpool
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 86400.0, persistent: bool = False,
+                 max_bytes: int = 32 * 1024 * 1024, max_body_bytes: int = 256 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persistent = persistent
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_body_bytes
+        self._responses: "collections.OrderedDict[str, StoredResponse]" = collections.OrderedDict()
+        self._bytes = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._writes = 0
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        stored = self._responses.get(key)
+        if stored is None:
+            return None
+        if stored.expires <= time.time():
+            del self._responses[key]
+            self._bytes -= stored.size
+            return None
+        self._responses.move_to_end(key)
+        return stored
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def storable(self, stored: StoredResponse) -> bool:
+        return len(stored.body) <= self.max_body_bytes and stored.size <= self.max_bytes
+
+    def put(self, key: str, stored: StoredResponse):
+        previous = self._responses.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._responses[key] = stored
+        self._bytes += stored.size
+        while len(self._responses) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._responses.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def in_flight(self, key: str) -> Optional[asyncio.Future]:
+        return self._in_flight.get(key)
+
+    def begin(self, key: str) -> asyncio.Future:
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        return future
+
+    def finish(self, key: str):
+        future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    def load(self, key: str) -> Optional[StoredResponse]:
+        """Réponse persistée (threadpool)"""
+        from database import SessionLocal
+        from models.idempotency import IdempotencyRecord
+
+        db = SessionLocal()
+        try:
+            record = db.get(IdempotencyRecord, key)
+            if record is None or record.expires_at <= datetime.utcnow():
+                return None
+            expires = time.time() + (record.expires_at - datetime.utcnow()).total_seconds()
+            headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(record.headers)]
+            return StoredResponse(record.fingerprint, record.status_code, headers, record.body, expires)
+        finally:
+            db.close()
+
+    def save(self, key: str, stored: StoredResponse):
+        """Persister une réponse (threadpool), et purger de temps en temps les lignes expirées"""
+        from database import SessionLocal
+        from models.idempotency import IdempotencyRecord
+
+        self._writes += 1
+        db = SessionLocal()
+        try:
+            db.merge(IdempotencyRecord(
+                key=key,
+                fingerprint=stored.fingerprint,
+                status_code=stored.status,
+                headers=json.dumps([[name.decode("latin-1"), value.decode("latin-1")]
+                                    for name, value in stored.headers]),
+                body=stored.body,
+                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl),
+            ))
+            if self._writes % _PURGE_EVERY == 0:
+                db.query(IdempotencyRecord).filter(
+                    IdempotencyRecord.expires_at <= datetime.utcnow()
+                ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _json_response(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Middleware ASGI appliquant les clés d'idempotence (voir le module)"""
+
+    def __init__(self, app, store: IdempotencyStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = _header(scope, b"idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _json_response(send, 400, "Invalid Idempotency-Key header")
+            return
+
+        # Corps lu en entier : il fait partie de l'empreinte de la requête
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        user = _header(scope, b"x-auth-user") or ""
+        key = hashlib.sha256(f"{user.strip()}\0{idempotency_key}".encode("utf-8")).hexdigest()
+        request_hash = hashlib.sha256()
+        for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+            request_hash.update(part)
+            request_hash.update(b"\0")
+        fingerprint = request_hash.hexdigest()
+
+        looked_up = not self.store.persistent
+        while True:
+            # Pas d'await entre la dernière vérification et begin() : un seul exécutant par clé
+            stored = self.store.get(key)
+            if stored is not None:
+                await self._replay(stored, fingerprint, send)
+                return
+            future = self.store.in_flight(key)
+            if future is not None:
+                IDEMPOTENCY_REQUESTS.inc("waited")
+                await asyncio.shield(future)
+                continue
+            if not looked_up:
+                looked_up = True
+                stored = await run_in_threadpool(self.store.load, key)
+                if stored is not None:
+                    self.store.put(key, stored)
+                continue
+            break
+
+        self.store.begin(key)
+        try:
+            await self._execute(scope, receive, send, key, fingerprint, body)
+        finally:
+            self.store.finish(key)
+
+    async def _replay(self, stored: StoredResponse, fingerprint: str, send):
+        if stored.fingerprint != fingerprint:
+            IDEMPOTENCY_REQUESTS.inc("mismatch")
+            await _json_response(send, 422, "Idempotency-Key was already used for a different request")
+            return
+        IDEMPOTENCY_REQUESTS.inc("replayed")
+        await send({"type": "http.response.start", "status": stored.status,
+                    "headers": stored.headers + [REPLAYED_HEADER]})
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _execute(self, scope, receive, send, key: str, fingerprint: str, body: bytes):
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start = {}
+        response_body = []
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, replay_receive, capture_send)
+
+        status = start.get("status", 500)
+        if status >= 500:
+            IDEMPOTENCY_REQUESTS.inc("not_stored")
+            return
+        stored = StoredResponse(fingerprint, status, list(start.get("headers", [])), b"".join(response_body),
+                                time.time() + self.store.ttl)
+        if not self.store.storable(stored):
+            # Réponse trop grosse (export...) : une reprise réexécute la requête
+            IDEMPOTENCY_REQUESTS.inc("too_large")
+            return
+        self.store.put(key, stored)
+        IDEMPOTENCY_REQUESTS.inc("stored")
+        if self.store.persistent:
+            try:
+                await run_in_threadpool(self.store.save, key, stored)
+            except Exception:
+                # La réponse est déjà envoyée, et gardée en mémoire
+                logger.exception("Could not persist idempotent response")
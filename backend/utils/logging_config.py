@@ -0,0 +1,142 @@
+"""
+Configuration unique du logging (appelée par le lifespan, ou par main.py)
+
+- Les handlers écrivent dans une file : le formatage et les E/S se font dans
+  le thread du QueueListener, jamais dans la boucle asyncio ni dans un handler
+- Le message n'est formaté qu'à l'écriture (`logger.info("...%s", x)`, pas de f-string)
+- Format JSON (un objet par ligne, champs passés par `extra=`) ou texte
+- Échantillonnage 1 sur N des loggers à fort volume (votes, messages WebSocket),
+  décidé avant la création de l'enregistrement : voir sampled_logger()
+
+Réglages : config.Settings.log_level, log_format, log_sample_every
+"""
+import itertools
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Attributs standard d'un LogRecord (et doublon coloré d'uvicorn) : le reste vient de `extra=`
+_RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "color_message"}
+
+# Loggers uvicorn : leurs handlers écrivent sinon directement depuis la boucle
+_UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_sampled: Dict[str, "SampledLogger"] = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objet JSON par ligne : horodatage, niveau, logger, message et champs `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """
+    Logger ne gardant qu'un appel sur `every` (champ `sample_every` pour pondérer)
+    Les appels écartés ne créent pas de LogRecord (un filtre de logger le ferait)
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, None)
+        self.every = 1
+        self._counter = itertools.count()
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.every > 1:
+            if next(self._counter) % self.every:
+                return
+            kwargs["extra"] = {**(kwargs.get("extra") or {}), "sample_every": self.every}
+        super().log(level, msg, *args, **kwargs)
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
+
+
+def sampled_logger(name: str) -> SampledLogger:
+    """Logger échantillonné selon config.Settings.log_sample_every[name]"""
+    if name not in _sampled:
+        _sampled[name] = SampledLogger(logging.getLogger(name))
+    return _sampled[name]
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler sans formatage dans le thread appelant
+    (QueueHandler.prepare formate le message avant de le mettre en file)
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # La trace doit être rendue tant que la pile existe encore
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+def configure_logging(level: str = "INFO", log_format: str = "json",
+                      sample_every: Optional[Dict[str, int]] = None) -> None:
+    """Installer la file et son listener sur le logger racine (idempotent)"""
+    global _listener, _queue_handler
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    for name, every in (sample_every or {}).items():
+        sampled_logger(name).every = max(1, int(every))
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(_formatter(log_format))
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _queue_handler = DeferredQueueHandler(log_queue)
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    for name in _UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Écrire les enregistrements en file et arrêter le listener (arrêt du worker)
+    Les derniers messages (fin d'arrêt d'uvicorn) sont écrits directement
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    _listener = _queue_handler = None
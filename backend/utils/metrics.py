@@ -0,0 +1,241 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.sql_profiler import QueryProfile, current_profile
+
+# Buckets par défaut (secondes), proches de ceux des clients Prometheus officiels
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Compteur monotone, éventuellement étiqueté"""
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Jauge dont la valeur est calculée au moment du scrape"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        return self._header() + [f"{self.name} {_format_value(self._callback())}"]
+
+
+class Histogram(_Metric):
+    """Histogramme cumulatif à buckets fixes"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [compteurs par bucket (+Inf inclus), somme, total]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        for labels, counts, total_sum, total_count in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{label_str} {total_count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registre minimal exposé au format texte Prometheus (sans dépendance externe)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, callback) -> Gauge:
+        return self._register(Gauge(name, documentation, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Latence des requêtes HTTP par route",
+    ("method", "route", "status")
+)
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds", "Durée des requêtes SQL"
+)
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "db_queries_per_request", "Nombre de requêtes SQL par requête HTTP",
+    ("route",), COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = registry.histogram(
+    "db_time_per_request_seconds", "Temps SQL cumulé par requête HTTP", ("route",)
+)
+WS_BROADCAST_DURATION = registry.histogram(
+    "ws_broadcast_duration_seconds", "Durée d'un broadcast WebSocket (encodage + envois)"
+)
+WS_MESSAGES = registry.counter(
+    "ws_messages_total", "Messages WebSocket par direction et par type", ("direction", "type")
+)
+WS_BYTES = registry.counter(
+    "ws_bytes_total", "Octets WebSocket par direction et par type", ("direction", "type")
+)
+WS_REAPED = registry.counter(
+    "ws_reaped_connections_total", "WebSockets fermés faute de réponse au ping"
+)
+WS_DROPPED = registry.counter(
+    "ws_dropped_messages_total", "Messages WebSocket entrants rejetés par motif", ("reason",)
+)
+SSE_DROPPED = registry.counter(
+    "sse_dropped_observers_total", "Observateurs SSE déconnectés car trop lents, par motif", ("reason",)
+)
+IDEMPOTENCY_REQUESTS = registry.counter(
+    "idempotency_requests_total", "Requêtes avec Idempotency-Key par issue", ("outcome",)
+)
+
+DB_READS = registry.counter(
+    "db_reads_total", "Sessions de lecture (get_read_db) par cible", ("target",)
+)
+
+
+def record_query(duration: float) -> None:
+    DB_QUERY_DURATION.observe(duration)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI mesurant la latence par route et les requêtes SQL associées"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = str(message["status"])
+            await send(message)
+
+        # Profil SQL partagé avec SQLProfilerMiddleware s'il est actif
+        profile = current_profile.get()
+        token = None
+        if profile is None:
+            profile = QueryProfile()
+            token = current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            if token is not None:
+                current_profile.reset(token)
+            route = scope.get("route")
+            # Utiliser le template de route pour éviter l'explosion de cardinalité
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(elapsed, scope["method"], route_path, status_holder[0])
+            DB_QUERIES_PER_REQUEST.observe(profile.statements, route_path)
+            DB_TIME_PER_REQUEST.observe(profile.duration, route_path)
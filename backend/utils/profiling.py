@@ -0,0 +1,210 @@
+"""
+Diagnostic d'un worker en production (routers/admin.py, si profiling_enabled)
+
+- SamplingProfiler : échantillonnage des piles de tous les threads
+  (sys._current_frames) par un thread dédié, le temps de la mesure seulement ;
+  résultat au format « collapsed stacks » (flamegraph.pl, speedscope, inferno)
+- MemoryTracer : tracemalloc démarré à la demande, différence entre deux
+  instantanés successifs, arrêt explicite ou automatique
+- deep_sizeof : taille approximative d'une structure en mémoire
+
+Rien n'est installé tant qu'aucune mesure n'est en cours : ni hook de trace,
+ni thread, ni tracemalloc
+"""
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import HTTPConnection
+
+# Objets non parcourus par deep_sizeof : partagés par tout le processus
+# (une requête ou un WebSocket référence l'application entière via son scope)
+_OPAQUE_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType,
+    types.CodeType, types.FrameType, asyncio.AbstractEventLoop, asyncio.Future, HTTPConnection,
+    threading.Thread,
+)
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """
+    Taille (octets) d'un objet et de ce qu'il contient : conteneurs, __dict__, __slots__
+    Les objets déjà dans `seen` ne sont pas recomptés ; fonctions, modules,
+    connexions et boucle asyncio sont ignorés
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _OPAQUE_TYPES):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, _ATOMIC_TYPES):
+            continue
+        if isinstance(current, (dict, types.MappingProxyType)):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(current)
+        else:
+            attributes = getattr(current, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for cls in type(current).__mro__:
+                slots = cls.__dict__.get("__slots__", ())
+                for slot in (slots,) if isinstance(slots, str) else slots:
+                    value = getattr(current, slot, None)
+                    if value is not None:
+                        stack.append(value)
+    return total
+
+
+class ProfilerBusy(Exception):
+    """Une mesure CPU est déjà en cours"""
+
+
+class SamplingProfiler:
+    """
+    Profileur par échantillonnage, sans dépendance ni hook de trace
+    Chaque échantillon lit la pile de chaque thread : le coût ne dépend pas
+    du code profilé, seulement de la fréquence et de la profondeur des piles
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._labels: Dict[types.CodeType, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _label(self, code: types.CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _stack(self, frame: types.FrameType) -> Tuple[str, ...]:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+    def run(self, seconds: float, interval: float) -> Tuple[collections.Counter, int]:
+        """
+        Échantillonner pendant `seconds` secondes, toutes les `interval` secondes
+        (appel bloquant : depuis le threadpool)
+        Retourne (piles « thread;frame;... » -> nombre d'échantillons, nombre de passages)
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            me = threading.get_ident()
+            stacks = collections.Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            next_sample = time.monotonic()
+            names: Dict[int, str] = {}
+            while next_sample < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    if ident not in names:
+                        # Nouveau thread : noms relus seulement dans ce cas
+                        names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                    stacks[(names.get(ident, str(ident)),) + self._stack(frame)] += 1
+                samples += 1
+                next_sample += interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # En retard (GIL tenu longtemps) : ne pas rattraper en rafale
+                    next_sample = time.monotonic()
+            return stacks, samples
+        finally:
+            self._labels.clear()
+            self._lock.release()
+
+    @staticmethod
+    def collapse(stacks: collections.Counter) -> str:
+        """Format « collapsed stacks » : une ligne `frame;frame;... nombre` par pile"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+class MemoryTracer:
+    """
+    Allocations Python (tracemalloc) entre deux points
+    start() prend l'instantané de référence ; chaque snapshot() est comparé au
+    précédent puis le remplace
+    """
+
+    def __init__(self):
+        self._reference: Optional[tracemalloc.Snapshot] = None
+        self.started_by_us = False
+
+    @property
+    def active(self) -> bool:
+        return self._reference is not None
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def start(self, frames: int) -> None:
+        """Démarrer le traçage (threadpool : l'instantané parcourt toutes les allocations)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.started_by_us = True
+        self._reference = self._snapshot()
+
+    def snapshot(self, limit: int, group_by: str) -> dict:
+        """Différence avec l'instantané précédent, plus grosses variations d'abord"""
+        if self._reference is None:
+            raise RuntimeError("Memory tracing is not started")
+        current = self._snapshot()
+        differences = current.compare_to(self._reference, group_by)
+        self._reference = current
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_bytes": traced,
+            "peak_bytes": peak,
+            "size_diff_bytes": sum(stat.size_diff for stat in differences),
+            "entries": [{
+                "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            } for stat in differences[:limit]],
+        }
+
+    def stop(self) -> bool:
+        """Arrêter le traçage (sans effet sur un traçage démarré hors de cette classe)"""
+        was_active = self.active
+        self._reference = None
+        if self.started_by_us:
+            tracemalloc.stop()
+            self.started_by_us = False
+        return was_active
+
+
+profiler = SamplingProfiler()
+memory_tracer = MemoryTracer()
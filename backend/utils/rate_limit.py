@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Seau à jetons : `rate` jetons/s, au plus `capacity` en réserve"""
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def allow(self, cost: float = 1.0, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+class SessionBuckets:
+    """Un seau par session, partagé par toutes les connexions de la session"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def allow(self, session_code: str) -> bool:
+        bucket = self._buckets.get(session_code)
+        if bucket is None:
+            bucket = self._buckets[session_code] = TokenBucket(self.rate, self.capacity)
+        return bucket.allow()
+
+    def discard(self, session_code: str) -> None:
+        self._buckets.pop(session_code, None)
+
+    def buckets(self) -> Dict[str, TokenBucket]:
+        return dict(self._buckets)
+
+
+class MessageCoalescer:
+    """
+    Regroupe les messages haute fréquence (typing, cursor...) d'une session :
+    seul le dernier message de chaque utilisateur est conservé, et un seul
+    frame par type est émis par tick
+    """
+
+    def __init__(self, interval: float, flush: Callable[[dict, str], Awaitable[None]]):
+        self.interval = interval
+        self._flush = flush
+        # (session_code, type) -> {username: data}
+        self._pending: Dict[Tuple[str, str], Dict[str, dict]] = {}
+        # Envois en cours (référence gardée jusqu'à la fin de la tâche)
+        self._flushing: set = set()
+
+    def add(self, session_code: str, message_type: str, username: str, data: dict) -> None:
+        key = (session_code, message_type)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = {}
+            asyncio.get_running_loop().call_later(self.interval, self._schedule_flush, key)
+        pending[username] = data
+
+    def _schedule_flush(self, key: Tuple[str, str]) -> None:
+        pending = self._pending.pop(key, None)
+        if pending:
+            session_code, message_type = key
+            task = asyncio.ensure_future(self._flush({
+                "type": message_type,
+                "events": [{"username": username, "data": data} for username, data in pending.items()]
+            }, session_code))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    def pending_count(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    def pending_by_session(self) -> Dict[str, list]:
+        """Messages en attente par session (un dict {username: data} par type)"""
+        sessions: Dict[str, list] = {}
+        for (session_code, _), pending in self._pending.items():
+            sessions.setdefault(session_code, []).append(pending)
+        return sessions
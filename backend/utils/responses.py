@@ -0,0 +1,22 @@
+import inspect
+
+from fastapi import routing
+
+
+def fast_json_options() -> dict:
+    """
+    Options FastAPI pour la sérialisation JSON des réponses
+
+    Les versions récentes de FastAPI sérialisent les `response_model`
+    directement en JSON via pydantic-core, à condition de garder la classe de
+    réponse par défaut : rien à changer. Sur les versions plus anciennes, on
+    utilise ORJSONResponse si orjson est installé.
+    """
+    if "dump_json" in inspect.signature(routing.serialize_response).parameters:
+        return {}
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return {}
+    from fastapi.responses import ORJSONResponse
+    return {"default_response_class": ORJSONResponse}
@@ -0,0 +1,108 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class TimerScheduler:
+    """
+    Minuteries centralisées : un tas d'échéances et une seule tâche asyncio,
+    quel que soit le nombre de sessions (pas une tâche par minuterie)
+
+    - schedule() planifie ou replanifie une clé, cancel() l'annule
+    - Les entrées remplacées ou annulées restent dans le tas et sont ignorées
+      à leur échéance (suppression paresseuse)
+    - Toutes les méthodes s'appellent depuis la boucle asyncio
+    """
+
+    def __init__(self):
+        # (échéance, séquence, clé)
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        # clé -> (échéance, séquence, callback) : seule entrée valide de la clé
+        self._entries: Dict[Hashable, Tuple[float, int, Callable[[], Awaitable[None]]]] = {}
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: set = set()
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Les échéances sont en base : un worker redémarré les replanifie
+        self._entries.clear()
+        self._heap.clear()
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], Awaitable[None]]) -> None:
+        """Planifier (ou replanifier) `await callback()` dans `delay` secondes"""
+        when = asyncio.get_running_loop().time() + max(0.0, delay)
+        sequence = next(self._sequence)
+        self._entries[key] = (when, sequence, callback)
+        heapq.heappush(self._heap, (when, sequence, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+        # Réveiller la tâche si la nouvelle échéance est la plus proche
+        if self._wakeup is not None and self._heap[0][1] == sequence:
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def pending(self) -> int:
+        return len(self._entries)
+
+    def _compact(self):
+        self._heap = [(when, sequence, key) for key, (when, sequence, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def _is_current(self, sequence: int, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[1] == sequence
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Écarter les entrées annulées ou replanifiées
+            while self._heap and not self._is_current(self._heap[0][1], self._heap[0][2]):
+                heapq.heappop(self._heap)
+
+            timeout = self._heap[0][0] - loop.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, key = heapq.heappop(self._heap)
+            _, _, callback = self._entries.pop(key)
+            # Une échéance lente ne retarde pas les suivantes
+            task = asyncio.ensure_future(self._fire(key, callback))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, key: Hashable, callback: Callable[[], Awaitable[None]]):
+        try:
+            await callback()
+        except Exception:
+            logger.exception("Timer %r failed", key)
+
+
+scheduler = TimerScheduler()
+
+registry.gauge("scheduler_timers", "Minuteries planifiées (rounds en temps limité)", scheduler.pending)
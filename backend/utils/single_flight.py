@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Set
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Regroupe les appels concurrents d'une même clé : un seul appelant exécute
+    la fonction, les autres attendent et partagent son résultat (ou son exception)
+
+    Ce n'est pas un cache : une fois l'appel terminé, l'appel suivant relance
+    la fonction. Utilisable depuis les endpoints synchrones (threadpool)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class WarmupSingleFlight:
+    """
+    Single-flight réservé au premier chargement de chaque clé, pendant une
+    fenêtre ouverte par start() (démarrage du worker : reconnexion de toutes
+    les salles après un redémarrage)
+
+    Hors de la fenêtre, ou une fois la clé chargée, chaque appel exécute la
+    fonction lui-même : une lecture envoyée après une écriture ne rejoint
+    jamais un chargement commencé avant elle
+    """
+
+    def __init__(self, window: float):
+        self._flight = SingleFlight()
+        self._window = window
+        self._lock = threading.Lock()
+        self._until = 0.0
+        self._loaded: Set[Hashable] = set()
+
+    def start(self) -> None:
+        """Ouvrir la fenêtre (lifespan)"""
+        with self._lock:
+            self._until = time.monotonic() + self._window
+            self._loaded.clear()
+
+    def _warming(self, key: Hashable) -> bool:
+        with self._lock:
+            if time.monotonic() >= self._until:
+                # Fenêtre fermée : plus rien à partager
+                self._loaded.clear()
+                return False
+            return key not in self._loaded
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        if not self._warming(key):
+            return fn()
+
+        def first_load():
+            result = fn()
+            with self._lock:
+                self._loaded.add(key)
+            return result
+
+        return self._flight.do(key, first_load)
+
+    def in_flight(self) -> int:
+        return self._flight.in_flight()
@@ -0,0 +1,150 @@
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, List, Optional
+
+logger = logging.getLogger("sql.slow")
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Ne conserver que la forme des paramètres SQL (jamais leurs valeurs)"""
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany : une seule ligne suffit à montrer la forme
+            return [redact_parameters(parameters[0]), f"... x{len(parameters)}"]
+        return tuple("?" for _ in parameters)
+    return "?"
+
+
+class QueryProfile:
+    """Requêtes SQL exécutées pendant une requête HTTP (ou un bloc de test)"""
+    __slots__ = ("statements", "duration", "slowest_statement", "slowest_parameters", "slowest_duration")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.slowest_parameters: Any = None
+        self.slowest_duration = 0.0
+
+    def record(self, statement: str, parameters: Any, duration: float) -> None:
+        self.statements += 1
+        self.duration += duration
+        if duration > self.slowest_duration:
+            # Ne garder qu'une référence : la rédaction n'est faite qu'à la lecture
+            self.slowest_statement = statement
+            self.slowest_parameters = parameters
+            self.slowest_duration = duration
+
+    def to_dict(self) -> dict:
+        return {
+            "statements": self.statements,
+            "duration_ms": round(self.duration * 1000, 3),
+            "slowest": {
+                "statement": self.slowest_statement,
+                "parameters": redact_parameters(self.slowest_parameters),
+                "duration_ms": round(self.slowest_duration * 1000, 3),
+            } if self.slowest_statement else None,
+        }
+
+
+# Profil de la requête HTTP en cours (positionné par les middlewares)
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+
+# Captures globales ouvertes par capture_queries() (indépendantes du contexte,
+# pour les tests où l'application tourne dans un autre thread que l'appelant)
+_captures: List[QueryProfile] = []
+_captures_lock = threading.Lock()
+
+
+def record_statement(statement: str, parameters: Any, duration: float) -> None:
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, parameters, duration)
+    if _captures:
+        with _captures_lock:
+            for capture in _captures:
+                capture.record(statement, parameters, duration)
+
+
+@contextmanager
+def capture_queries():
+    """
+    Capturer toutes les requêtes SQL exécutées pendant le bloc
+    Utilisable depuis les tests avec le TestClient
+    """
+    profile = QueryProfile()
+    with _captures_lock:
+        _captures.append(profile)
+    try:
+        yield profile
+    finally:
+        with _captures_lock:
+            _captures.remove(profile)
+
+
+@contextmanager
+def query_budget(max_statements: int):
+    """
+    Vérifier qu'un bloc ne dépasse pas un budget de requêtes SQL
+
+        with query_budget(6):
+            client.get("/api/poker/sessions/abc", headers=...)
+    """
+    with capture_queries() as profile:
+        yield profile
+    if profile.statements > max_statements:
+        raise AssertionError(
+            f"Query budget exceeded: {profile.statements} statements > {max_statements} "
+            f"(slowest: {profile.slowest_statement!r})"
+        )
+
+
+class SQLProfilerMiddleware:
+    """
+    Middleware ASGI de profilage SQL par requête
+    - Journalise les requêtes dépassant les seuils (logger "sql.slow")
+    - Ajoute optionnellement les en-têtes X-DB-Queries / X-DB-Time
+    """
+
+    def __init__(self, app, slow_ms: float = 200.0, slow_statements: int = 50, debug_headers: bool = False):
+        self.app = app
+        self.slow_seconds = slow_ms / 1000
+        self.slow_statements = slow_statements
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Réutiliser le profil d'un middleware englobant s'il existe
+        profile = current_profile.get()
+        token = None
+        if profile is None:
+            profile = QueryProfile()
+            token = current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if self.debug_headers and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(profile.statements).encode()))
+                headers.append((b"x-db-time", f"{profile.duration * 1000:.3f}ms".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                current_profile.reset(token)
+            if profile.duration >= self.slow_seconds or profile.statements >= self.slow_statements:
+                logger.warning(
+                    "Slow DB request %s %s: %d statements, %.1f ms (slowest %.1f ms: %s params=%s)",
+                    scope["method"], scope["path"], profile.statements, profile.duration * 1000,
+                    profile.slowest_duration * 1000, profile.slowest_statement,
+                    redact_parameters(profile.slowest_parameters),
+                )
@@ -1,33 +1,328 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
+
 from fastapi import WebSocket
 
+from config import settings
+from utils.event_stream import EventStreams
+from utils.metrics import registry, WS_BROADCAST_DURATION, WS_MESSAGES, WS_BYTES, WS_REAPED
+from utils.wire_format import MSGPACK_SUBPROTOCOL, encode_json, encode_msgpack, msgpack_available
+
+logger = logging.getLogger(__name__)
+
+PING_JSON = encode_json({"type": "ping"})
+PING_MSGPACK = encode_msgpack({"type": "ping"}) if msgpack_available() else b""
+
+# Événements envoyés immédiatement (avec les événements en attente de la session)
+CRITICAL_EVENT_TYPES = frozenset({"votes_revealed", "new_round"})
+
+
+def _collapse_key(message: dict, sequence: int):
+    """Clé de regroupement : les votes répétés d'un même utilisateur se remplacent"""
+    if message.get("type") == "vote_cast":
+        return ("vote_cast", message.get("username"), message.get("round_number"))
+    return sequence
+
+
+class Connection:
+    """Un WebSocket connecté (un utilisateur peut en avoir plusieurs : onglets)"""
+    __slots__ = ("websocket", "session_code", "username", "msgpack", "last_seen", "ping_sent_at")
+
+    def __init__(self, websocket: WebSocket, session_code: str, username: str, msgpack: bool = False):
+        self.websocket = websocket
+        self.session_code = session_code
+        self.username = username
+        self.msgpack = msgpack
+        self.last_seen = time.monotonic()
+        self.ping_sent_at = 0.0
+
+
 class WebSocketManager:
-    def __init__(self):
+    def __init__(self, batch_window: float = 0.0, streams: EventStreams = None):
+        # session_code -> {Connection: None} (ensemble ordonné)
         self.active_connections: dict = {}
+        self.pending_sends = 0
+        # Fenêtre de regroupement (secondes), 0 = envoi immédiat
+        self.batch_window = batch_window
+        # session_code -> {clé de regroupement: message}, ordonné par première arrivée
+        self._batches: dict = {}
+        self._sequence = itertools.count()
+        # Envois de tampons en cours (référence gardée jusqu'à la fin de la tâche)
+        self._flushing: set = set()
+        self._reaper = None
+        # Observateurs SSE (lecture seule) : mêmes événements, mêmes frames JSON
+        self.streams = streams if streams is not None else EventStreams()
+        # Arrêt en cours : plus de nouveaux sockets, les clients sont invités à se reconnecter
+        self.draining = False
+        self._drain = None
+
+    async def connect(self, websocket: WebSocket, session_code: str, username: str,
+                      subprotocol: str = None) -> Connection:
+        await websocket.accept(subprotocol=subprotocol)
+        return self.register(websocket, session_code, username, subprotocol == MSGPACK_SUBPROTOCOL)
+
+    def register(self, websocket, session_code: str, username: str, msgpack: bool = False) -> Connection:
+        """Enregistrer un socket déjà accepté"""
+        connection = Connection(websocket, session_code, username, msgpack)
+        self.active_connections.setdefault(session_code, {})[connection] = None
+        return connection
+
+    def disconnect(self, connection: Connection):
+        connections = self.active_connections.get(connection.session_code)
+        if connections is not None:
+            connections.pop(connection, None)
+            if not connections:
+                del self.active_connections[connection.session_code]
+                if not self.streams.has_channel(connection.session_code):
+                    self._batches.pop(connection.session_code, None)
+
+    def is_connected(self, session_code: str, username: str) -> bool:
+        """L'utilisateur a-t-il encore au moins un socket dans la session ?"""
+        return any(c.username == username for c in self.active_connections.get(session_code, ()))
 
-    async def connect(self, websocket: WebSocket, session_code: str, username: str):
-        await websocket.accept()
-        if session_code not in self.active_connections:
-            self.active_connections[session_code] = {}
-        self.active_connections[session_code][username] = websocket
+    def touch(self, connection: Connection):
+        """Le client a donné signe de vie (message ou pong)"""
+        connection.last_seen = time.monotonic()
+        connection.ping_sent_at = 0.0
 
-    def disconnect(self, session_code: str, username: str):
-        if session_code in self.active_connections:
-            if username in self.active_connections[session_code]:
-                del self.active_connections[session_code][username]
-            if not self.active_connections[session_code]:
-                del self.active_connections[session_code]
+    def session_count(self) -> int:
+        return len(self.active_connections)
+
+    def socket_count(self) -> int:
+        return sum(len(conns) for conns in self.active_connections.values())
+
+    def batched_event_count(self) -> int:
+        return sum(len(batch) for batch in self._batches.values())
+
+    def session_state(self) -> dict:
+        """
+        État en mémoire par session (diagnostic, routers/admin.py) :
+        session_code -> {"websockets", "batched_events", "sse_channel"}
+        """
+        codes = set(self.active_connections) | set(self._batches) | set(self.streams.channels)
+        return {code: {
+            "websockets": self.active_connections.get(code),
+            "batched_events": self._batches.get(code),
+            "sse_channel": self.streams.channels.get(code),
+        } for code in codes}
 
     async def broadcast(self, message: dict, session_code: str):
-        if session_code in self.active_connections:
-            disconnected = []
-            for username, connection in self.active_connections[session_code].items():
+        if session_code not in self.active_connections and not self.streams.has_channel(session_code):
+            return
+
+        if self.batch_window <= 0:
+            await self._send(session_code, message, str(message.get("type", "message")))
+            return
+
+        if message.get("type") in CRITICAL_EVENT_TYPES:
+            # Vider le tampon dans le même frame pour conserver l'ordre
+            events = list(self._batches.pop(session_code, {}).values())
+            events.append(message)
+            await self.flush_batch(session_code, events)
+            return
+
+        batch = self._batches.get(session_code)
+        if batch is None:
+            batch = self._batches[session_code] = {}
+            asyncio.get_running_loop().call_later(self.batch_window, self._schedule_flush, session_code, batch)
+        batch[_collapse_key(message, next(self._sequence))] = message
+
+    def _schedule_flush(self, session_code: str, batch: dict):
+        # Le tampon a pu être vidé (événement critique) ou remplacé entre-temps
+        if self._batches.get(session_code) is batch:
+            del self._batches[session_code]
+            task = asyncio.ensure_future(self.flush_batch(session_code, list(batch.values())))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    async def flush_batch(self, session_code: str, events: list):
+        if len(events) == 1:
+            await self._send(session_code, events[0], str(events[0].get("type", "message")))
+        elif events:
+            await self._send(session_code, events, "batch")
+
+    async def flush_all(self):
+        """Envoyer immédiatement tous les tampons en attente"""
+        batches, self._batches = self._batches, {}
+        for session_code, batch in batches.items():
+            await self.flush_batch(session_code, list(batch.values()))
+
+    async def _send(self, session_code: str, payload, message_type: str):
+        # Encoder une seule fois par format pour tous les destinataires
+        text = binary = None
+        text_size = sent_bytes = 0
+        if self.streams.has_channel(session_code):
+            text = encode_json(payload)
+            text_size = len(text.encode("utf-8"))
+            await self.streams.publish(session_code, text)
+
+        connections = list(self.active_connections.get(session_code, ()))
+        if not connections:
+            return
+
+        start = time.perf_counter()
+        disconnected = []
+        self.pending_sends += len(connections)
+        done = 0
+        try:
+            for connection in connections:
                 try:
-                    await connection.send_json(message)
+                    if connection.msgpack:
+                        if binary is None:
+                            binary = encode_msgpack(payload)
+                        await connection.websocket.send_bytes(binary)
+                        sent_bytes += len(binary)
+                    else:
+                        if text is None:
+                            text = encode_json(payload)
+                            text_size = len(text.encode("utf-8"))
+                        await connection.websocket.send_text(text)
+                        sent_bytes += text_size
                 except:
-                    disconnected.append(username)
+                    disconnected.append(connection)
+                self.pending_sends -= 1
+                done += 1
+        finally:
+            self.pending_sends -= len(connections) - done
+            WS_MESSAGES.inc("out", message_type, amount=done - len(disconnected))
+            WS_BYTES.inc("out", message_type, amount=sent_bytes)
+            WS_BROADCAST_DURATION.observe(time.perf_counter() - start)
+
+        for connection in disconnected:
+            self.disconnect(connection)
+
+    # Arrêt progressif (déploiement) : étaler les reconnexions des clients
+    def start_drain(self, min_delay: float, max_delay: float, timeout: float) -> asyncio.Task:
+        """Lancer le drain une seule fois, quel que soit le nombre d'appelants"""
+        if self._drain is None:
+            self._drain = asyncio.ensure_future(self.drain(min_delay, max_delay, timeout))
+        return self._drain
+
+    async def drain(self, min_delay: float, max_delay: float, timeout: float) -> int:
+        """
+        Vider le worker avant son arrêt
+        - Refuse les nouveaux sockets (voir routers/websocket.py)
+        - Envoie les événements en attente dans les tampons de regroupement
+        - Termine les flux SSE (même délai de reconnexion, via `retry` ; au plus `timeout` s)
+        - Envoie à chaque client `server_draining` avec un délai de reconnexion
+          aléatoire dans [min_delay, max_delay] s, pour que les clients ne
+          rechargent pas tous leur session dans la même seconde
+        - Ferme proprement les sockets (1012 Service Restart)
+        Retourne le nombre de sockets fermés
+        """
+        self.draining = True
+        await self.flush_all()
+        streams = await self.streams.drain(min_delay, max_delay, timeout)
+        if streams:
+            logger.info("Closed %d SSE stream(s)", streams)
+
+        connections = [c for conns in self.active_connections.values() for c in conns]
+        if connections:
+            logger.info("Draining %d WebSocket(s)", len(connections))
+            await asyncio.gather(*(
+                self._drain_connection(connection, random.uniform(min_delay, max_delay), timeout)
+                for connection in connections
+            ))
+        return len(connections)
+
+    async def _drain_connection(self, connection: Connection, delay: float, timeout: float):
+        message = {"type": "server_draining", "reconnect_in_ms": int(delay * 1000)}
+        self.disconnect(connection)
+        try:
+            if connection.msgpack:
+                await asyncio.wait_for(connection.websocket.send_bytes(encode_msgpack(message)), timeout)
+            else:
+                await asyncio.wait_for(connection.websocket.send_text(encode_json(message)), timeout)
+            await asyncio.wait_for(connection.websocket.close(code=1012, reason="Server restart"), timeout)
+        except Exception:
+            pass
+
+    # Heartbeat : une seule tâche pour toutes les sessions (pas une par socket)
+    def start_reaper(self, interval: float, timeout: float):
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_forever(interval, timeout))
+
+    async def stop_reaper(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+
+    async def _reap_forever(self, interval: float, timeout: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reap(interval, timeout)
+            except Exception:
+                logger.exception("WebSocket reaper pass failed")
+
+    async def reap(self, interval: float, timeout: float) -> int:
+        """
+        Un passage du reaper
+        - Ferme les sockets n'ayant pas répondu au ping dans le délai
+        - Envoie un ping aux sockets silencieux depuis `interval`
+        - Keepalive des flux SSE (sans attente : observateurs bloqués déconnectés), suppression des canaux inactifs
+        Retourne le nombre de sockets fermés
+        """
+        self.streams.keepalive()
+        self.streams.prune()
+        now = time.monotonic()
+        dead, to_ping = [], []
+        for connections in self.active_connections.values():
+            for connection in connections:
+                if connection.ping_sent_at:
+                    if now - connection.ping_sent_at > timeout:
+                        dead.append(connection)
+                elif now - connection.last_seen >= interval:
+                    to_ping.append(connection)
+
+        for connection in to_ping:
+            connection.ping_sent_at = now
+            try:
+                if connection.msgpack:
+                    await connection.websocket.send_bytes(PING_MSGPACK)
+                else:
+                    await connection.websocket.send_text(PING_JSON)
+            except Exception:
+                dead.append(connection)
+
+        for connection in dead:
+            self.disconnect(connection)
+            WS_REAPED.inc()
+            try:
+                await asyncio.wait_for(connection.websocket.close(code=1001, reason="Heartbeat timeout"), 1.0)
+            except Exception:
+                pass
+        return len(dead)
+
+
+manager = WebSocketManager(
+    batch_window=settings.ws_batch_window_ms / 1000,
+    streams=EventStreams(settings.sse_replay_events, settings.sse_channel_idle_ttl,
+                         settings.sse_observer_max_pending, settings.sse_send_timeout),
+)
 
-            for username in disconnected:
-                self.disconnect(session_code, username)
 
+def drain_worker() -> asyncio.Task:
+    """Drain du manager global avec les réglages de config.Settings (idempotent)"""
+    return manager.start_drain(
+        settings.ws_drain_reconnect_min_ms / 1000,
+        settings.ws_drain_reconnect_max_ms / 1000,
+        settings.ws_drain_timeout,
+    )
 
-manager = WebSocketManager()
\ No newline at end of file
+registry.gauge("ws_sessions", "Sessions ayant au moins un WebSocket connecté", manager.session_count)
+registry.gauge("ws_sockets", "WebSockets connectés", manager.socket_count)
+registry.gauge("ws_pending_sends", "Envois WebSocket en attente dans les broadcasts en cours",
+               lambda: manager.pending_sends)
+registry.gauge("sse_observers", "Observateurs SSE connectés", manager.streams.observer_count)
+registry.gauge("sse_channels", "Sessions ayant un canal SSE (observateurs ou tampon de reprise)",
+               manager.streams.channel_count)
+registry.gauge("ws_batched_events", "Événements WebSocket en attente dans les tampons de regroupement",
+               manager.batched_event_count)
@@ -0,0 +1,52 @@
+import json
+from typing import Any, Iterable, Optional
+
+# Installé par requirements.txt ; import optionnel : sans msgpack, seuls les clients JSON sont servis
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def negotiate_subprotocol(requested: Iterable[str]) -> Optional[str]:
+    """Choisir le sous-protocole à accepter parmi ceux proposés par le client"""
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in requested:
+        return MSGPACK_SUBPROTOCOL
+    return None
+
+
+def encode_json(payload: Any) -> str:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_msgpack(payload: Any) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def decode_message(message: dict) -> Any:
+    """
+    Décoder un message ASGI websocket.receive
+    Texte -> JSON, binaire -> MessagePack (lève ValueError si invalide)
+    """
+    if message.get("text") is not None:
+        return json.loads(message["text"])
+    if message.get("bytes") is not None:
+        if msgpack is None:
+            raise ValueError("Binary frames require the msgpack subprotocol")
+        try:
+            return msgpack.unpackb(message["bytes"], raw=False)
+        except Exception as exc:
+            raise ValueError("Invalid MessagePack frame") from exc
+    raise ValueError("Empty WebSocket message")
+
+
+def message_size(message: dict) -> int:
+    if message.get("text") is not None:
+        return len(message["text"].encode("utf-8"))
+    return len(message.get("bytes") or b"")
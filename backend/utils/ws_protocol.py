@@ -0,0 +1,103 @@
+"""
+Protocoles uvicorn : WebSocket avec permessage-deflate réglable, et arrêt progressif
+
+uvicorn n'expose qu'un booléen (ws_per_message_deflate) ; cette classe
+reconstruit la négociation avec les réglages de config.Settings.
+ws_deflate_enabled=False désactive la compression mais garde ce protocole
+(nécessaire au drain) ; le protocole d'uvicorn s'obtient en retirant --ws.
+Nécessite uvicorn >= 0.35 (implémentation sans I/O de websockets).
+
+À l'arrêt, uvicorn ferme chaque socket d'un 1012 sec avant même le shutdown
+du lifespan ; cette classe lance d'abord le drain applicatif du manager
+(server_draining + délai de reconnexion aléatoire), puis laisse uvicorn
+attendre la fermeture des sockets.
+
+Un flux SSE en cours bloquerait l'arrêt d'uvicorn (il attend la fin de la
+réponse) : DrainingHTTPProtocol lance le même drain, qui termine les flux.
+Une réponse abandonnée en cours (observateur SSE trop lent, déconnecté par
+utils/event_stream.py) interrompt la connexion : une fermeture normale
+attendrait que le client lise le tampon d'écriture, ce qu'il ne fait plus.
+
+    uvicorn main:app --ws utils.ws_protocol:TunedDeflateWebSocketProtocol \
+        --http utils.ws_protocol:DrainingHTTPProtocol
+"""
+import functools
+import logging
+
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+from websockets.server import ServerProtocol
+from uvicorn.protocols.http.auto import AutoHTTPProtocol
+from uvicorn.protocols.websockets.websockets_sansio_impl import WebSocketsSansIOProtocol
+
+from config import settings
+from utils.websocket_manager import drain_worker
+
+
+def deflate_factory() -> ServerPerMessageDeflateFactory:
+    return ServerPerMessageDeflateFactory(
+        server_max_window_bits=settings.ws_deflate_window_bits,
+        client_max_window_bits=settings.ws_deflate_window_bits,
+        compress_settings={"level": settings.ws_deflate_level, "memLevel": settings.ws_deflate_mem_level},
+    )
+
+
+class TunedDeflateWebSocketProtocol(WebSocketsSansIOProtocol):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        enabled = settings.ws_deflate_enabled and self.config.ws_per_message_deflate
+        extensions = [deflate_factory()] if enabled else []
+        self.conn = ServerProtocol(
+            extensions=extensions,
+            max_size=self.config.ws_max_size,
+            logger=logging.getLogger("uvicorn.error"),
+        )
+        self._drain_fallback = None
+
+    def shutdown(self) -> None:
+        if not self.handshake_complete or self.close_sent:
+            super().shutdown()
+            return
+        drain_worker()
+        # Filet de sécurité : fermeture sèche si le drain n'a pas abouti
+        if self._drain_fallback is None:
+            self._drain_fallback = self.loop.call_later(
+                settings.ws_drain_timeout + 1.0,
+                functools.partial(WebSocketsSansIOProtocol.shutdown, self),
+            )
+
+    def connection_lost(self, exc):
+        if self._drain_fallback is not None:
+            self._drain_fallback.cancel()
+            self._drain_fallback = None
+        super().connection_lost(exc)
+
+
+class _AbortingTransport:
+    """Transport dont close() interrompt la connexion si la réponse en cours est inachevée"""
+    __slots__ = ("_protocol", "_transport")
+
+    def __init__(self, protocol, transport):
+        self._protocol = protocol
+        self._transport = transport
+
+    def __getattr__(self, name):
+        return getattr(self._transport, name)
+
+    def close(self) -> None:
+        cycle = self._protocol.cycle
+        if cycle is not None and cycle.response_started and not cycle.response_complete:
+            self._transport.abort()
+        else:
+            self._transport.close()
+
+
+class DrainingHTTPProtocol(AutoHTTPProtocol):
+    def connection_made(self, transport) -> None:
+        super().connection_made(transport)
+        self.transport = _AbortingTransport(self, transport)
+
+    def shutdown(self) -> None:
+        if self.cycle is not None and not self.cycle.response_complete:
+            # Réponse en cours (flux SSE) : le drain la termine
+            drain_worker()
+        super().shutdown()
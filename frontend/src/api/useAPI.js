@@ -1,18 +1,49 @@
 import { useAuth } from '../context/AuthContext';
 import { API_URL } from '../constants/env';
 
+const MUTATING_METHODS = ['POST', 'PUT', 'PATCH', 'DELETE'];
+// Nouvelles tentatives après une erreur réseau (même Idempotency-Key : pas de double vote ni de round dupliqué)
+const NETWORK_RETRIES = 2;
+const RETRY_DELAY_MS = 500;
+
+// crypto.randomUUID n'existe qu'en contexte sécurisé (https, localhost) :
+// servie en http sur le réseau local, l'application construit un UUID v4 (RFC 4122)
+const newIdempotencyKey = () => {
+  if (typeof crypto.randomUUID === 'function') return crypto.randomUUID();
+  const bytes = crypto.getRandomValues(new Uint8Array(16));
+  bytes[6] = (bytes[6] & 0x0f) | 0x40;
+  bytes[8] = (bytes[8] & 0x3f) | 0x80;
+  const hex = Array.from(bytes, (byte) => byte.toString(16).padStart(2, '0')).join('');
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
 export const useAPI = () => {
   const { username } = useAuth();
 
   const call = async (endpoint, options = {}) => {
-    const response = await fetch(`${API_URL}${endpoint}`, {
-      ...options,
-      headers: {
-        'Content-Type': 'application/json',
-        'X-Auth-User': username,
-        ...options.headers,
-      },
-    });
+    const method = (options.method || 'GET').toUpperCase();
+    const idempotencyHeaders = MUTATING_METHODS.includes(method)
+      ? { 'Idempotency-Key': newIdempotencyKey() }
+      : {};
+
+    let response;
+    for (let attempt = 0; ; attempt++) {
+      try {
+        response = await fetch(`${API_URL}${endpoint}`, {
+          ...options,
+          headers: {
+            'Content-Type': 'application/json',
+            'X-Auth-User': username,
+            ...idempotencyHeaders,
+            ...options.headers,
+          },
+        });
+        break;
+      } catch (error) {
+        if (attempt >= NETWORK_RETRIES) throw error;
+        await new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS * 2 ** attempt));
+      }
+    }
 
     if (!response.ok) {
       const error = await response.json();
@@ -3,10 +3,19 @@ import { History } from 'lucide-react';
 import { useAPI } from '../api/useAPI';
 import '../index.css';
 
+const DECKS = [
+  { value: 'fibonacci', label: 'Fibonacci (0, ½, 1, 2, 3, 5, 8, 13…)' },
+  { value: 'tshirt', label: 'T-shirt (XS, S, M, L, XL, XXL)' },
+  { value: 'powers_of_two', label: 'Puissances de deux (1, 2, 4, 8, 16…)' },
+  { value: 'custom', label: 'Personnalisé' },
+];
+
 export const PokerSelection = ({ onCreateSession, onJoinSession, onViewHistory }) => {
   const [sessionCode, setSessionCode] = useState('');
   const [title, setTitle] = useState('');
   const [description, setDescription] = useState('');
+  const [deck, setDeck] = useState('fibonacci');
+  const [customCards, setCustomCards] = useState('');
   const [isCreating, setIsCreating] = useState(false);
   const [error, setError] = useState('');
   const [createdSessionCode, setCreatedSessionCode] = useState('');
@@ -18,11 +27,20 @@ export const PokerSelection = ({ onCreateSession, onJoinSession, onViewHistory }
     try {
       const session = await api('/poker/sessions', {
         method: 'POST',
-        body: JSON.stringify({ title, description }),
+        body: JSON.stringify({
+          title,
+          description,
+          deck,
+          deck_cards: deck === 'custom'
+            ? customCards.split(',').map((card) => card.trim()).filter(Boolean)
+            : null,
+        }),
       });
       setCreatedSessionCode(session.session_code);
       setTitle('');
       setDescription('');
+      setDeck('fibonacci');
+      setCustomCards('');
       setIsCreating(false);
       setTimeout(() => {
         onCreateSession(session.session_code);
@@ -137,6 +155,25 @@ export const PokerSelection = ({ onCreateSession, onJoinSession, onViewHistory }
                 className="w-full px-6 py-4 border-2 border-gray-300 rounded-xl focus:ring-2 focus:ring-green-500 focus:border-transparent transition"
                 rows="3"
               />
+              <select
+                value={deck}
+                onChange={(e) => setDeck(e.target.value)}
+                className="w-full px-6 py-4 border-2 border-gray-300 rounded-xl focus:ring-2 focus:ring-green-500 focus:border-transparent transition"
+              >
+                {DECKS.map((option) => (
+                  <option key={option.value} value={option.value}>{option.label}</option>
+                ))}
+              </select>
+              {deck === 'custom' && (
+                <input
+                  type="text"
+                  value={customCards}
+                  onChange={(e) => setCustomCards(e.target.value)}
+                  placeholder="Cartes séparées par des virgules (ex. 1, 2, 3, 5, ?)"
+                  className="w-full px-6 py-4 border-2 border-gray-300 rounded-xl focus:ring-2 focus:ring-green-500 focus:border-transparent transition"
+                  required
+                />
+              )}
               <button
                 type="submit"
                 className="w-full bg-gradient-to-r from-green-600 to-emerald-600 text-white py-4 rounded-xl hover:from-green-700 hover:to-emerald-700 transition-all shadow-lg font-semibold text-lg"
@@ -6,18 +6,27 @@ import { WS_URL } from '../constants/env';
 import { CardVote } from '../components/poker/CardVote';
 import '../index.css';
 
-const POKER_CARD_VALUES = [
-  { value: '1', label: '1', image: '/images/poker_cards/card-1.png' },
-  { value: '2', label: '2', image: '/images/poker_cards/card-2.png' },
-  { value: '3', label: '3', image: '/images/poker_cards/card-3.png' },
-  { value: '5', label: '5', image: '/images/poker_cards/card-5.png' },
-  { value: '8', label: '8', image: '/images/poker_cards/card-8.png' },
-  { value: '13', label: '13', image: '/images/poker_cards/card-13.png' },
-  { value: '21', label: '21', image: '/images/poker_cards/card-21.png' },
-  { value: '34', label: '34', image: '/images/poker_cards/card-34.png' },
-  { value: '?', label: '?', image: '/images/poker_cards/card-question.png' },
-  { value: 'coffee', label: '☕', image: '/images/poker_cards/card-coffee.png' },
-];
+// Images des cartes disponibles ; les autres cartes du jeu sont affichées en texte
+const CARD_IMAGES = {
+  '1': '/images/poker_cards/card-1.png',
+  '2': '/images/poker_cards/card-2.png',
+  '3': '/images/poker_cards/card-3.png',
+  '5': '/images/poker_cards/card-5.png',
+  '8': '/images/poker_cards/card-8.png',
+  '13': '/images/poker_cards/card-13.png',
+  '21': '/images/poker_cards/card-21.png',
+  '34': '/images/poker_cards/card-34.png',
+  '?': '/images/poker_cards/card-question.png',
+  '☕': '/images/poker_cards/card-coffee.png',
+};
+
+// Cartes du jeu de la session (session.deck), avec leur valeur numérique
+const deckCards = (deck) => (deck?.cards || []).map((card, index) => ({
+  value: card,
+  label: card,
+  image: CARD_IMAGES[card],
+  numeric: deck.values[index],
+}));
 
 export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
   const [session, setSession] = useState(null);
@@ -53,20 +62,55 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
     loadSession();
     api(`/poker/sessions/${sessionCode}/join`, { method: 'POST' }).catch(console.error);
 
-    const ws = new WebSocket(`${WS_URL}/poker/${sessionCode}?username=${username}`);
-    wsRef.current = ws;
+    let ws = null;
+    let closed = false;
+    let reconnectTimer = null;
+    // Délai proposé par le serveur lors d'un redémarrage (server_draining)
+    let reconnectDelay = null;
+
+    const connect = () => {
+      ws = new WebSocket(`${WS_URL}/poker/${sessionCode}?username=${username}`);
+      wsRef.current = ws;
 
-    ws.onopen = () => console.log('WebSocket connecté');
-    ws.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      if (['vote_cast', 'votes_revealed', 'votes_reset', 'round_completed', 'new_round', 'user_joined', 'user_left'].includes(data.type)) {
-        loadSession();
-      }
+      ws.onopen = () => {
+        console.log('WebSocket connecté');
+        if (reconnectDelay !== null) {
+          reconnectDelay = null;
+          loadSession();
+        }
+      };
+      ws.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        // Le serveur peut regrouper plusieurs événements dans un même frame
+        const events = Array.isArray(data) ? data : [data];
+        // Heartbeat : sans réponse, le serveur ferme le socket
+        if (events.some((e) => e.type === 'ping')) {
+          ws.send(JSON.stringify({ type: 'pong' }));
+        }
+        const draining = events.find((e) => e.type === 'server_draining');
+        if (draining) {
+          reconnectDelay = draining.reconnect_in_ms;
+        }
+        if (events.some((e) => ['vote_cast', 'votes_revealed', 'votes_reset', 'round_completed', 'new_round', 'user_joined', 'user_left'].includes(e.type))) {
+          loadSession();
+        }
+      };
+      ws.onerror = (error) => console.error('Erreur WebSocket:', error);
+      ws.onclose = () => {
+        console.log('WebSocket déconnecté');
+        // Reconnexion étalée après un redémarrage du serveur, avec backoff si le serveur n'est pas prêt
+        if (!closed && reconnectDelay !== null) {
+          reconnectTimer = setTimeout(connect, reconnectDelay);
+          reconnectDelay = Math.min(reconnectDelay * 2, 60000);
+        }
+      };
     };
-    ws.onerror = (error) => console.error('Erreur WebSocket:', error);
-    ws.onclose = () => console.log('WebSocket déconnecté');
+
+    connect();
 
     return () => {
+      closed = true;
+      if (reconnectTimer) clearTimeout(reconnectTimer);
       if (ws && ws.readyState === WebSocket.OPEN) ws.close();
       if (timerRef.current) clearInterval(timerRef.current);
     };
@@ -161,7 +205,7 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
                   <button
                     onClick={async () => {
                       try {
-                        await api(`/poker/sessions/${sessionCode}/reveal`, { method: 'POST' });
+                        await api(`/poker/sessions/${sessionCode}/reveal`, { method: 'POST', headers: { 'If-Match': String(session.version) } });
                         setIsTimerRunning(false);
                         loadSession();
                       } catch (error) {
@@ -182,7 +226,7 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
                   <button
                     onClick={async () => {
                       try {
-                        await api(`/poker/sessions/${sessionCode}/reset`, { method: 'POST' });
+                        await api(`/poker/sessions/${sessionCode}/reset`, { method: 'POST', headers: { 'If-Match': String(session.version) } });
                         setSelectedVote(null);
                         setTimer(0);
                         setIsTimerRunning(false);
@@ -295,6 +339,7 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
     try {
       await api(`/poker/sessions/${sessionCode}/rounds`, {
         method: 'POST',
+        headers: { 'If-Match': String(session.version) },
         body: JSON.stringify({ story_title: storyTitle }),
       });
       setStoryTitle('');
@@ -312,6 +357,7 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
     try {
       await api(`/poker/sessions/${sessionCode}/rounds/${session.current_round.round_number}/complete`, {
         method: 'POST',
+        headers: { 'If-Match': String(session.current_round.version) },
         body: JSON.stringify({ final_estimate: String(estimate) }),
       });
       setTimer(0);
@@ -328,6 +374,7 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
   const currentParticipant = session.participants.find(p => p.username === username);
   const isFacilitator = currentParticipant?.role === 'facilitator';
   const myVote = session.votes.find(v => v.user === username);
+  const cards = deckCards(session.deck);
 
   return (
     <div className="space-y-6">
@@ -372,7 +419,7 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
           <h3 className="content-section-title">🃏 Choose your card</h3>
         </div>
         <div className="grid grid-cols-5 sm:grid-cols-6 md:grid-cols-8 lg:grid-cols-9 xl:grid-cols-10 gap-3">
-          {POKER_CARD_VALUES.map((card) => (
+          {cards.map((card) => (
             <CardVote
               key={card.value}
               card={card}
@@ -396,13 +443,15 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
             <div>
               <span className="text-sm text-gray-600">Average : </span>
               <span className="font-black text-3xl text-blue-600">
-                {(session.votes
-                  .filter(v => !isNaN(parseFloat(v.value)))
-                  .reduce((sum, v) => sum + parseFloat(v.value), 0) /
-                  session.votes.filter(v => !isNaN(parseFloat(v.value))).length
-                ).toFixed(1)}
+                {session.statistics?.average != null ? session.statistics.average.toFixed(1) : '-'}
               </span>
             </div>
+            {session.statistics?.suggestion && (
+              <div>
+                <span className="text-sm text-gray-600">Suggestion : </span>
+                <span className="font-black text-3xl text-blue-600">{session.statistics.suggestion}</span>
+              </div>
+            )}
             <div>
               <span className="text-sm text-gray-600">Votes: </span>
               <span className="font-bold text-lg">{session.votes.map(v => v.value).join(', ')}</span>
@@ -412,8 +461,8 @@ export const PokerSession = ({ sessionCode, onLeave, onSidebarUpdate }) => {
             <div>
               <p className="text-sm text-gray-700 mb-3 font-semibold">✅ Close estimation:</p>
               <div className="flex gap-2 flex-wrap">
-                {POKER_CARD_VALUES
-                  .filter(c => !isNaN(parseFloat(c.value)))
+                {cards
+                  .filter(c => c.numeric !== null)
                   .map((card) => (
                     <button
                       key={card.value}